@@ -20,8 +20,12 @@ class CanError(IOError):
 
 
 from .listener import Listener, BufferedReader, RedirectReader, AsyncBufferedReader
+from .listener import MessageCache
+from .statistics import MessageStatistics
+from .shared_memory import SharedMemoryWriter, SharedMemoryReader
 
-from .io import Logger, Printer, LogReader, MessageSync
+from .io import Logger, Printer, LogReader, MessageSync, TriggerCapture
+from .io import RotatingLogger, ThreadedWriter
 from .io import ASCWriter, ASCReader
 from .io import BLFReader, BLFWriter
 from .io import CanutilsLogReader, CanutilsLogWriter
@@ -5,7 +5,17 @@ The main entry point to these classes should be through
 :meth:`can.BusABC.send_periodic`.
 """
 
-from typing import Optional, Sequence, Tuple, Union, TYPE_CHECKING
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    TYPE_CHECKING,
+)
 
 from can import typechecking
 
@@ -15,7 +25,13 @@ if TYPE_CHECKING:
 from can.message import Message
 
 import abc
+import asyncio
+import collections
+import copy
+import heapq
+import itertools
 import logging
+import math
 import threading
 import time
 
@@ -195,10 +211,471 @@ class MultiRateCyclicSendTaskABC(CyclicSendTaskABC):
         self._channel = channel
 
 
+def _crc8_j1850_table() -> Tuple[int, ...]:
+    table = []
+    for value in range(256):
+        for _ in range(8):
+            value = ((value << 1) ^ 0x1D if value & 0x80 else value << 1) & 0xFF
+        table.append(value)
+    return tuple(table)
+
+
+_CRC8_J1850_TABLE = _crc8_j1850_table()
+
+
+def crc8_j1850(data: Sequence[int]) -> int:
+    """Computes the CRC-8 of SAE J1850 (polynomial 0x1D, initial value and
+    final XOR 0xFF), which is also used by the AUTOSAR E2E profiles.
+
+    :param data: The bytes to compute the checksum of.
+    :return: The checksum.
+    """
+    crc = 0xFF
+    for byte in data:
+        crc = _CRC8_J1850_TABLE[crc ^ byte]
+    return crc ^ 0xFF
+
+
+class RollingCounter:
+    """A counter in the data of a message that changes with every message."""
+
+    def __init__(self, byte: int, start_bit: int = 0, length: int = 4, step: int = 1):
+        """
+        :param byte: The index of the data byte holding the counter.
+        :param start_bit:
+            The least significant bit of the counter within the byte.
+        :param length: The number of bits of the counter.
+        :param step: The value added to the counter for every message.
+        """
+        if not 0 <= start_bit < 8 or not 0 < length <= 8 - start_bit:
+            raise ValueError("The counter has to fit into a single byte")
+        self.byte = byte
+        self.start_bit = start_bit
+        self.length = length
+        self.step = step
+
+    @property
+    def cycle_length(self) -> int:
+        """The number of messages after which the counter repeats."""
+        modulus = 1 << self.length
+        return modulus // math.gcd(self.step, modulus)
+
+    def apply(self, data: bytearray, index: int):
+        """Writes the counter value of the message with the given index.
+
+        The counter starts at zero.
+        """
+        mask = ((1 << self.length) - 1) << self.start_bit
+        value = (index * self.step) % (1 << self.length)
+        data[self.byte] = (data[self.byte] & ~mask & 0xFF) | (value << self.start_bit)
+
+
+class Crc8J1850:
+    """A checksum over the other data bytes of a message, see :func:`crc8_j1850`."""
+
+    def __init__(self, byte: int):
+        """
+        :param byte: The index of the data byte holding the checksum.
+        """
+        self.byte = byte
+
+    def apply(self, data: bytearray):
+        """Writes the checksum of the other bytes of the data."""
+        data[self.byte] = crc8_j1850(data[: self.byte] + data[self.byte + 1 :])
+
+
+class PayloadSpec:
+    """Describes how the data of cyclic messages changes with every message.
+
+    Pass it as the ``modifier_callback`` of :meth:`can.BusABC.send_periodic`.
+    As the payloads only depend on the number of messages sent before,
+    backends with a native broadcast manager can compute all of them in
+    advance instead of calling back into Python. The tasks apply the
+    specification to copies of their messages, counting the messages of
+    every task from its start, so a specification can be shared.
+    """
+
+    def __init__(
+        self, counter: Optional[RollingCounter] = None, crc: Optional[Crc8J1850] = None
+    ):
+        """
+        :param counter: The rolling counter, which is updated first.
+        :param crc: The checksum, which is updated afterwards.
+        """
+        self.counter = counter
+        self.crc = crc
+        self._index = 0
+
+    @property
+    def cycle_length(self) -> int:
+        """The number of messages after which the payloads repeat."""
+        return self.counter.cycle_length if self.counter is not None else 1
+
+    def apply(self, data: bytearray, index: int):
+        """Writes the payload of the message with the given index into the data.
+
+        :param data: The data of the original message.
+        :param index: The number of messages sent before.
+        """
+        if self.counter is not None:
+            self.counter.apply(data, index)
+        if self.crc is not None:
+            self.crc.apply(data)
+
+    def sequence(self, messages: Sequence[Message]) -> Tuple[Message, ...]:
+        """All messages that are sent until the payloads repeat.
+
+        :param messages: The messages of the cyclic task.
+        """
+        count = (
+            len(messages)
+            * self.cycle_length
+            // math.gcd(len(messages), self.cycle_length)
+        )
+        sequence = []
+        for index in range(count):
+            msg = copy.deepcopy(messages[index % len(messages)])
+            self.apply(msg.data, index)
+            sequence.append(msg)
+        return tuple(sequence)
+
+    def __call__(self, msg: Message):
+        """Updates the data of a message right before it is sent.
+
+        This is only used by tasks that do not know about specifications,
+        and counts the messages of all of them together.
+        """
+        self.apply(msg.data, self._index)
+        self._index += 1
+
+
+def _modified_message(
+    msg: Message, index: int, modifier_callback: Optional[Callable[[Message], None]]
+) -> Message:
+    """The message with the given index of a task, as it is sent."""
+    if isinstance(modifier_callback, PayloadSpec):
+        msg = copy.deepcopy(msg)
+        modifier_callback.apply(msg.data, index)
+    elif modifier_callback is not None:
+        modifier_callback(msg)
+    return msg
+
+
+class CyclicTaskStatistics:
+    """Timing statistics of a thread based cyclic send task.
+
+    The jitter of a message is the time by which sending it started after
+    its deadline. All times are given in seconds and are None as long as
+    no message was sent.
+    """
+
+    def __init__(self, window: int = 1000):
+        """
+        :param window:
+            The number of most recent messages that
+            :attr:`~CyclicTaskStatistics.p99_jitter` is computed from.
+        """
+        self._window = window
+        self.reset()
+
+    def reset(self):
+        """Start collecting the statistics anew."""
+        #: The number of messages that were sent
+        self.sent = 0
+        #: The number of deadlines that were skipped because the task was late
+        self.missed_deadlines = 0
+        #: The smallest jitter
+        self.min_jitter: Optional[float] = None
+        #: The largest jitter
+        self.max_jitter: Optional[float] = None
+        #: The time between the last two messages
+        self.last_period: Optional[float] = None
+        self._total_jitter = 0.0
+        self._recent_jitter: Deque[float] = collections.deque(maxlen=self._window)
+        self._last_sent: Optional[float] = None
+
+    @property
+    def mean_jitter(self) -> Optional[float]:
+        """The average jitter."""
+        return self._total_jitter / self.sent if self.sent else None
+
+    @property
+    def p99_jitter(self) -> Optional[float]:
+        """The jitter that 99 percent of the recent messages stayed below."""
+        recent = sorted(self._recent_jitter)
+        if not recent:
+            return None
+        return recent[math.ceil(len(recent) * 0.99) - 1]
+
+    def _add(self, deadline: float, sent: float):
+        jitter = sent - deadline
+        self.sent += 1
+        self._total_jitter += jitter
+        self._recent_jitter.append(jitter)
+        if self.min_jitter is None or jitter < self.min_jitter:
+            self.min_jitter = jitter
+        if self.max_jitter is None or jitter > self.max_jitter:
+            self.max_jitter = jitter
+        if self._last_sent is not None:
+            self.last_period = sent - self._last_sent
+        self._last_sent = sent
+
+    def __repr__(self) -> str:
+        return (
+            "{}(sent={}, missed_deadlines={}, min_jitter={}, mean_jitter={}, "
+            "max_jitter={}, p99_jitter={}, last_period={})".format(
+                self.__class__.__name__,
+                self.sent,
+                self.missed_deadlines,
+                self.min_jitter,
+                self.mean_jitter,
+                self.max_jitter,
+                self.p99_jitter,
+                self.last_period,
+            )
+        )
+
+
+def _next_deadline(
+    task: Union["ThreadBasedCyclicSendTask", "AsyncioCyclicSendTask"],
+    deadline: float,
+    now: float,
+    period: Optional[float] = None,
+) -> float:
+    """The deadline following the given one, by default after the period of the task."""
+    if period is None:
+        period = task.period
+    next_deadline = deadline + period
+    if next_deadline <= now:
+        # skip the deadlines that have passed already
+        missed = int((now - next_deadline) // period) + 1
+        task.statistics.missed_deadlines += missed
+        next_deadline += missed * period
+    return next_deadline
+
+
+class CyclicTaskScheduler:
+    """Sends the messages of many thread based cyclic tasks from one thread.
+
+    The tasks are kept in a heap ordered by the time they are due next, and
+    the messages of all tasks that are due at the same time are sent
+    together with :meth:`~can.BusABC.send_batch`. The thread is started when
+    the first task is scheduled and ends once no task is left.
+
+    Every bus uses its own scheduler for the tasks created by
+    :meth:`~can.BusABC.send_periodic`.
+
+    The deadlines of a task are multiples of its period after it was
+    started, so delays do not accumulate. If a task is so late that further
+    deadlines have passed, these are skipped and counted in
+    :attr:`CyclicTaskStatistics.missed_deadlines`.
+    """
+
+    def __init__(
+        self, name: str = "Cyclic send task scheduler", spin_threshold: float = 0.0
+    ):
+        """
+        :param name: The name of the thread.
+        :param spin_threshold:
+            The scheduler sleeps until this many seconds before the next
+            deadline and then busy-waits for the rest of the time. This makes
+            the timing much more precise, especially for periods below a
+            millisecond, at the cost of keeping one CPU core busy. It can also
+            be changed later on with the attribute of the same name.
+        """
+        self.name = name
+        self.spin_threshold = spin_threshold
+        self.thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, "ThreadBasedCyclicSendTask"]] = []
+        # the number of the heap entry of every scheduled task, any other
+        # entry of the task is stale and skipped
+        self._scheduled: Dict["ThreadBasedCyclicSendTask", int] = {}
+        # numbers the heap entries, which also breaks ties between tasks that
+        # are due at the same time
+        self._counter = itertools.count()
+
+        if HAS_EVENTS:
+            self._timer = win32event.CreateWaitableTimer(None, False, None)
+            self._wakeup = win32event.CreateEvent(None, False, False, None)
+        else:
+            self._wakeup = threading.Event()
+
+    def schedule(self, task: "ThreadBasedCyclicSendTask", deadline: float):
+        """Add a task to the scheduler, unless it is already scheduled.
+
+        :param task: The task to send the messages of.
+        :param deadline:
+            When the next message of the task is due, as a
+            :func:`time.perf_counter` value.
+        """
+        with self._lock:
+            if task in self._scheduled:
+                return
+            # a restarted task begins with its first message again
+            task._msg_index = 0
+            self._push(task, deadline)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def unschedule(self, task: "ThreadBasedCyclicSendTask"):
+        """Remove a task from the scheduler, if it is scheduled.
+
+        :param task: The task to stop sending the messages of.
+        """
+        with self._lock:
+            self._scheduled.pop(task, None)
+
+    def _push(self, task: "ThreadBasedCyclicSendTask", deadline: float):
+        entry = next(self._counter)
+        self._scheduled[task] = entry
+        heapq.heappush(self._heap, (deadline, entry, task))
+        if HAS_EVENTS:
+            win32event.SetEvent(self._wakeup)
+        else:
+            self._wakeup.set()
+
+    def _is_live(self, entry: int, task: "ThreadBasedCyclicSendTask") -> bool:
+        if self._scheduled.get(task) != entry:
+            return False
+        if task.stopped:
+            del self._scheduled[task]
+            return False
+        return True
+
+    def _wait(self, delay: float):
+        """Wait for the given time or until a task is scheduled."""
+        if HAS_EVENTS:
+            # relative times are negative and given in units of 100 ns
+            win32event.SetWaitableTimer(
+                self._timer.handle, -int(delay * 10000000), 0, None, None, False
+            )
+            win32event.WaitForMultipleObjects(
+                [self._timer, self._wakeup], False, win32event.INFINITE
+            )
+        else:
+            self._wakeup.wait(delay)
+
+    def _next_due(
+        self
+    ) -> Optional[List[Tuple[float, int, "ThreadBasedCyclicSendTask"]]]:
+        """Wait for the next tasks that are due.
+
+        :return:
+            The heap entries of the due tasks, or None if no task is left.
+        """
+        while True:
+            if not HAS_EVENTS:
+                # a task scheduled from now on sets the flag again
+                self._wakeup.clear()
+            with self._lock:
+                while self._heap and not self._is_live(*self._heap[0][1:]):
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self.thread = None
+                    return None
+
+                now = time.perf_counter()
+                if self._heap[0][0] <= now:
+                    due = []
+                    while self._heap and self._heap[0][0] <= now:
+                        deadline, entry, task = heapq.heappop(self._heap)
+                        if self._is_live(entry, task):
+                            due.append((deadline, entry, task))
+                    return due
+                deadline = self._heap[0][0]
+            if deadline - now > self.spin_threshold:
+                self._wait(deadline - now - self.spin_threshold)
+            else:
+                # sleeping is not precise enough for the last part
+                while time.perf_counter() < deadline:
+                    pass
+
+    def _run(self):
+        while True:
+            due = self._next_due()
+            if due is None:
+                return
+
+            # send the messages of each bus together
+            by_bus: Dict[int, List[Tuple[float, int, ThreadBasedCyclicSendTask]]] = {}
+            for deadline, entry, task in due:
+                by_bus.setdefault(id(task.bus), []).append((deadline, entry, task))
+
+            for entries in by_bus.values():
+                started = time.perf_counter()
+                failed = self._send([task for _, _, task in entries])
+                now = time.perf_counter()
+                with self._lock:
+                    for deadline, entry, task in entries:
+                        task.statistics._add(deadline, started)
+                        if self._scheduled.get(task) != entry:
+                            # stopped or restarted in the meantime
+                            continue
+                        if task in failed or task._finished(started):
+                            del self._scheduled[task]
+                        else:
+                            self._push(
+                                task,
+                                _next_deadline(
+                                    task, deadline, now, task._current_period()
+                                ),
+                            )
+
+    @staticmethod
+    def _send(
+        tasks: List["ThreadBasedCyclicSendTask"]
+    ) -> List["ThreadBasedCyclicSendTask"]:
+        """Send the next message of every task.
+
+        :return: The tasks whose message could not be sent.
+        """
+        bus = tasks[0].bus
+        send_lock = tasks[0].send_lock
+        failed = []
+        sending = []
+        msgs = []
+        for task in tasks:
+            try:
+                msgs.append(task._next_message())
+            except Exception as exc:
+                log.exception(exc)
+                failed.append(task)
+            else:
+                sending.append(task)
+
+        # Prevent calling bus.send from multiple threads
+        with send_lock:
+            sent = 0
+            if len(msgs) > 1:
+                try:
+                    sent = bus.send_batch(msgs)
+                except Exception as exc:
+                    log.exception(exc)
+            # send the remaining messages one by one to find the failing tasks
+            for task, msg in zip(sending[sent:], msgs[sent:]):
+                try:
+                    bus.send(msg)
+                except Exception as exc:
+                    log.exception(exc)
+                    failed.append(task)
+        return failed
+
+
 class ThreadBasedCyclicSendTask(
     ModifiableCyclicTaskABC, LimitedDurationCyclicSendTaskABC, RestartableCyclicTaskABC
 ):
-    """Fallback cyclic send task using thread."""
+    """Fallback cyclic send task using a scheduler thread.
+
+    The task stops when sending one of its messages fails.
+
+    Like :class:`MultiRateCyclicSendTaskABC`, the task can send the first
+    ``count`` messages at an ``initial_period`` and the following ones at
+    ``period``. The switch happens on the deadlines of the task, so it does
+    not shift the timing of the following messages.
+    """
 
     def __init__(
         self,
@@ -207,57 +684,159 @@ class ThreadBasedCyclicSendTask(
         messages: Union[Sequence[Message], Message],
         period: float,
         duration: Optional[float] = None,
+        scheduler: Optional[CyclicTaskScheduler] = None,
+        modifier_callback: Optional[Callable[[Message], None]] = None,
+        count: int = 0,
+        initial_period: Optional[float] = None,
     ):
+        """
+        :param bus: The bus to send the messages on.
+        :param lock: Held while sending on the bus.
+        :param messages:
+            The messages to be sent periodically.
+        :param period: The rate in seconds at which to send the messages.
+        :param duration:
+            Approximate duration in seconds to continue sending messages. If
+            no duration is provided, the task will continue indefinitely.
+        :param scheduler:
+            The scheduler to send the messages with. If not given, the task
+            gets a scheduler of its own.
+        :param modifier_callback:
+            Called with every message right before it is sent and may change
+            it, e.g. to update a counter. See :class:`PayloadSpec`.
+        :param count:
+            The number of messages that are sent at the ``initial_period``
+            after the task was started.
+        :param initial_period:
+            The rate in seconds at which to send the first ``count`` messages.
+        """
         super().__init__(messages, period, duration)
+        self.count = count
+        self.initial_period = initial_period if initial_period is not None else period
         self.bus = bus
         self.send_lock = lock
+        self.modifier_callback = modifier_callback
+        self.scheduler = scheduler or CyclicTaskScheduler(
+            "Cyclic send task for 0x%X" % self.arbitration_id
+        )
         self.stopped = True
-        self.thread = None
+        self.thread: Optional[threading.Thread] = None
         self.end_time = time.perf_counter() + duration if duration else None
-
-        if HAS_EVENTS:
-            self.period_ms: int = int(round(period * 1000, 0))
-            self.event = win32event.CreateWaitableTimer(None, False, None)
+        #: The timing of the sent messages
+        self.statistics = CyclicTaskStatistics()
+        self._msg_index = 0
 
         self.start()
 
     def stop(self):
-        if HAS_EVENTS:
-            win32event.CancelWaitableTimer(self.event.handle)
         self.stopped = True
+        self.scheduler.unschedule(self)
 
     def start(self):
         self.stopped = False
-        if self.thread is None or not self.thread.is_alive():
-            name = "Cyclic send task for 0x%X" % (self.messages[0].arbitration_id)
-            self.thread = threading.Thread(target=self._run, name=name)
-            self.thread.daemon = True
+        self.scheduler.schedule(self, time.perf_counter())
+        # the thread that sends the messages of this task
+        self.thread = self.scheduler.thread
+
+    def _next_message(self) -> Message:
+        index = self._msg_index
+        self._msg_index += 1
+        return _modified_message(
+            self.messages[index % len(self.messages)], index, self.modifier_callback
+        )
 
-            if HAS_EVENTS:
-                win32event.SetWaitableTimer(
-                    self.event.handle, 0, self.period_ms, None, None, False
-                )
+    def _finished(self, now: float) -> bool:
+        return self.end_time is not None and now >= self.end_time
 
-            self.thread.start()
+    def _current_period(self) -> float:
+        """The time between the message that was sent last and the next one."""
+        return self.initial_period if self._msg_index < self.count else self.period
 
-    def _run(self):
-        msg_index = 0
-        while not self.stopped:
-            # Prevent calling bus.send from multiple threads
-            with self.send_lock:
-                started = time.perf_counter()
-                try:
-                    self.bus.send(self.messages[msg_index])
-                except Exception as exc:
-                    log.exception(exc)
-                    break
-            if self.end_time is not None and time.perf_counter() >= self.end_time:
-                break
-            msg_index = (msg_index + 1) % len(self.messages)
 
-            if HAS_EVENTS:
-                win32event.WaitForSingleObject(self.event.handle, self.period_ms)
-            else:
-                # Compensate for the time it takes to send the message
-                delay = self.period - (time.perf_counter() - started)
-                time.sleep(max(0.0, delay))
+class AsyncioCyclicSendTask(
+    ModifiableCyclicTaskABC, LimitedDurationCyclicSendTaskABC, RestartableCyclicTaskABC
+):
+    """Cyclic send task that runs in an :mod:`asyncio` event loop.
+
+    The messages are sent from callbacks that are scheduled with
+    :meth:`~asyncio.AbstractEventLoop.call_at` on the clock of the loop, so
+    no threads or locks are involved. The task must therefore be created,
+    started and stopped from the thread running the loop, and the bus should
+    not block when sending.
+
+    The timing is handled like for :class:`ThreadBasedCyclicSendTask` and
+    the task stops when sending one of its messages fails.
+
+    Create the task with the ``loop`` argument of
+    :meth:`~can.BusABC.send_periodic`, so it is stopped together with the
+    other tasks of the bus.
+    """
+
+    def __init__(
+        self,
+        bus: "BusABC",
+        messages: Union[Sequence[Message], Message],
+        period: float,
+        duration: Optional[float] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        modifier_callback: Optional[Callable[[Message], None]] = None,
+    ):
+        """
+        :param bus: The bus to send the messages on.
+        :param messages:
+            The messages to be sent periodically.
+        :param period: The rate in seconds at which to send the messages.
+        :param duration:
+            Approximate duration in seconds to continue sending messages. If
+            no duration is provided, the task will continue indefinitely.
+        :param modifier_callback:
+            Called with every message right before it is sent and may change
+            it, see :class:`ThreadBasedCyclicSendTask`.
+        :param loop:
+            The event loop to run the task in, by default the current one.
+        """
+        super().__init__(messages, period, duration)
+        self.bus = bus
+        self.modifier_callback = modifier_callback
+        self.loop = loop or asyncio.get_event_loop()
+        self.stopped = True
+        self.end_time = self.loop.time() + duration if duration else None
+        #: The timing of the sent messages
+        self.statistics = CyclicTaskStatistics()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._msg_index = 0
+
+        self.start()
+
+    def stop(self):
+        self.stopped = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def start(self):
+        self.stopped = False
+        if self._handle is None:
+            self._msg_index = 0
+            self._schedule(self.loop.time())
+
+    def _schedule(self, deadline: float):
+        self._handle = self.loop.call_at(deadline, self._send, deadline)
+
+    def _send(self, deadline: float):
+        self._handle = None
+        started = self.loop.time()
+        index = self._msg_index
+        self._msg_index += 1
+        try:
+            msg = _modified_message(
+                self.messages[index % len(self.messages)], index, self.modifier_callback
+            )
+            self.bus.send(msg)
+        except Exception as exc:
+            log.exception(exc)
+            return
+        self.statistics._add(deadline, started)
+        if self.end_time is not None and started >= self.end_time:
+            return
+        self._schedule(_next_deadline(self, deadline, self.loop.time()))
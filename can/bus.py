@@ -2,23 +2,95 @@
 Contains the ABC bus implementation and its documentation.
 """
 
-from typing import Iterator, List, Optional, Sequence, Tuple, Union
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import can.typechecking
 
 from abc import ABCMeta, abstractmethod
+import asyncio
 import can
 import logging
 import threading
 from time import time
 from aenum import Enum, auto
 
-from can.broadcastmanager import ThreadBasedCyclicSendTask
+from can.broadcastmanager import (
+    AsyncioCyclicSendTask,
+    CyclicTaskScheduler,
+    ThreadBasedCyclicSendTask,
+)
 from can.message import Message
 
 LOG = logging.getLogger(__name__)
 
 
+#: The number of 11-bit arbitration IDs, for which filter results are precomputed
+_STANDARD_ID_COUNT = 0x800
+
+#: A list of ``(can_mask, {can_id & can_mask, ...})`` tuples
+_FilterBuckets = List[Tuple[int, FrozenSet[int]]]
+
+
+def _compile_filters(
+    filters: can.typechecking.CanFilters,
+) -> Tuple[bytearray, Tuple[_FilterBuckets, _FilterBuckets]]:
+    """Converts the given filters into a form that can be matched quickly by
+    :meth:`~can.BusABC._matches_filters`.
+
+    Filters with the same mask are grouped together, such that a single set
+    lookup of ``arbitration_id & can_mask`` checks all of them. This is done
+    separately for standard and extended messages, depending on whether the
+    filters apply to them. Additionally, the result for every possible 11-bit
+    ID is stored in a bitmap.
+
+    :param filters: See :meth:`~can.BusABC.set_filters` for details.
+    :return:
+        1.  a bitmap which is 1 at the index of every matching 11-bit ID
+        2.  the buckets for standard and for extended messages
+    """
+    buckets: Tuple[Dict[int, Set[int]], Dict[int, Set[int]]] = ({}, {})
+    for _filter in filters:
+        can_mask = _filter["can_mask"]
+        masked_can_id = _filter["can_id"] & can_mask
+        for is_extended_id in (False, True):
+            # check if this filter even applies to such messages
+            if "extended" in _filter and _filter["extended"] != is_extended_id:
+                continue
+            buckets[is_extended_id].setdefault(can_mask, set()).add(masked_can_id)
+
+    bitmap = bytearray(_STANDARD_ID_COUNT)
+    for can_mask, masked_can_ids in buckets[False].items():
+        free_bits = ~can_mask & (_STANDARD_ID_COUNT - 1)
+        for masked_can_id in masked_can_ids:
+            if not 0 <= masked_can_id < _STANDARD_ID_COUNT:
+                # requires bits to be set that no 11-bit ID has
+                continue
+            # mark every ID that only differs in the bits not covered by the mask
+            subset = free_bits
+            while True:
+                bitmap[masked_can_id | subset] = 1
+                if subset == 0:
+                    break
+                subset = (subset - 1) & free_bits
+
+    compiled_buckets = tuple(
+        [(can_mask, frozenset(ids)) for can_mask, ids in bucket.items()]
+        for bucket in buckets
+    )
+    return bitmap, compiled_buckets  # type: ignore
+
+
 class BusState(Enum):
     """The state in which a :class:`can.BusABC` can be."""
 
@@ -106,6 +178,108 @@ class BusABC(metaclass=ABCMeta):
                 else:
                     return None
 
+    def recv_batch(
+        self, max_messages: int = 64, timeout: Optional[float] = None
+    ) -> List[Message]:
+        """Block waiting for messages from the Bus and return all of
+        them that are ready at once.
+
+        This method blocks like :meth:`~can.BusABC.recv` until at least one
+        message passes the filters (or the timeout expires). Afterwards, all
+        further messages which are already available are read without
+        blocking, up to a total of *max_messages*.
+
+        :param max_messages:
+            the maximum number of messages to return in one call
+        :param timeout:
+            seconds to wait for the first message or None to wait indefinitely
+
+        :return:
+            A list of :class:`Message` objects in the order they were
+            received; empty on timeout.
+        :raises can.CanError:
+            if an error occurred while reading
+        """
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+
+        start = time()
+        time_left = timeout
+
+        while True:
+
+            # try to get some messages
+            msgs, already_filtered = self._recv_internal_batch(
+                max_messages, timeout=time_left
+            )
+
+            if msgs and not already_filtered:
+                msgs = [msg for msg in msgs if self._matches_filters(msg)]
+
+            # return them, if any matched
+            if msgs:
+                if LOG.isEnabledFor(self.RECV_LOGGING_LEVEL):
+                    for msg in msgs:
+                        LOG.log(self.RECV_LOGGING_LEVEL, "Received: %s", msg)
+                return msgs
+
+            # if not, and timeout is None, try indefinitely
+            elif timeout is None:
+                continue
+
+            # try again only if there still is time, and with
+            # reduced timeout
+            else:
+
+                time_left = timeout - (time() - start)
+
+                if time_left > 0:
+                    continue
+                else:
+                    return []
+
+    def _recv_internal_batch(
+        self, max_messages: int, timeout: Optional[float]
+    ) -> Tuple[List[Message], bool]:
+        """
+        Read up to *max_messages* messages from the bus and tell whether they
+        were filtered. This method is called by :meth:`~can.BusABC.recv_batch`
+        and should block for at most *timeout* seconds if no message is
+        available. Once a message was read, it must only collect those that
+        are available without blocking any further.
+
+        The default implementation calls :meth:`~can.BusABC._recv_internal`
+        repeatedly and applies the software filters itself. Interfaces which
+        can read several frames at once from the driver or operating system
+        may override this method to do so.
+
+        :param max_messages: the maximum number of messages to return
+        :param timeout: seconds to wait for the first message,
+                        see :meth:`~can.BusABC.recv`
+
+        :return:
+            1.  a list of messages that were read, empty on timeout
+            2.  a bool that is True if message filtering has already
+                been done and else False
+
+        :raises can.CanError:
+            if an error occurred while reading
+        """
+        msgs: List[Message] = []
+        try:
+            msg, already_filtered = self._recv_internal(timeout=timeout)
+        except NotImplementedError:
+            # legacy interfaces only provide their own recv() implementation
+            msg = self.recv(timeout)
+            return ([msg] if msg is not None else []), True
+        while msg is not None:
+            if already_filtered or self._matches_filters(msg):
+                msgs.append(msg)
+                if len(msgs) >= max_messages:
+                    break
+            msg, already_filtered = self._recv_internal(timeout=0.0)
+        return msgs, True
+
     def _recv_internal(
         self, timeout: Optional[float]
     ) -> Tuple[Optional[Message], bool]:
@@ -170,12 +344,57 @@ class BusABC(metaclass=ABCMeta):
         """
         raise NotImplementedError("Trying to write to a readonly bus?")
 
+    def send_batch(
+        self, msgs: Sequence[Message], timeout: Optional[float] = None
+    ) -> int:
+        """Transmit several messages to the CAN bus in the given order.
+
+        Messages are sent until all of them were accepted or until one of
+        them could not be sent (for example because the transmit buffer is
+        full). The return value tells the caller how many messages were
+        actually accepted, so that the remaining ones can be retried later.
+
+        Override this method to enable a more efficient backend specific
+        approach. The default implementation calls :meth:`~can.BusABC.send`
+        for every message.
+
+        :param msgs: the messages to transmit
+
+        :param timeout:
+            If > 0, wait up to this many seconds in total for all messages
+            to be sent, see :meth:`~can.BusABC.send`.
+            None blocks indefinitely.
+
+        :return: the number of messages that were sent, starting at the first
+        :raises can.CanError:
+            if not even the first message could be sent
+        """
+        started = time()
+        time_left = timeout
+        sent = 0
+
+        for msg in msgs:
+            if timeout is not None:
+                time_left = max(0.0, timeout - (time() - started))
+            try:
+                self.send(msg, time_left)
+            except can.CanError as exc:
+                if sent == 0:
+                    raise
+                LOG.debug("Stopped sending batch after %d messages: %s", sent, exc)
+                break
+            sent += 1
+
+        return sent
+
     def send_periodic(
         self,
         msgs: Union[Sequence[Message], Message],
         period: float,
         duration: Optional[float] = None,
         store_task: bool = True,
+        modifier_callback: Optional[Callable[[Message], None]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
     ) -> can.broadcastmanager.CyclicSendTaskABC:
         """Start sending messages at a given period on this bus.
 
@@ -197,6 +416,18 @@ class BusABC(metaclass=ABCMeta):
         :param store_task:
             If True (the default) the task will be attached to this Bus instance.
             Disable to instead manage tasks manually.
+        :param modifier_callback:
+            Called with every message right before it is sent and may change
+            its data, e.g. to update a rolling counter and a checksum. A
+            :class:`~can.broadcastmanager.PayloadSpec` describes such changes
+            in a way that backends with a native broadcast manager can
+            compute in advance. Other callbacks are run by the thread based
+            fallback.
+        :param loop:
+            Send the messages from this :mod:`asyncio` event loop with an
+            :class:`~can.broadcastmanager.AsyncioCyclicSendTask` instead of
+            using the backend or a thread. The task must then be stopped from
+            the thread running the loop.
         :return:
             A started task instance. Note the task can be stopped (and depending on
             the backend modified) by calling the :meth:`stop` method.
@@ -222,7 +453,78 @@ class BusABC(metaclass=ABCMeta):
                 raise ValueError("Must be either a list, tuple, or a Message")
         if not msgs:
             raise ValueError("Must be at least a list or tuple of length 1")
-        task = self._send_periodic_internal(msgs, period, duration)
+        task: can.broadcastmanager.CyclicSendTaskABC
+        if loop is not None:
+            task = AsyncioCyclicSendTask(
+                self,
+                msgs,
+                period,
+                duration,
+                loop=loop,
+                modifier_callback=modifier_callback,
+            )
+        elif modifier_callback is None:
+            task = self._send_periodic_internal(msgs, period, duration)
+        else:
+            task = self._send_periodic_internal(
+                msgs, period, duration, modifier_callback=modifier_callback
+            )
+        return self._register_periodic_task(task, store_task)
+
+    def send_periodic_multirate(
+        self,
+        msgs: Union[Sequence[Message], Message],
+        count: int,
+        initial_period: float,
+        subsequent_period: float,
+        store_task: bool = True,
+    ) -> can.broadcastmanager.CyclicSendTaskABC:
+        """Start sending messages quickly for a while, and slower afterwards.
+
+        The first ``count`` messages are sent ``initial_period`` seconds
+        apart, and the following ones ``subsequent_period`` seconds apart.
+        The task is active until it is stopped like the tasks of
+        :meth:`~can.BusABC.send_periodic`.
+
+        :param msgs:
+            Messages to transmit
+        :param count:
+            The number of messages to send at the initial period
+        :param initial_period:
+            Period in seconds between the first ``count`` messages
+        :param subsequent_period:
+            Period in seconds between the following messages
+        :param store_task:
+            If True (the default) the task will be attached to this Bus instance.
+            Disable to instead manage tasks manually.
+        :return:
+            A started task instance.
+        """
+        msgs = can.broadcastmanager.CyclicSendTaskABC._check_and_convert_messages(msgs)
+        task = self._send_periodic_multirate_internal(
+            msgs, count, initial_period, subsequent_period
+        )
+        return self._register_periodic_task(task, store_task)
+
+    def _send_periodic_multirate_internal(
+        self,
+        msgs: Sequence[Message],
+        count: int,
+        initial_period: float,
+        subsequent_period: float,
+    ) -> can.broadcastmanager.CyclicSendTaskABC:
+        """Default implementation of multi-rate periodic message sending,
+        which uses the same thread as :meth:`~can.BusABC._send_periodic_internal`.
+
+        Override this method to enable a more efficient backend specific approach.
+        """
+        return self._create_thread_based_task(
+            msgs, subsequent_period, count=count, initial_period=initial_period
+        )
+
+    def _register_periodic_task(
+        self, task: can.broadcastmanager.CyclicSendTaskABC, store_task: bool
+    ) -> can.broadcastmanager.CyclicSendTaskABC:
         # we wrap the task's stop method to also remove it from the Bus's list of tasks
         original_stop_method = task.stop
 
@@ -246,10 +548,13 @@ class BusABC(metaclass=ABCMeta):
         msgs: Union[Sequence[Message], Message],
         period: float,
         duration: Optional[float] = None,
+        modifier_callback: Optional[Callable[[Message], None]] = None,
     ) -> can.broadcastmanager.CyclicSendTaskABC:
         """Default implementation of periodic message sending using threading.
 
         Override this method to enable a more efficient backend specific approach.
+        Overriding methods should fall back to this one for a
+        ``modifier_callback`` they cannot handle, which is only passed if given.
 
         :param msgs:
             Messages to transmit
@@ -258,18 +563,39 @@ class BusABC(metaclass=ABCMeta):
         :param duration:
             The duration between sending each message at the given rate. If
             no duration is provided, the task will continue indefinitely.
+        :param modifier_callback:
+            Called with every message right before it is sent.
         :return:
             A started task instance. Note the task can be stopped (and
             depending on the backend modified) by calling the :meth:`stop`
             method.
         """
+        msgs = can.broadcastmanager.CyclicSendTaskABC._check_and_convert_messages(msgs)
+        return self._create_thread_based_task(
+            msgs, period, duration, modifier_callback=modifier_callback
+        )
+
+    def _create_thread_based_task(
+        self, msgs: Sequence[Message], period: float, duration=None, **kwargs
+    ) -> ThreadBasedCyclicSendTask:
         if not hasattr(self, "_lock_send_periodic"):
             # Create a send lock for this bus, but not for buses which override this method
             self._lock_send_periodic = (
                 threading.Lock()
             )  # pylint: disable=attribute-defined-outside-init
+        if not hasattr(self, "_cyclic_scheduler"):
+            # All tasks of this bus are sent from a single thread
+            self._cyclic_scheduler = CyclicTaskScheduler(
+                "Cyclic send task scheduler for %s" % self.channel_info
+            )  # pylint: disable=attribute-defined-outside-init
         task = ThreadBasedCyclicSendTask(
-            self, self._lock_send_periodic, msgs, period, duration
+            self,
+            self._lock_send_periodic,
+            msgs,
+            period,
+            duration,
+            scheduler=self._cyclic_scheduler,
+            **kwargs
         )
         return task
 
@@ -340,6 +666,8 @@ class BusABC(metaclass=ABCMeta):
             messages based only on the arbitration ID and mask.
         """
         self._filters = filters or None
+        if self._filters is not None:
+            self._filter_bitmap, self._filter_buckets = _compile_filters(self._filters)
         self._apply_filters(self._filters)
 
     def _apply_filters(self, filters: Optional[can.typechecking.CanFilters]):
@@ -367,19 +695,20 @@ class BusABC(metaclass=ABCMeta):
         if self._filters is None:
             return True
 
-        for _filter in self._filters:
-            # check if this filter even applies to the message
-            if "extended" in _filter and _filter["extended"] != msg.is_extended_id:
-                continue
-
-            # then check for the mask and id
-            can_id = _filter["can_id"]
-            can_mask = _filter["can_mask"]
-
-            # basically, we compute
-            # `msg.arbitration_id & can_mask == can_id & can_mask`
-            # by using the shorter, but equivalent from below:
-            if (can_id ^ msg.arbitration_id) & can_mask == 0:
+        arbitration_id = msg.arbitration_id
+        if msg.is_extended_id:
+            buckets = self._filter_buckets[1]
+        elif 0 <= arbitration_id < _STANDARD_ID_COUNT:
+            # the result for every 11-bit ID has already been computed
+            return self._filter_bitmap[arbitration_id] == 1
+        else:
+            buckets = self._filter_buckets[0]
+
+        # basically, we compute
+        # `msg.arbitration_id & can_mask == can_id & can_mask`
+        # for all filters sharing the same mask at once
+        for can_mask, masked_can_ids in buckets:
+            if arbitration_id & can_mask in masked_can_ids:
                 return True
 
         # nothing matched
@@ -10,6 +10,8 @@ from pkg_resources import iter_entry_points
 BACKENDS = {
     "kvaser": ("can.interfaces.kvaser", "KvaserBus"),
     "socketcan": ("can.interfaces.socketcan", "SocketcanBus"),
+    "socketcan_multi": ("can.interfaces.socketcan", "MultiSocketcanBus"),
+    "socketcan_bcm": ("can.interfaces.socketcan", "SocketcanBcmBus"),
     "serial": ("can.interfaces.serial.serial_can", "SerialBus"),
     "pcan": ("can.interfaces.pcan", "PcanBus"),
     "usb2can": ("can.interfaces.usb2can", "Usb2canBus"),
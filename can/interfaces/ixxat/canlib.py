@@ -689,8 +689,15 @@ class IXXATBus(BusABC):
         else:
             _canlib.canChannelPostMessage(self._channel_handle, message)
 
-    def _send_periodic_internal(self, msg, period, duration=None):
+    def _send_periodic_internal(
+        self, msg, period, duration=None, modifier_callback=None
+    ):
         """Send a message using built-in cyclic transmit list functionality."""
+        if modifier_callback is not None:
+            # the cyclic transmit list cannot change the messages
+            return super()._send_periodic_internal(
+                msg, period, duration, modifier_callback
+            )
         if self._scheduler is None:
             self._scheduler = HANDLE()
             _canlib.canSchedulerOpen(self._device_handle, self.channel, self._scheduler)
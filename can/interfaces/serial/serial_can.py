@@ -86,6 +86,39 @@ class SerialBus(BusABC):
             used instead.
 
         """
+        self.ser.write(self._build_frame(msg))
+
+    def send_batch(self, msgs, timeout=None):
+        """
+        Send several messages over the serial device with a single write.
+
+        :param List[can.Message] msgs:
+            Messages to send, see :meth:`~can.interfaces.serial.SerialBus.send`.
+
+        :param timeout:
+            This parameter will be ignored. The timeout value of the channel is
+            used instead.
+
+        :returns:
+            The number of messages that were written completely.
+
+        :rtype:
+            int
+        """
+        frames = [self._build_frame(msg) for msg in msgs]
+        written = self.ser.write(b"".join(frames))
+        if written is None:
+            return len(frames)
+        sent = 0
+        for frame in frames:
+            written -= len(frame)
+            if written < 0:
+                break
+            sent += 1
+        return sent
+
+    @staticmethod
+    def _build_frame(msg):
         try:
             timestamp = struct.pack("<I", int(msg.timestamp * 1000))
         except struct.error:
@@ -104,7 +137,7 @@ class SerialBus(BusABC):
         for i in range(0, msg.dlc):
             byte_msg.append(msg.data[i])
         byte_msg.append(0xBB)
-        self.ser.write(byte_msg)
+        return byte_msg
 
     def _recv_internal(self, timeout):
         """
@@ -226,6 +226,23 @@ class slcanBus(BusABC):
     def send(self, msg, timeout=None):
         if timeout != self.serialPortOrig.write_timeout:
             self.serialPortOrig.write_timeout = timeout
+        self._write(self._format_message(msg))
+
+    def send_batch(self, msgs, timeout=None):
+        if timeout != self.serialPortOrig.write_timeout:
+            self.serialPortOrig.write_timeout = timeout
+        # all frames are written at once and counted by their terminators
+        data = b"".join(
+            self._format_message(msg).encode() + self.LINE_TERMINATOR for msg in msgs
+        )
+        written = self.serialPortOrig.write(data)
+        self.serialPortOrig.flush()
+        if written is None:
+            return len(msgs)
+        return data[:written].count(self.LINE_TERMINATOR)
+
+    @staticmethod
+    def _format_message(msg):
         if msg.is_remote_frame:
             if msg.is_extended_id:
                 sendStr = "R%08X%d" % (msg.arbitration_id, msg.dlc)
@@ -237,7 +254,7 @@ class slcanBus(BusABC):
             else:
                 sendStr = "t%03X%d" % (msg.arbitration_id, msg.dlc)
             sendStr += "".join(["%02X" % b for b in msg.data])
-        self._write(sendStr)
+        return sendStr
 
     def shutdown(self):
         self.close()
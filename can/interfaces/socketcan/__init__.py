@@ -2,4 +2,10 @@
 See: https://www.kernel.org/doc/Documentation/networking/can.txt
 """
 
-from .socketcan import SocketcanBus, CyclicSendTask, MultiRateCyclicSendTask
+from .socketcan import (
+    SocketcanBus,
+    MultiSocketcanBus,
+    SocketcanBcmBus,
+    CyclicSendTask,
+    MultiRateCyclicSendTask,
+)
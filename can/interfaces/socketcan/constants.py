@@ -10,6 +10,18 @@ CAN_EFF_FLAG = 0x80000000
 CAN_BCM_TX_SETUP = 1
 CAN_BCM_TX_DELETE = 2
 CAN_BCM_TX_READ = 3
+CAN_BCM_TX_SEND = 4
+CAN_BCM_RX_SETUP = 5
+CAN_BCM_RX_DELETE = 6
+CAN_BCM_RX_READ = 7
+CAN_BCM_TX_STATUS = 8
+CAN_BCM_TX_EXPIRED = 9
+CAN_BCM_RX_STATUS = 10
+CAN_BCM_RX_TIMEOUT = 11
+CAN_BCM_RX_CHANGED = 12
+
+# the maximum number of frames of a single BCM job
+CAN_BCM_MAX_NFRAMES = 256
 
 # BCM flags
 SETTIMER = 0x0001
@@ -45,6 +57,11 @@ SOCK_RAW = 3
 SOCK_DGRAM = 2
 AF_CAN = PF_CAN
 
+# socket options of SOL_SOCKET not exposed by the socket module
+SO_TIMESTAMP = 29
+SO_TIMESTAMPNS = 35
+SO_RXQ_OVFL = 40
+
 SIOCGIFNAME = 0x8910
 SIOCGIFINDEX = 0x8933
 SIOCGSTAMP = 0x8906
@@ -5,6 +5,7 @@ along some internal methods.
 At the end of the file the usage of the internal methods is shown.
 """
 
+import collections
 import logging
 import ctypes
 import ctypes.util
@@ -30,9 +31,25 @@ from can.broadcastmanager import (
     ModifiableCyclicTaskABC,
     RestartableCyclicTaskABC,
     LimitedDurationCyclicSendTaskABC,
+    PayloadSpec,
 )
 from can.interfaces.socketcan.constants import *  # CAN_RAW, CAN_*_FLAG
-from can.interfaces.socketcan.utils import pack_filters, find_available_interfaces
+from can.interfaces.socketcan.utils import (
+    pack_filters,
+    find_available_interfaces,
+    error_code_to_str,
+)
+
+# sendmmsg() and recvmmsg() are not exposed by the socket module, so they are
+# called through libc
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    _libc_sendmmsg = _libc.sendmmsg
+    _libc_recvmmsg = _libc.recvmmsg
+except (OSError, AttributeError, TypeError):
+    log.info("sendmmsg() and recvmmsg() not available on this platform")
+    _libc_sendmmsg = None
+    _libc_recvmmsg = None
 
 
 # Setup BCM struct
@@ -114,6 +131,88 @@ BcmMsgHead = bcm_header_factory(
 )
 
 
+# The structures used for sendmmsg(), see <sys/socket.h> and <bits/uio.h>
+#
+#     struct iovec {
+#     	void *iov_base;
+#     	size_t iov_len;
+#     };
+#
+#     struct msghdr {
+#     	void *msg_name;
+#     	socklen_t msg_namelen;
+#     	struct iovec *msg_iov;
+#     	size_t msg_iovlen;
+#     	void *msg_control;
+#     	size_t msg_controllen;
+#     	int msg_flags;
+#     };
+#
+#     struct mmsghdr {
+#     	struct msghdr msg_hdr;
+#     	unsigned int msg_len;
+#     };
+class IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+if _libc_sendmmsg is not None:
+    _libc_sendmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(MMsgHdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+    ]
+    _libc_sendmmsg.restype = ctypes.c_int
+
+    # the last argument is a `struct timespec *`, but only NULL is passed
+    _libc_recvmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(MMsgHdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+        ctypes.c_void_p,
+    ]
+    _libc_recvmmsg.restype = ctypes.c_int
+
+# The header of each control message in the ancillary data, see <bits/socket.h>
+#
+#     struct cmsghdr {
+#     	size_t cmsg_len;
+#     	int cmsg_level;
+#     	int cmsg_type;
+#     	unsigned char __cmsg_data[];
+#     };
+CMSG_HEADER_STRUCT = struct.Struct("@Nii")
+CMSG_ALIGNMENT = ctypes.sizeof(ctypes.c_size_t)
+
+# The beginning of the address of a received frame, see <linux/can.h>
+#
+#     struct sockaddr_can {
+#     	__kernel_sa_family_t can_family;
+#     	int can_ifindex;
+#     	union { ... } can_addr;
+#     };
+SOCKADDR_CAN_STRUCT = struct.Struct("@Hi")
+SOCKADDR_CAN_SIZE = 24
+
+
 # struct module defines a binary packing format:
 # https://docs.python.org/3/library/struct.html#struct-format-strings
 # The 32bit can id is directly followed by the 8bit data link count
@@ -121,6 +220,18 @@ BcmMsgHead = bcm_header_factory(
 # which aligns the data field to an 8 byte boundary.
 CAN_FRAME_HEADER_STRUCT = struct.Struct("=IBB2x")
 
+# The receive timestamp is a `struct timespec` when SO_TIMESTAMPNS is enabled
+# and a `struct timeval` when using SIOCGSTAMP, both consisting of two longs
+TIMESTAMP_STRUCT = struct.Struct("@ll")
+# The number of frames dropped by the kernel when SO_RXQ_OVFL is enabled
+DROP_COUNTER_STRUCT = struct.Struct("@I")
+RECEIVED_ANCILLARY_BUFFER_SIZE = (
+    socket.CMSG_SPACE(TIMESTAMP_STRUCT.size)
+    + socket.CMSG_SPACE(DROP_COUNTER_STRUCT.size)
+    if hasattr(socket, "CMSG_SPACE")
+    else 0
+)
+
 
 def build_can_frame(msg):
     """ CAN frame packing/unpacking (see 'struct can_frame' in <linux/can.h>)
@@ -206,14 +317,8 @@ def build_bcm_transmit_header(
         # Note `TX_COUNTEVT` creates the message TX_EXPIRED when count expires
         flags |= TX_COUNTEVT
 
-    def split_time(value):
-        """Given seconds as a float, return whole seconds and microseconds"""
-        seconds = int(value)
-        microseconds = int(1e6 * (value - seconds))
-        return seconds, microseconds
-
-    ival1_seconds, ival1_usec = split_time(initial_period)
-    ival2_seconds, ival2_usec = split_time(subsequent_period)
+    ival1_seconds, ival1_usec = _split_time(initial_period)
+    ival2_seconds, ival2_usec = _split_time(subsequent_period)
 
     return build_bcm_header(
         opcode,
@@ -232,6 +337,38 @@ def build_bcm_update_header(can_id, msg_flags, nframes=1):
     return build_bcm_header(CAN_BCM_TX_SETUP, msg_flags, 0, 0, 0, 0, 0, can_id, nframes)
 
 
+def build_bcm_rx_setup_header(can_id, flags, timeout, throttle, nframes=1):
+    """
+    :param float timeout:
+        The time in seconds after which a missing frame is reported
+        with ``RX_TIMEOUT`` (``ival1``), or 0.
+    :param float throttle:
+        The minimum time in seconds between two ``RX_CHANGED``
+        notifications (``ival2``), or 0.
+    """
+    ival1_seconds, ival1_usec = _split_time(timeout)
+    ival2_seconds, ival2_usec = _split_time(throttle)
+
+    return build_bcm_header(
+        CAN_BCM_RX_SETUP,
+        flags,
+        0,
+        ival1_seconds,
+        ival1_usec,
+        ival2_seconds,
+        ival2_usec,
+        can_id,
+        nframes,
+    )
+
+
+def _split_time(value):
+    """Given seconds as a float, return whole seconds and microseconds"""
+    seconds = int(value)
+    microseconds = int(1e6 * (value - seconds))
+    return seconds, microseconds
+
+
 def dissect_can_frame(frame):
     can_id, can_dlc, flags = CAN_FRAME_HEADER_STRUCT.unpack_from(frame)
     if len(frame) != CANFD_MTU:
@@ -300,7 +437,9 @@ class CyclicSendTask(
 
     """
 
-    def __init__(self, bcm_socket, messages, period, duration=None):
+    def __init__(
+        self, bcm_socket, messages, period, duration=None, modifier_callback=None
+    ):
         """
         :param bcm_socket: An open BCM socket on the desired CAN channel.
         :param Union[Sequence[can.Message], can.Message] messages:
@@ -309,6 +448,9 @@ class CyclicSendTask(
             The rate in seconds at which to send the messages.
         :param float duration:
             Approximate duration in seconds to send the messages for.
+        :param can.broadcastmanager.PayloadSpec modifier_callback:
+            If given, the Broadcast Manager sends the payloads computed from
+            the messages in turn, see :func:`_precompute_payloads`.
         """
         # The following are assigned by LimitedDurationCyclicSendTaskABC:
         #   - self.messages
@@ -317,9 +459,22 @@ class CyclicSendTask(
         super().__init__(messages, period, duration)
 
         self.bcm_socket = bcm_socket
+        self.modifier_callback = modifier_callback
         self._tx_setup(self.messages)
 
+    def _frames(self, messages):
+        """The messages the Broadcast Manager sends in turn."""
+        if self.modifier_callback is None:
+            return messages
+        sequence = _precompute_payloads(messages, self.modifier_callback)
+        if sequence is None:
+            raise ValueError(
+                "The payloads of the messages cannot be computed in advance"
+            )
+        return sequence
+
     def _tx_setup(self, messages):
+        messages = self._frames(messages)
         # Create a low level packed frame to pass to the kernel
         header = bytearray()
         body = bytearray()
@@ -402,13 +557,14 @@ class CyclicSendTask(
         self._check_modified_messages(messages)
 
         self.messages = messages
+        frames = self._frames(messages)
 
         header = bytearray()
         body = bytearray()
         header = build_bcm_update_header(
-            can_id=self.can_id_with_flags, msg_flags=self.flags, nframes=len(messages)
+            can_id=self.can_id_with_flags, msg_flags=self.flags, nframes=len(frames)
         )
-        for message in messages:
+        for message in frames:
             body += build_can_frame(message)
         log.debug("Sending BCM command")
         send_bcm(self.bcm_socket, header + body)
@@ -444,6 +600,57 @@ class MultiRateCyclicSendTask(CyclicSendTask):
         send_bcm(self.bcm_socket, header + body)
 
 
+def _precompute_payloads(msgs, modifier_callback):
+    """
+    Computes all messages of a cyclic task with a
+    :class:`~can.broadcastmanager.PayloadSpec` in advance, such that the
+    Broadcast Manager can send them in turn.
+
+    :return:
+        The messages, or None if the callback is no such specification or
+        needs more frames than the Broadcast Manager supports.
+    """
+    if not isinstance(modifier_callback, PayloadSpec):
+        return None
+    sequence = modifier_callback.sequence(msgs)
+    if len(sequence) > CAN_BCM_MAX_NFRAMES:
+        return None
+    return sequence
+
+
+def send_frames(sock, frames):
+    """
+    Sends several raw frames over the given socket using a single
+    ``sendmmsg()`` system call without blocking.
+
+    :param socket.socket sock:
+        The socket to send the frames with.
+    :param List[bytes] frames:
+        The packed frames, see :func:`build_can_frame`.
+
+    :return: The number of frames that were sent, starting at the first one.
+    :raises can.CanError:
+        If sending failed for other reasons than a full transmit buffer.
+    """
+    count = len(frames)
+    iovecs = (IoVec * count)()
+    msgvec = (MMsgHdr * count)()
+    buffers = [ctypes.create_string_buffer(frame, len(frame)) for frame in frames]
+    for index, buffer in enumerate(buffers):
+        iovecs[index].iov_base = ctypes.addressof(buffer)
+        iovecs[index].iov_len = len(buffer)
+        msgvec[index].msg_hdr.msg_iov = ctypes.pointer(iovecs[index])
+        msgvec[index].msg_hdr.msg_iovlen = 1
+
+    sent = _libc_sendmmsg(sock.fileno(), msgvec, count, socket.MSG_DONTWAIT)
+    if sent < 0:
+        error = ctypes.get_errno()
+        if error in (errno.EAGAIN, errno.ENOBUFS):
+            return 0
+        raise can.CanError("Failed to transmit: %s" % error_code_to_str(error))
+    return sent
+
+
 def create_socket():
     """Creates a raw CAN socket. The socket will
     be returned unbound to any interface.
@@ -469,7 +676,56 @@ def bind_socket(sock, channel="can0"):
     log.debug("Bound socket.")
 
 
-def capture_message(sock, get_channel=False):
+def enable_ancillary_timestamps(sock):
+    """
+    Makes the kernel attach the receive timestamp of every frame in
+    nanosecond resolution to the ancillary data of the socket, such that
+    it can be read along with the frame by :func:`capture_message`.
+
+    :param socket.socket sock:
+        The socket to enable the timestamps on.
+    :raises OSError:
+        If the option is not supported.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+
+
+def _timestamp_from_ancillary_data(ancillary_data):
+    for cmsg_level, cmsg_type, cmsg_data in ancillary_data:
+        if cmsg_level == socket.SOL_SOCKET and cmsg_type == SO_TIMESTAMPNS:
+            seconds, nanoseconds = TIMESTAMP_STRUCT.unpack_from(cmsg_data)
+            return seconds + nanoseconds * 1e-9
+    return None
+
+
+def enable_drop_counter(sock):
+    """
+    Makes the kernel attach the total number of frames that were dropped
+    on the given socket so far to the ancillary data of received frames.
+    Frames are dropped if the receive buffer of the socket is full.
+
+    :param socket.socket sock:
+        The socket to enable the counter on.
+    :raises OSError:
+        If the option is not supported.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+
+
+def _dropped_frames_from_ancillary_data(ancillary_data):
+    for cmsg_level, cmsg_type, cmsg_data in ancillary_data:
+        if cmsg_level == socket.SOL_SOCKET and cmsg_type == SO_RXQ_OVFL:
+            return DROP_COUNTER_STRUCT.unpack_from(cmsg_data)[0]
+    return None
+
+
+def _timestamp_from_ioctl(sock):
+    res = fcntl.ioctl(sock, SIOCGSTAMP, TIMESTAMP_STRUCT.pack(0, 0))
+    seconds, microseconds = TIMESTAMP_STRUCT.unpack(res)
+    return seconds + microseconds * 1e-6
+
+
+def capture_message(sock, get_channel=False, ancillary_timestamps=False):
     """
     Captures a message from given socket.
 
@@ -477,29 +733,55 @@ def capture_message(sock, get_channel=False):
         The socket to read a message from.
     :param bool get_channel:
         Find out which channel the message comes from.
+    :param bool ancillary_timestamps:
+        Read the timestamp from the ancillary data in the same system call
+        as the frame instead of doing a separate ``ioctl()``. Requires
+        :func:`enable_ancillary_timestamps` to be called on the socket first.
 
     :return: The received message, or None on failure.
     """
+    cf, ancillary_data, channel = _capture_frame(
+        sock, get_channel, ancillary_data=ancillary_timestamps
+    )
+
+    # Fetching the timestamp, if it was not part of the ancillary data
+    timestamp = _timestamp_from_ancillary_data(ancillary_data)
+    if timestamp is None:
+        timestamp = _timestamp_from_ioctl(sock)
+
+    return _message_from_frame(cf, timestamp, channel)
+
+
+def _capture_frame(sock, get_channel, ancillary_data=False):
     # Fetching the Arb ID, DLC and Data
     try:
-        if get_channel:
+        if ancillary_data:
+            cf, ancdata, _, addr = sock.recvmsg(
+                CANFD_MTU, RECEIVED_ANCILLARY_BUFFER_SIZE
+            )
+            if get_channel:
+                channel = addr[0] if isinstance(addr, tuple) else addr
+            else:
+                channel = None
+            return cf, ancdata, channel
+        elif get_channel:
             cf, addr = sock.recvfrom(CANFD_MTU)
             channel = addr[0] if isinstance(addr, tuple) else addr
         else:
             cf = sock.recv(CANFD_MTU)
             channel = None
+    except BlockingIOError:
+        # only raised by nonblocking sockets, if no frame is available
+        raise
     except socket.error as exc:
         raise can.CanError("Error receiving: %s" % exc)
 
-    can_id, can_dlc, flags, data = dissect_can_frame(cf)
-    # log.debug('Received: can_id=%x, can_dlc=%x, data=%s', can_id, can_dlc, data)
+    return cf, [], channel
 
-    # Fetching the timestamp
-    binary_structure = "@LL"
-    res = fcntl.ioctl(sock, SIOCGSTAMP, struct.pack(binary_structure, 0, 0))
 
-    seconds, microseconds = struct.unpack(binary_structure, res)
-    timestamp = seconds + microseconds * 1e-6
+def _message_from_frame(cf, timestamp, channel):
+    can_id, can_dlc, flags, data = dissect_can_frame(cf)
+    # log.debug('Received: can_id=%x, can_dlc=%x, data=%s', can_id, can_dlc, data)
 
     # EXT, RTR, ERR flags -> boolean attributes
     #   /* special address description flags for the CAN_ID */
@@ -540,12 +822,122 @@ def capture_message(sock, get_channel=False):
     return msg
 
 
+def _parse_ancillary_data(data):
+    """Splits the raw ancillary data into a list of
+    ``(cmsg_level, cmsg_type, cmsg_data)`` tuples like :meth:`socket.socket.recvmsg`.
+    """
+    ancillary_data = []
+    offset = 0
+    data_offset = socket.CMSG_LEN(0)
+    while offset + data_offset <= len(data):
+        cmsg_len, cmsg_level, cmsg_type = CMSG_HEADER_STRUCT.unpack_from(data, offset)
+        if cmsg_len < data_offset:
+            break
+        cmsg_data = data[offset + data_offset : offset + cmsg_len]
+        ancillary_data.append((cmsg_level, cmsg_type, cmsg_data))
+        # the next header starts at the next aligned offset
+        offset += (cmsg_len + CMSG_ALIGNMENT - 1) & ~(CMSG_ALIGNMENT - 1)
+    return ancillary_data
+
+
+class MultiFrameReceiver:
+    """
+    Receives several frames with a single ``recvmmsg()`` system call into
+    buffers that are allocated once and reused afterwards.
+
+    Every frame is returned along with its ancillary data and the index
+    of the interface it was received on.
+    """
+
+    def __init__(self, size=64):
+        """
+        :param int size:
+            The maximum number of frames that can be received at once.
+        """
+        self.size = size
+        self._frames = (ctypes.c_char * CANFD_MTU * size)()
+        self._controls = (ctypes.c_char * RECEIVED_ANCILLARY_BUFFER_SIZE * size)()
+        self._names = (ctypes.c_char * SOCKADDR_CAN_SIZE * size)()
+        self._iovecs = (IoVec * size)()
+        self._msgvec = (MMsgHdr * size)()
+
+        for index in range(size):
+            self._iovecs[index].iov_base = ctypes.addressof(self._frames[index])
+            self._iovecs[index].iov_len = CANFD_MTU
+            msg_hdr = self._msgvec[index].msg_hdr
+            msg_hdr.msg_iov = ctypes.pointer(self._iovecs[index])
+            msg_hdr.msg_iovlen = 1
+            msg_hdr.msg_name = ctypes.addressof(self._names[index])
+            msg_hdr.msg_control = ctypes.addressof(self._controls[index])
+
+    def receive(self, sock, max_frames):
+        """
+        Read all frames that are available without blocking.
+
+        :param socket.socket sock:
+            The socket to read the frames from.
+        :param int max_frames:
+            The maximum number of frames to read, limited to the size of
+            this receiver.
+
+        :return:
+            A list of ``(frame, ancillary_data, interface_index)`` tuples,
+            which is empty if no frame was available.
+        :raises can.CanError:
+            If reading from the socket failed.
+        """
+        count = min(max_frames, self.size)
+        for index in range(count):
+            # these are overwritten by the kernel with the actual lengths
+            msg_hdr = self._msgvec[index].msg_hdr
+            msg_hdr.msg_namelen = SOCKADDR_CAN_SIZE
+            msg_hdr.msg_controllen = RECEIVED_ANCILLARY_BUFFER_SIZE
+            msg_hdr.msg_flags = 0
+
+        received = _libc_recvmmsg(
+            sock.fileno(), self._msgvec, count, socket.MSG_DONTWAIT, None
+        )
+        if received < 0:
+            error = ctypes.get_errno()
+            if error in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return []
+            raise can.CanError("Error receiving: %s" % error_code_to_str(error))
+
+        results = []
+        for index in range(received):
+            mmsg_hdr = self._msgvec[index]
+            msg_hdr = mmsg_hdr.msg_hdr
+            frame = self._frames[index].raw[: mmsg_hdr.msg_len]
+            ancillary_data = _parse_ancillary_data(
+                self._controls[index].raw[: msg_hdr.msg_controllen]
+            )
+            if msg_hdr.msg_namelen >= SOCKADDR_CAN_STRUCT.size:
+                _, interface_index = SOCKADDR_CAN_STRUCT.unpack_from(
+                    self._names[index].raw
+                )
+            else:
+                interface_index = 0
+            results.append((frame, ancillary_data, interface_index))
+        return results
+
+
 class SocketcanBus(BusABC):
     """
     Implements :meth:`can.BusABC._detect_available_configs`.
     """
 
-    def __init__(self, channel="", receive_own_messages=False, fd=False, **kwargs):
+    def __init__(
+        self,
+        channel="",
+        receive_own_messages=False,
+        fd=False,
+        ancillary_timestamps=True,
+        receive_buffer_size=None,
+        send_buffer_size=None,
+        count_dropped_frames=False,
+        nonblocking=False,
+        **kwargs,
+    ):
         """
         :param str channel:
             The can interface name with which to create this bus. An example channel
@@ -557,6 +949,31 @@ class SocketcanBus(BusABC):
             If transmitted messages should also be received by this bus.
         :param bool fd:
             If CAN-FD frames should be supported.
+        :param bool ancillary_timestamps:
+            If the receive timestamps should be delivered together with the
+            frames (with nanosecond resolution) instead of being fetched by a
+            separate system call for every frame. Silently falls back to
+            the latter if the kernel does not support it.
+        :param int receive_buffer_size:
+            The size of the socket's receive buffer in bytes (``SO_RCVBUF``).
+            A larger buffer allows to bridge longer delays in reading messages
+            before frames are dropped. The kernel limits this to
+            ``/proc/sys/net/core/rmem_max``. Uses the system default if not given.
+        :param int send_buffer_size:
+            The size of the socket's send buffer in bytes (``SO_SNDBUF``),
+            limited by ``/proc/sys/net/core/wmem_max``.
+            Uses the system default if not given.
+        :param bool count_dropped_frames:
+            If the kernel should report the number of frames it dropped
+            because the receive buffer was full (``SO_RXQ_OVFL``).
+            See :attr:`~can.interfaces.socketcan.SocketcanBus.dropped_frames`.
+        :param bool nonblocking:
+            If the socket should be switched to nonblocking mode. Messages are
+            then read and written right away, and the bus only waits for the
+            socket to become ready if that was not possible. Waiting is done
+            with ``epoll`` objects that are set up once, instead of a call to
+            ``select()`` for every message. This reduces the latency and
+            CPU load, especially with many buses in a single process.
         :param list can_filters:
             See :meth:`can.BusABC.set_filters`.
         """
@@ -565,6 +982,8 @@ class SocketcanBus(BusABC):
         self.channel_info = "socketcan channel '%s'" % channel
         self._bcm_sockets = {}
         self._is_filtered = False
+        self._receiver = None
+        self._interface_names = {}
 
         # set the receive_own_messages parameter
         try:
@@ -581,8 +1000,63 @@ class SocketcanBus(BusABC):
         # Enable error frames
         self.socket.setsockopt(SOL_CAN_RAW, CAN_RAW_ERR_FILTER, 0x1FFFFFFF)
 
+        self._ancillary_timestamps = False
+        if ancillary_timestamps:
+            try:
+                enable_ancillary_timestamps(self.socket)
+            except socket.error as e:
+                log.info("Could not enable ancillary timestamps (%s)", e)
+            else:
+                self._ancillary_timestamps = True
+
+        self._dropped_frames = 0
+        self._count_dropped_frames = False
+        if count_dropped_frames:
+            try:
+                enable_drop_counter(self.socket)
+            except socket.error as e:
+                log.error("Could not count dropped frames (%s)", e)
+            else:
+                self._count_dropped_frames = True
+
+        if receive_buffer_size is not None:
+            self.socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size
+            )
+            log.debug(
+                "Receive buffer size is %d bytes",
+                self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+            )
+        if send_buffer_size is not None:
+            self.socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer_size
+            )
+            log.debug(
+                "Send buffer size is %d bytes",
+                self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF),
+            )
+
+        self._rx_poller = None
+        self._tx_poller = None
+        if nonblocking:
+            self.socket.setblocking(False)
+            self._rx_poller = select.epoll()
+            self._rx_poller.register(self.socket.fileno(), select.EPOLLIN)
+            self._tx_poller = select.epoll()
+            self._tx_poller.register(self.socket.fileno(), select.EPOLLOUT)
+
         bind_socket(self.socket, channel)
-        kwargs.update({"receive_own_messages": receive_own_messages, "fd": fd})
+        kwargs.update(
+            {
+                "receive_own_messages": receive_own_messages,
+                "fd": fd,
+                "ancillary_timestamps": ancillary_timestamps,
+                "receive_buffer_size": receive_buffer_size,
+                "send_buffer_size": send_buffer_size,
+                "count_dropped_frames": count_dropped_frames,
+                "nonblocking": nonblocking,
+            }
+        )
         super().__init__(channel=channel, **kwargs)
 
     def shutdown(self):
@@ -592,30 +1066,136 @@ class SocketcanBus(BusABC):
             log.debug("Closing bcm socket for channel {}".format(channel))
             bcm_socket = self._bcm_sockets[channel]
             bcm_socket.close()
+        if self._rx_poller is not None:
+            self._rx_poller.close()
+            self._tx_poller.close()
         log.debug("Closing raw can socket")
         self.socket.close()
 
-    def _recv_internal(self, timeout):
-        # get all sockets that are ready (can be a list with a single value
-        # being self.socket or an empty list if self.socket is not ready)
+    def _wait_readable(self, timeout):
         try:
+            if self._rx_poller is not None:
+                return bool(self._rx_poller.poll(-1 if timeout is None else timeout))
             # get all sockets that are ready (can be a list with a single value
             # being self.socket or an empty list if self.socket is not ready)
             ready_receive_sockets, _, _ = select.select([self.socket], [], [], timeout)
+            return bool(ready_receive_sockets)
         except socket.error as exc:
             # something bad happened (e.g. the interface went down)
             raise can.CanError("Failed to receive: %s" % exc)
 
-        if ready_receive_sockets:  # not empty or True
-            get_channel = self.channel == ""
-            msg = capture_message(self.socket, get_channel)
-            if not msg.channel and self.channel:
-                # Default to our own channel
-                msg.channel = self.channel
-            return msg, self._is_filtered
+    def _wait_writable(self, timeout):
+        if self._tx_poller is not None:
+            return bool(self._tx_poller.poll(timeout))
+        return bool(select.select([], [self.socket], [], timeout)[1])
+
+    def _recv_internal(self, timeout):
+        if self._rx_poller is not None:
+            # a nonblocking socket is read right away, and only if no frame
+            # was available yet it is necessary to wait
+            msg = self._receive_message()
+            if msg is None and timeout != 0 and self._wait_readable(timeout):
+                msg = self._receive_message()
+        elif self._wait_readable(timeout):
+            msg = self._receive_message()
         else:
             # socket wasn't readable or timeout occurred
-            return None, self._is_filtered
+            msg = None
+        return msg, self._is_filtered
+
+    def _receive_message(self):
+        get_channel = self.channel == ""
+        try:
+            cf, ancillary_data, channel = _capture_frame(
+                self.socket,
+                get_channel,
+                self._ancillary_timestamps or self._count_dropped_frames,
+            )
+        except BlockingIOError:
+            # no frame available on a nonblocking socket
+            return None
+        if self._count_dropped_frames:
+            self._update_dropped_frames(ancillary_data)
+        timestamp = _timestamp_from_ancillary_data(ancillary_data)
+        if timestamp is None:
+            timestamp = _timestamp_from_ioctl(self.socket)
+        # Default to our own channel
+        return _message_from_frame(cf, timestamp, channel or self.channel or None)
+
+    def _recv_internal_batch(self, max_messages, timeout):
+        # frames can only be read in bulk if their timestamps are part of
+        # the ancillary data, since SIOCGSTAMP only refers to the last one
+        if _libc_recvmmsg is None or not self._ancillary_timestamps:
+            return super()._recv_internal_batch(max_messages, timeout)
+
+        if self._rx_poller is not None:
+            msgs = self._receive_messages(max_messages)
+            if not msgs and timeout != 0 and self._wait_readable(timeout):
+                msgs = self._receive_messages(max_messages)
+        elif self._wait_readable(timeout):
+            msgs = self._receive_messages(max_messages)
+        else:
+            # socket wasn't readable or timeout occurred
+            msgs = []
+        return msgs, self._is_filtered
+
+    def _receive_messages(self, max_messages):
+        if self._receiver is None:
+            self._receiver = MultiFrameReceiver()
+
+        msgs = []
+        get_channel = self.channel == ""
+        for frame, ancillary_data, interface_index in self._receiver.receive(
+            self.socket, max_messages
+        ):
+            if self._count_dropped_frames:
+                self._update_dropped_frames(ancillary_data)
+            timestamp = _timestamp_from_ancillary_data(ancillary_data)
+            if timestamp is None:
+                # should not happen, but better than nothing
+                timestamp = time.time()
+            if get_channel:
+                channel = self._get_interface_name(interface_index)
+            else:
+                # Default to our own channel
+                channel = self.channel or None
+            msgs.append(_message_from_frame(frame, timestamp, channel))
+        return msgs
+
+    @property
+    def dropped_frames(self):
+        """The total number of received frames the kernel had to drop because
+        they were not read fast enough. This is only counted if the bus was
+        created with ``count_dropped_frames=True`` and is updated whenever a
+        message is received.
+
+        :rtype: int
+        """
+        return self._dropped_frames
+
+    def _update_dropped_frames(self, ancillary_data):
+        dropped_frames = _dropped_frames_from_ancillary_data(ancillary_data)
+        if dropped_frames is not None and dropped_frames != self._dropped_frames:
+            # the kernel counter is 32 bits wide and might have wrapped around
+            newly_dropped = (dropped_frames - self._dropped_frames) & 0xFFFFFFFF
+            self._dropped_frames = dropped_frames
+            log.warning(
+                "The kernel dropped %d frames on %s (%d in total)",
+                newly_dropped,
+                self.channel_info,
+                dropped_frames,
+            )
+
+    def _get_interface_name(self, interface_index):
+        try:
+            return self._interface_names[interface_index]
+        except KeyError:
+            try:
+                name = socket.if_indextoname(interface_index)
+            except OSError:
+                return None
+            self._interface_names[interface_index] = name
+            return name
 
     def send(self, msg, timeout=None):
         """Transmit a message to the CAN bus.
@@ -640,12 +1220,18 @@ class SocketcanBus(BusABC):
         data = build_can_frame(msg)
 
         while time_left >= 0:
-            # Wait for write availability
-            ready = select.select([], [self.socket], [], time_left)[1]
-            if not ready:
-                # Timeout
-                break
-            sent = self._send_once(data, msg.channel)
+            if self._tx_poller is None:
+                # Wait for write availability
+                if not self._wait_writable(time_left):
+                    # Timeout
+                    break
+                sent = self._send_once(data, msg.channel)
+            else:
+                # Only wait for write availability if nothing could be sent
+                sent = self._send_once(data, msg.channel)
+                if not sent and not self._wait_writable(time_left):
+                    # Timeout
+                    break
             if sent == len(data):
                 return
             # Not all data were sent, try again with remaining data
@@ -654,6 +1240,58 @@ class SocketcanBus(BusABC):
 
         raise can.CanError("Transmit buffer full")
 
+    def send_batch(self, msgs, timeout=None):
+        """Transmit several messages to the CAN bus.
+
+        All frames that fit into the transmit queue are handed to the kernel
+        with a single ``sendmmsg()`` system call.
+
+        :param List[can.Message] msgs: The messages to send.
+        :param float timeout:
+            Wait up to this many seconds for the transmit queue to be ready.
+            If not given, the call may return before all messages were sent.
+
+        :return: The number of messages that were sent.
+        :rtype: int
+
+        :raises can.CanError:
+            if not even the first message could be written.
+        """
+        if _libc_sendmmsg is None or (
+            self.channel == "" and any(msg.channel for msg in msgs)
+        ):
+            # addressed messages would need a destination for every frame
+            return super().send_batch(msgs, timeout)
+
+        frames = [build_can_frame(msg) for msg in msgs]
+
+        started = time.time()
+        # If no timeout is given, poll for availability
+        if timeout is None:
+            timeout = 0
+        time_left = timeout
+        sent = 0
+
+        while sent < len(frames) and time_left >= 0:
+            if self._tx_poller is None:
+                # Wait for write availability
+                if not self._wait_writable(time_left):
+                    # Timeout
+                    break
+                sent += send_frames(self.socket, frames[sent:])
+            else:
+                # Only wait for write availability if nothing could be sent
+                newly_sent = send_frames(self.socket, frames[sent:])
+                if not newly_sent and not self._wait_writable(time_left):
+                    # Timeout
+                    break
+                sent += newly_sent
+            time_left = timeout - (time.time() - started)
+
+        if frames and not sent:
+            raise can.CanError("Transmit buffer full")
+        return sent
+
     def _send_once(self, data, channel=None):
         try:
             if self.channel == "" and channel:
@@ -661,11 +1299,16 @@ class SocketcanBus(BusABC):
                 sent = self.socket.sendto(data, (channel,))
             else:
                 sent = self.socket.send(data)
+        except BlockingIOError:
+            # the send buffer of a nonblocking socket is full
+            return 0
         except socket.error as exc:
             raise can.CanError("Failed to transmit: %s" % exc)
         return sent
 
-    def _send_periodic_internal(self, msgs, period, duration=None):
+    def _send_periodic_internal(
+        self, msgs, period, duration=None, modifier_callback=None
+    ):
         """Start sending messages at a given period on this bus.
 
         The kernel's Broadcast Manager SocketCAN API will be used.
@@ -677,6 +1320,10 @@ class SocketcanBus(BusABC):
         :param float duration:
             Approximate duration in seconds to continue sending messages. If
             no duration is provided, the task will continue indefinitely.
+        :param modifier_callback:
+            If this is a :class:`~can.broadcastmanager.PayloadSpec`, all
+            payloads are computed in advance and the Broadcast Manager sends
+            them in turn. Other callbacks need the thread based fallback.
 
         :return:
             A started task instance. This can be used to modify the data,
@@ -692,14 +1339,40 @@ class SocketcanBus(BusABC):
 
         """
         msgs = LimitedDurationCyclicSendTaskABC._check_and_convert_messages(msgs)
+        if (
+            modifier_callback is not None
+            and _precompute_payloads(msgs, modifier_callback) is None
+        ):
+            return super()._send_periodic_internal(
+                msgs, period, duration, modifier_callback
+            )
 
         bcm_socket = self._get_bcm_socket(msgs[0].channel or self.channel)
         # TODO: The SocketCAN BCM interface treats all cyclic tasks sharing an
         # Arbitration ID as the same Cyclic group. We should probably warn the
         # user instead of overwriting the old group?
-        task = CyclicSendTask(bcm_socket, msgs, period, duration)
+        task = CyclicSendTask(
+            bcm_socket, msgs, period, duration, modifier_callback=modifier_callback
+        )
         return task
 
+    def _send_periodic_multirate_internal(
+        self, msgs, count, initial_period, subsequent_period
+    ):
+        """Start sending messages at two rates on this bus.
+
+        The kernel's Broadcast Manager switches from the initial to the
+        subsequent period on its own, see
+        :meth:`~can.BusABC.send_periodic_multirate`.
+
+        :rtype: can.interfaces.socketcan.MultiRateCyclicSendTask
+        """
+        msgs = LimitedDurationCyclicSendTaskABC._check_and_convert_messages(msgs)
+        bcm_socket = self._get_bcm_socket(msgs[0].channel or self.channel)
+        return MultiRateCyclicSendTask(
+            bcm_socket, msgs, count, initial_period, subsequent_period
+        )
+
     def _get_bcm_socket(self, channel):
         if channel not in self._bcm_sockets:
             self._bcm_sockets[channel] = create_bcm_socket(self.channel)
@@ -730,6 +1403,415 @@ class SocketcanBus(BusABC):
         ]
 
 
+class MultiSocketcanBus(BusABC):
+    """A socketcan bus that is connected to several interfaces at once.
+
+    Every interface gets its own raw socket in nonblocking mode, so that
+    filters can be set in the kernel per interface. All sockets share a
+    single ``epoll`` object, which allows one thread (like the one of a
+    :class:`~can.Notifier`) to receive from all interfaces. Received
+    messages have their :attr:`~can.Message.channel` set to the interface
+    they were received on, and messages to be sent must name their interface
+    in the same way.
+    """
+
+    def __init__(self, channel, can_filters=None, channel_filters=None, **kwargs):
+        """
+        :param channel:
+            The names of the interfaces, either as a list or as a single
+            comma separated string, e.g. ``"can0,can1"``.
+        :param list can_filters:
+            See :meth:`can.BusABC.set_filters`. These are applied to all
+            interfaces that have no filters of their own.
+        :param dict channel_filters:
+            Filters for individual interfaces, keyed by the interface name.
+            See :meth:`~can.interfaces.socketcan.MultiSocketcanBus.set_channel_filters`.
+        :param kwargs:
+            All other arguments are passed on to the
+            :class:`~can.interfaces.socketcan.SocketcanBus` of every interface.
+        """
+        if isinstance(channel, str):
+            channel = [name.strip() for name in channel.split(",") if name.strip()]
+        if not channel:
+            raise ValueError("At least one interface is required")
+        kwargs["nonblocking"] = True
+
+        self.channel = ",".join(channel)
+        self.channel_info = "socketcan channels %s" % ", ".join(
+            "'%s'" % name for name in channel
+        )
+        self._channel_filters = dict(channel_filters or {})
+        self._buses = {}
+        self._buses_by_fd = {}
+        # buses that were reported as readable, but may not be drained yet
+        self._ready = collections.deque()
+        self._poller = select.epoll()
+        try:
+            for name in channel:
+                bus = SocketcanBus(name, **kwargs)
+                self._buses[name] = bus
+                self._buses_by_fd[bus.fileno()] = bus
+                self._poller.register(bus.fileno(), select.EPOLLIN)
+        except Exception:
+            # only the sockets are open yet, there are no periodic tasks
+            for bus in self._buses.values():
+                bus.shutdown()
+            self._poller.close()
+            raise
+
+        super().__init__(channel=self.channel, can_filters=can_filters, **kwargs)
+
+    @property
+    def buses(self):
+        """The buses of the individual interfaces, keyed by interface name.
+
+        :rtype: Dict[str, can.interfaces.socketcan.SocketcanBus]
+        """
+        return dict(self._buses)
+
+    def set_channel_filters(self, channel, filters):
+        """Apply filtering to the messages of a single interface.
+
+        These replace the filters of the bus for this interface, see
+        :meth:`can.BusABC.set_filters` for the format.
+
+        :param str channel:
+            The name of the interface
+        :param list filters:
+            The filters, or None to use the filters of the bus again
+        """
+        if filters is None:
+            self._channel_filters.pop(channel, None)
+            filters = self._filters
+        else:
+            self._channel_filters[channel] = filters
+        self._buses[channel].set_filters(filters)
+
+    def _apply_filters(self, filters):
+        for name, bus in self._buses.items():
+            bus.set_filters(self._channel_filters.get(name, filters))
+        # the buses of the interfaces take care of filtering
+        self._is_filtered = True
+
+    def _wait_ready(self, timeout):
+        if not self._ready:
+            try:
+                events = self._poller.poll(-1 if timeout is None else timeout)
+            except socket.error as exc:
+                raise can.CanError("Failed to receive: %s" % exc)
+            self._ready.extend(self._buses_by_fd[fd] for fd, _ in events)
+        return bool(self._ready)
+
+    def _recv_internal(self, timeout):
+        if self._wait_ready(timeout):
+            # serve the interfaces in turns, so that none can starve the others
+            while self._ready:
+                bus = self._ready.popleft()
+                msg, already_filtered = bus._recv_internal(0)
+                if msg is None:
+                    continue
+                # the socket may still hold frames
+                self._ready.append(bus)
+                if already_filtered or bus._matches_filters(msg):
+                    return msg, True
+        return None, True
+
+    def _recv_internal_batch(self, max_messages, timeout):
+        msgs = []
+        if self._wait_ready(timeout):
+            for _ in range(len(self._ready)):
+                bus = self._ready.popleft()
+                received, already_filtered = bus._recv_internal_batch(
+                    max_messages - len(msgs), 0
+                )
+                if received:
+                    # the socket may still hold frames
+                    self._ready.append(bus)
+                if not already_filtered:
+                    received = [msg for msg in received if bus._matches_filters(msg)]
+                msgs.extend(received)
+                if len(msgs) >= max_messages:
+                    break
+        return msgs, True
+
+    def _get_bus(self, channel):
+        try:
+            return self._buses[channel]
+        except KeyError:
+            raise can.CanError(
+                "Message needs the channel of one of the interfaces %s, got %r"
+                % (", ".join(self._buses), channel)
+            )
+
+    def send(self, msg, timeout=None):
+        """Transmit a message on the interface named by its channel.
+
+        :param can.Message msg: A message object.
+        :param float timeout:
+            Wait up to this many seconds for the transmit queue to be ready.
+            If not given, the call may fail immediately.
+
+        :raises can.CanError:
+            if the message could not be written or has no valid channel.
+        """
+        self._get_bus(msg.channel).send(msg, timeout)
+
+    def _send_periodic_internal(
+        self, msgs, period, duration=None, modifier_callback=None
+    ):
+        msgs = LimitedDurationCyclicSendTaskABC._check_and_convert_messages(msgs)
+        return self._get_bus(msgs[0].channel)._send_periodic_internal(
+            msgs, period, duration, modifier_callback
+        )
+
+    def _send_periodic_multirate_internal(
+        self, msgs, count, initial_period, subsequent_period
+    ):
+        msgs = LimitedDurationCyclicSendTaskABC._check_and_convert_messages(msgs)
+        return self._get_bus(msgs[0].channel)._send_periodic_multirate_internal(
+            msgs, count, initial_period, subsequent_period
+        )
+
+    def shutdown(self):
+        """Stops all active periodic tasks and closes the sockets."""
+        self.stop_all_periodic_tasks()
+        for bus in self._buses.values():
+            bus.shutdown()
+        self._poller.close()
+
+    def fileno(self):
+        # the epoll object is readable whenever one of the sockets is
+        return self._poller.fileno()
+
+
+class SocketcanBcmBus(BusABC):
+    """A socketcan bus that only receives what the Broadcast Manager passes on.
+
+    Instead of receiving every frame on a raw socket, the kernel is asked
+    to watch single CAN identifiers with
+    :meth:`~can.interfaces.socketcan.SocketcanBcmBus.add_rx_job`. A frame only
+    reaches Python if the bytes selected by a content mask change, and
+    missing frames can be reported after a timeout. For identifiers that
+    mostly repeat the same payload this saves most of the wakeups of the
+    receiving process.
+
+    Messages are sent with the ``TX_SEND`` operation of the Broadcast Manager
+    and periodic messages use the same socket.
+    """
+
+    def __init__(self, channel, ancillary_timestamps=True, **kwargs):
+        """
+        :param str channel:
+            The can interface name with which to create this bus.
+            An example channel would be 'vcan0' or 'can0'.
+        :param bool ancillary_timestamps:
+            If the receive timestamps should be read together with the
+            notifications, see :class:`~can.interfaces.socketcan.SocketcanBus`.
+        """
+        self.channel = channel
+        self.channel_info = "socketcan BCM channel '%s'" % channel
+        self.bcm_socket = create_bcm_socket(channel)
+        # callbacks for RX_TIMEOUT notifications by CAN ID with flags
+        self._timeout_callbacks = {}
+
+        self._ancillary_timestamps = False
+        if ancillary_timestamps:
+            try:
+                enable_ancillary_timestamps(self.bcm_socket)
+                self._ancillary_timestamps = True
+            except socket.error as e:
+                log.info(
+                    "Reading timestamps with ioctl, as SO_TIMESTAMPNS failed: %s", e
+                )
+
+        kwargs.update({"ancillary_timestamps": ancillary_timestamps})
+        super().__init__(channel=channel, **kwargs)
+
+    def add_rx_job(
+        self,
+        arbitration_id,
+        is_extended_id=False,
+        data_mask=None,
+        timeout=None,
+        throttle=None,
+        check_dlc=False,
+        announce_resume=False,
+        on_timeout=None,
+        is_fd=False,
+    ):
+        """Let the kernel watch the messages with the given identifier.
+
+        A message is received when the bytes selected by ``data_mask``
+        change, including the first message after setting up the job. An
+        existing job for the same identifier is replaced.
+
+        :param int arbitration_id:
+            The identifier of the messages to watch.
+        :param bool is_extended_id:
+            If the identifier is an extended one.
+        :param bytes data_mask:
+            The bits of the data that are compared, a changed value in any
+            other bit does not pass the message on. If not given, every
+            message passes, which is useful with ``throttle`` or ``timeout``.
+        :param float timeout:
+            Report the job as timed out if no message is received within
+            this many seconds.
+        :param float throttle:
+            Pass changed messages on at most once in this many seconds.
+        :param bool check_dlc:
+            Also pass the message on if only its length changed.
+        :param bool announce_resume:
+            Pass the first message after a timeout on, even if it did not
+            change.
+        :param on_timeout:
+            Called with the arbitration ID when the job timed out. The call
+            happens in the thread receiving from this bus.
+        :type on_timeout: Callable[[int], None]
+        :param bool is_fd:
+            If the job watches CAN FD frames.
+
+        :raises can.CanError:
+            If the job could not be set up.
+        """
+        can_id = arbitration_id | (CAN_EFF_FLAG if is_extended_id else 0)
+        flags = CAN_FD_FRAME if is_fd else 0
+        if timeout or throttle:
+            flags |= SETTIMER
+        if timeout:
+            flags |= STARTTIMER
+        if check_dlc:
+            flags |= RX_CHECK_DLC
+        if announce_resume:
+            flags |= RX_ANNOUNCE_RESUME
+
+        if data_mask is None:
+            flags |= RX_FILTER_ID
+            body = b""
+        else:
+            body = build_can_frame(
+                Message(
+                    arbitration_id=arbitration_id,
+                    is_extended_id=is_extended_id,
+                    is_fd=is_fd,
+                    data=data_mask,
+                )
+            )
+
+        header = build_bcm_rx_setup_header(
+            can_id, flags, timeout or 0, throttle or 0, nframes=1 if body else 0
+        )
+        if on_timeout is None:
+            self._timeout_callbacks.pop(can_id, None)
+        else:
+            self._timeout_callbacks[can_id] = on_timeout
+        log.debug("Sending BCM RX_SETUP command")
+        send_bcm(self.bcm_socket, header + body)
+
+    def remove_rx_job(self, arbitration_id, is_extended_id=False, is_fd=False):
+        """Stop watching the messages with the given identifier.
+
+        :param int arbitration_id:
+            The identifier of the job.
+        :param bool is_extended_id:
+            If the identifier is an extended one.
+        :param bool is_fd:
+            If the job watches CAN FD frames.
+
+        :raises can.CanError:
+            If there is no such job.
+        """
+        can_id = arbitration_id | (CAN_EFF_FLAG if is_extended_id else 0)
+        flags = CAN_FD_FRAME if is_fd else 0
+        self._timeout_callbacks.pop(can_id, None)
+        log.debug("Sending BCM RX_DELETE command")
+        send_bcm(
+            self.bcm_socket,
+            build_bcm_header(CAN_BCM_RX_DELETE, flags, 0, 0, 0, 0, 0, can_id, 0),
+        )
+
+    def _recv_internal(self, timeout):
+        try:
+            ready_receive_sockets, _, _ = select.select(
+                [self.bcm_socket], [], [], timeout
+            )
+        except socket.error as exc:
+            # something bad happened (e.g. the interface went down)
+            raise can.CanError("Failed to receive: %s" % exc)
+
+        if not ready_receive_sockets:
+            # socket wasn't readable or timeout occurred
+            return None, False
+
+        try:
+            data, ancillary_data, _, _ = self.bcm_socket.recvmsg(
+                ctypes.sizeof(BcmMsgHead) + CANFD_MTU, RECEIVED_ANCILLARY_BUFFER_SIZE
+            )
+        except socket.error as exc:
+            raise can.CanError("Error receiving: %s" % exc)
+
+        head = BcmMsgHead.from_buffer_copy(data[: ctypes.sizeof(BcmMsgHead)])
+        if head.opcode == CAN_BCM_RX_TIMEOUT:
+            arbitration_id = head.can_id & MSK_ARBID
+            callback = self._timeout_callbacks.get(head.can_id)
+            if callback is None:
+                log.debug("BCM RX job for 0x%X timed out", arbitration_id)
+            else:
+                callback(arbitration_id)
+            return None, False
+        if head.opcode != CAN_BCM_RX_CHANGED or not head.nframes:
+            log.debug("Ignoring BCM notification with opcode %d", head.opcode)
+            return None, False
+
+        timestamp = _timestamp_from_ancillary_data(ancillary_data)
+        if timestamp is None:
+            timestamp = _timestamp_from_ioctl(self.bcm_socket)
+        msg = _message_from_frame(
+            data[ctypes.sizeof(BcmMsgHead) :], timestamp, self.channel
+        )
+        return msg, False
+
+    def send(self, msg, timeout=None):
+        """Transmit a message once through the Broadcast Manager.
+
+        :param can.Message msg: A message object.
+        :param float timeout:
+            Ignored, as the Broadcast Manager does not block.
+
+        :raises can.CanError:
+            if the message could not be written.
+        """
+        log.debug("We've been asked to write a message to the bus")
+        flags = CAN_FD_FRAME if msg.is_fd else 0
+        header = build_bcm_header(
+            CAN_BCM_TX_SEND, flags, 0, 0, 0, 0, 0, _add_flags_to_can_id(msg), 1
+        )
+        send_bcm(self.bcm_socket, header + build_can_frame(msg))
+
+    def _send_periodic_internal(
+        self, msgs, period, duration=None, modifier_callback=None
+    ):
+        msgs = LimitedDurationCyclicSendTaskABC._check_and_convert_messages(msgs)
+        if (
+            modifier_callback is not None
+            and _precompute_payloads(msgs, modifier_callback) is None
+        ):
+            return super()._send_periodic_internal(
+                msgs, period, duration, modifier_callback
+            )
+        return CyclicSendTask(
+            self.bcm_socket, msgs, period, duration, modifier_callback=modifier_callback
+        )
+
+    def shutdown(self):
+        """Closes the socket, which also ends all jobs."""
+        self.stop_all_periodic_tasks()
+        log.debug("Closing bcm socket")
+        self.bcm_socket.close()
+
+    def fileno(self):
+        return self.bcm_socket.fileno()
+
+
 if __name__ == "__main__":
     # This example demonstrates how to use the internal methods of this module.
     # It creates two sockets on vcan0 to test sending and receiving.
@@ -82,6 +82,19 @@ class VirtualBus(BusABC):
         else:
             return msg, False
 
+    def _recv_internal_batch(self, max_messages, timeout):
+        self._check_if_open()
+        try:
+            msgs = [self.queue.get(block=True, timeout=timeout)]
+        except queue.Empty:
+            return [], False
+        try:
+            while len(msgs) < max_messages:
+                msgs.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return msgs, False
+
     def send(self, msg, timeout=None):
         self._check_if_open()
 
@@ -100,6 +113,43 @@ class VirtualBus(BusABC):
         if not all_sent:
             raise CanError("Could not send message to one or more recipients")
 
+    def send_batch(self, msgs, timeout=None):
+        self._check_if_open()
+
+        timestamp = time.time()
+        msg_copies = []
+        for msg in msgs:
+            msg_copy = deepcopy(msg)
+            msg_copy.timestamp = timestamp
+            msg_copy.channel = self.channel_id
+            msg_copies.append(msg_copy)
+
+        # Add the messages one after the other to all queues listening on this
+        # channel, until one of them cannot be delivered to every recipient.
+        # Like with send(), the other recipients keep that message.
+        recipients = [
+            bus_queue
+            for bus_queue in self.channel
+            if bus_queue is not self.queue or self.receive_own_messages
+        ]
+        end_time = time.monotonic() + timeout if timeout is not None else None
+        for sent, msg_copy in enumerate(msg_copies):
+            for bus_queue in recipients:
+                time_left = (
+                    max(0.0, end_time - time.monotonic())
+                    if end_time is not None
+                    else None
+                )
+                try:
+                    bus_queue.put(msg_copy, block=True, timeout=time_left)
+                except queue.Full:
+                    if not sent:
+                        raise CanError(
+                            "Could not send message to one or more recipients"
+                        )
+                    return sent
+        return len(msg_copies)
+
     def shutdown(self):
         self._check_if_open()
         self._open = False
@@ -4,7 +4,9 @@ and Writers based off the file extension.
 """
 
 # Generic
-from .logger import Logger
+from .logger import Logger, RotatingLogger
+from .capture import TriggerCapture
+from .threaded import ThreadedWriter
 from .player import LogReader, MessageSync
 
 # Format specific
@@ -0,0 +1,218 @@
+"""
+This module contains a listener that only logs the messages around a trigger.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from can.listener import Listener
+from can.message import Message
+import can.typechecking
+
+log = logging.getLogger("can.io.capture")
+
+
+def data_pattern(
+    arbitration_id: int, data: can.typechecking.CanData, mask: Optional[bytes] = None
+) -> Callable[[Message], bool]:
+    """Creates a trigger for messages with the given ID and data.
+
+    :param arbitration_id: The ID of the messages.
+    :param data: The data the messages start with.
+    :param mask:
+        The bits of ``data`` to compare, all of them if not given.
+    :return: A predicate for the ``trigger`` of a :class:`~can.TriggerCapture`.
+    """
+    pattern = bytes(data)
+    mask = bytes(mask) if mask is not None else b"\xff" * len(pattern)
+    if len(mask) != len(pattern):
+        raise ValueError("The mask must be as long as the data")
+    expected = bytes(byte & mask_byte for byte, mask_byte in zip(pattern, mask))
+
+    def matches(msg: Message) -> bool:
+        if msg.arbitration_id != arbitration_id or len(msg.data) < len(expected):
+            return False
+        return all(
+            msg.data[index] & mask_byte == expected[index]
+            for index, mask_byte in enumerate(mask)
+        )
+
+    return matches
+
+
+class TriggerCapture(Listener):
+    """Only logs the messages before and after a trigger.
+
+    The latest messages are kept in a ring buffer of fixed size. When a
+    trigger fires, the messages in the ring buffer that are not older than
+    the pre-trigger window are passed on to the writer, followed by the
+    messages of the post-trigger window. Afterwards, the capture waits for
+    the next trigger.
+
+    A trigger fires when a message has one of the ``trigger_ids``, an error
+    frame arrives with ``trigger_on_error_frame`` set, the ``trigger``
+    predicate returns True, or :meth:`~can.TriggerCapture.trigger` is called.
+    Only these checks are done for a message while waiting for a trigger::
+
+        writer = can.Logger("fault.blf")
+        capture = can.TriggerCapture(
+            writer, pre_trigger_frames=10000, post_trigger_time=2.0,
+            trigger_on_error_frame=True,
+        )
+        notifier = can.Notifier(bus, [capture])
+
+    :attr int triggers: The number of triggers that fired
+    """
+
+    def __init__(
+        self,
+        writer: Listener,
+        pre_trigger_frames: int = 1000,
+        pre_trigger_time: Optional[float] = None,
+        post_trigger_frames: Optional[int] = None,
+        post_trigger_time: Optional[float] = None,
+        trigger_ids: Optional[Iterable[int]] = None,
+        trigger_on_error_frame: bool = False,
+        trigger: Optional[Callable[[Message], bool]] = None,
+    ):
+        """
+        :param writer:
+            The listener the captured messages are passed on to, like a
+            :class:`~can.Logger`. It is stopped together with the capture.
+        :param pre_trigger_frames:
+            The size of the ring buffer, which is the largest number of
+            messages before the trigger that are logged.
+        :param pre_trigger_time:
+            If given, only log the messages of this many seconds before the
+            trigger.
+        :param post_trigger_frames:
+            The number of messages to log after the trigger.
+        :param post_trigger_time:
+            The number of seconds to log messages after the trigger. If
+            both limits of the post-trigger window are given, the window
+            ends with the first one. If neither is given, there is none.
+        :param trigger_ids:
+            The IDs of messages that fire a trigger.
+        :param trigger_on_error_frame:
+            If error frames fire a trigger.
+        :param trigger:
+            Called with every message while waiting for a trigger, and fires
+            one by returning True. See :func:`~can.io.capture.data_pattern`.
+        """
+        if pre_trigger_frames < 1:
+            raise ValueError("pre_trigger_frames must be at least 1")
+        self.writer = writer
+        self.pre_trigger_time = pre_trigger_time
+        self.post_trigger_frames = post_trigger_frames
+        self.post_trigger_time = post_trigger_time
+        self.trigger_ids = frozenset(trigger_ids or ())
+        self.trigger_on_error_frame = trigger_on_error_frame
+        self.trigger_predicate = trigger
+        self.triggers = 0
+
+        self._ring: List[Optional[Message]] = [None] * pre_trigger_frames
+        self._index = 0
+        # the end of the post-trigger window, which is open while the number
+        # of remaining messages is not None
+        self._post_remaining: Optional[int] = None
+        self._post_end_time: Optional[float] = None
+        # the timestamp of the latest message, also after the ring was cleared
+        self._last_timestamp: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def on_message_received(self, msg: Message):
+        with self._lock:
+            self._add(msg)
+
+    def on_messages_received(self, msgs: List[Message]):
+        with self._lock:
+            for msg in msgs:
+                self._add(msg)
+
+    def _add(self, msg: Message):
+        self._last_timestamp = msg.timestamp
+        if self._post_remaining is not None:
+            self._post_trigger(msg, self._post_remaining)
+            return
+
+        self._ring[self._index] = msg
+        self._index = (self._index + 1) % len(self._ring)
+        if (
+            msg.arbitration_id in self.trigger_ids
+            or (self.trigger_on_error_frame and msg.is_error_frame)
+            or (self.trigger_predicate is not None and self.trigger_predicate(msg))
+        ):
+            self._fire(msg.timestamp)
+
+    def trigger(self, timestamp: Optional[float] = None):
+        """Fire a trigger now, unless the post-trigger window of the previous
+        one is still open.
+
+        :param timestamp:
+            The time of the trigger, in the time base of the message
+            timestamps. If not given, it is the timestamp of the latest
+            message, or the current time if no message was received yet.
+        """
+        with self._lock:
+            if self._post_remaining is not None:
+                return
+            if timestamp is None:
+                timestamp = (
+                    self._last_timestamp
+                    if self._last_timestamp is not None
+                    else time.time()
+                )
+            self._fire(timestamp)
+
+    @property
+    def is_capturing(self) -> bool:
+        """If the post-trigger window of a trigger is open."""
+        return self._post_remaining is not None
+
+    def _fire(self, timestamp: float):
+        self.triggers += 1
+        log.debug("Trigger %d fired at %f", self.triggers, timestamp)
+
+        # pass on the ring buffer from the oldest message on
+        ring = self._ring
+        start_time = (
+            timestamp - self.pre_trigger_time
+            if self.pre_trigger_time is not None
+            else None
+        )
+        for msg in ring[self._index :] + ring[: self._index]:
+            if msg is not None and (start_time is None or msg.timestamp >= start_time):
+                self.writer.on_message_received(msg)
+        for index in range(len(ring)):
+            ring[index] = None
+        self._index = 0
+
+        if self.post_trigger_frames == 0 or (
+            self.post_trigger_frames is None and self.post_trigger_time is None
+        ):
+            return
+        # without a limit, the count never reaches 0
+        self._post_remaining = (
+            self.post_trigger_frames if self.post_trigger_frames is not None else -1
+        )
+        self._post_end_time = (
+            timestamp + self.post_trigger_time
+            if self.post_trigger_time is not None
+            else None
+        )
+
+    def _post_trigger(self, msg: Message, remaining: int):
+        if self._post_end_time is not None and msg.timestamp > self._post_end_time:
+            # the window is over, so this message may belong to the next one
+            self._post_remaining = None
+            self._add(msg)
+            return
+        self.writer.on_message_received(msg)
+        self._post_remaining = remaining - 1 if remaining != 1 else None
+
+    def stop(self):
+        """Stops the writer, without passing on the messages waiting for a
+        trigger."""
+        self.writer.stop()
@@ -1,13 +1,21 @@
 """
-See the :class:`Logger` class.
+See the :class:`Logger` and :class:`RotatingLogger` classes.
 """
 
+from datetime import datetime
+import gzip
+import logging
+import os
 import pathlib
+import queue
+import shutil
+import threading
 import typing
 
 import can.typechecking
 
 from ..listener import Listener
+from ..message import Message
 from .generic import BaseIOHandler
 from .asc import ASCWriter
 from .blf import BLFWriter
@@ -15,6 +23,9 @@ from .canutils import CanutilsLogWriter
 from .csv import CSVWriter
 from .sqlite import SqliteWriter
 from .printer import Printer
+from .threaded import ThreadedWriter
+
+log = logging.getLogger("can.io.logger")
 
 
 class Logger(BaseIOHandler, Listener):  # pylint: disable=abstract-method
@@ -33,6 +44,9 @@ class Logger(BaseIOHandler, Listener):  # pylint: disable=abstract-method
 
     The log files may be incomplete until `stop()` is called due to buffering.
 
+    With ``threaded=True``, the writer is wrapped in a :class:`can.ThreadedWriter`,
+    which writes the messages in a thread of its own.
+
     .. note::
         This class itself is just a dispatcher, and any positional and keyword
         arguments are passed on to the returned instance.
@@ -40,29 +54,294 @@ class Logger(BaseIOHandler, Listener):  # pylint: disable=abstract-method
 
     @staticmethod
     def __new__(
-        cls, filename: typing.Optional[can.typechecking.StringPathLike], *args, **kwargs
+        cls,
+        filename: typing.Optional[can.typechecking.StringPathLike],
+        *args,
+        threaded: bool = False,
+        **kwargs,
     ):
         """
         :param filename: the filename/path of the file to write to,
                          may be a path-like object or None to
                          instantiate a :class:`~can.Printer`
+        :param threaded: if set to `True` the writer is wrapped in a
+                         :class:`~can.ThreadedWriter`
         :raises ValueError: if the filename's suffix is of an unknown file type
         """
-        if filename is None:
-            return Printer(*args, **kwargs)
-
-        lookup = {
-            ".asc": ASCWriter,
-            ".blf": BLFWriter,
-            ".csv": CSVWriter,
-            ".db": SqliteWriter,
-            ".log": CanutilsLogWriter,
-            ".txt": Printer,
-        }
-        suffix = pathlib.PurePath(filename).suffix
-        try:
-            return lookup[suffix](filename, *args, **kwargs)
-        except KeyError:
+        if threaded:
+            return ThreadedWriter(_create_writer(filename, *args, **kwargs))
+        return _create_writer(filename, *args, **kwargs)
+
+
+def _create_writer(
+    filename: typing.Optional[can.typechecking.StringPathLike], *args, **kwargs
+) -> Listener:
+    """Creates the writer for the file format of the filename, see :class:`Logger`."""
+    if filename is None:
+        return Printer(*args, **kwargs)
+
+    lookup: typing.Dict[str, typing.Callable[..., Listener]] = {
+        ".asc": ASCWriter,
+        ".blf": BLFWriter,
+        ".csv": CSVWriter,
+        ".db": SqliteWriter,
+        ".log": CanutilsLogWriter,
+        ".txt": Printer,
+    }
+    suffix = pathlib.PurePath(filename).suffix
+    try:
+        return lookup[suffix](filename, *args, **kwargs)
+    except KeyError:
+        raise ValueError(
+            f'No write support for this unknown log format "{suffix}"'
+        ) from None
+
+
+class RotatingLogger(Listener):
+    """Logs messages into a series of files, starting a new one from time to time.
+
+    A new file, a *segment*, is started when the current one reaches
+    ``max_bytes``, spans ``max_duration`` seconds of message timestamps or
+    holds ``max_messages`` messages, whatever comes first. The segments are
+    named after a template, which may contain the fields ``index``, the
+    number of the segment starting at 0, and ``start``, the
+    :class:`~datetime.datetime` the segment was started at::
+
+        logger = can.RotatingLogger(
+            "soak_{start:%Y%m%d_%H%M%S}_{index:04d}.blf",
+            max_bytes=100 * 1024 * 1024,
+            max_total_bytes=20 * 1024 ** 3,
+        )
+
+    A template without fields gets the start time and index inserted before
+    the suffix.
+
+    Only the new file is opened while receiving a message. Closing the
+    previous segment, which flushes the buffers of the writer, compressing
+    it with gzip and removing old segments beyond the retention budget
+    happens in a background thread. Only the segments written by this
+    logger are removed.
+    """
+
+    #: The suffixes of the supported log formats
+    SUFFIXES = (".asc", ".blf", ".csv", ".log")
+
+    def __init__(
+        self,
+        filename: can.typechecking.StringPathLike,
+        max_bytes: int = 0,
+        max_duration: typing.Optional[float] = None,
+        max_messages: int = 0,
+        compress: bool = True,
+        max_segments: typing.Optional[int] = None,
+        max_total_bytes: typing.Optional[int] = None,
+        **kwargs,
+    ):
+        """
+        :param filename:
+            The template of the segment filenames, see above. The suffix
+            selects the log format like with :class:`~can.Logger`.
+        :param max_bytes:
+            Start a new segment when the file has this size, or 0 for no limit.
+            Writers may buffer some data before writing it to the file.
+        :param max_duration:
+            Start a new segment when the message timestamps span this many
+            seconds since the first message of the segment.
+        :param max_messages:
+            Start a new segment after this many messages, or 0 for no limit.
+        :param compress:
+            If closed segments are compressed with gzip, which appends
+            ``.gz`` to their filename.
+        :param max_segments:
+            The number of closed segments to keep, the oldest ones are removed.
+        :param max_total_bytes:
+            The size the closed segments may take on disk in total, the
+            oldest ones are removed.
+        :param kwargs: Passed on to the writer of every segment.
+
+        :raises ValueError:
+            if the suffix is of an unsupported log format, or ``threaded``
+            is set. Wrap the rotating logger in a :class:`~can.ThreadedWriter`
+            instead.
+        """
+        template = str(filename)
+        suffix = pathlib.PurePath(template).suffix
+        if suffix not in self.SUFFIXES:
+            raise ValueError(f'No rotating write support for the log format "{suffix}"')
+        if kwargs.pop("threaded", False):
             raise ValueError(
-                f'No write support for this unknown log format "{suffix}"'
-            ) from None
+                "Wrap the RotatingLogger in a ThreadedWriter instead of its segments"
+            )
+        if "{" not in template:
+            template = (
+                template[: -len(suffix)] + "_{start:%Y%m%d_%H%M%S}_{index:03d}" + suffix
+            )
+        self.template = template
+        self.max_bytes = max_bytes
+        self.max_duration = max_duration
+        self.max_messages = max_messages
+        self.compress = compress
+        self.max_segments = max_segments
+        self.max_total_bytes = max_total_bytes
+        self._writer_kwargs = kwargs
+
+        #: The number of segments started so far
+        self.rollover_count = 0
+        #: The closed segments that were not removed yet, oldest first
+        self.segments: typing.List[str] = []
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._closed: "queue.Queue[typing.Optional[typing.Tuple[Listener, str]]]" = (
+            queue.Queue()
+        )
+        self._thread = threading.Thread(
+            target=self._close_segments, name="can.RotatingLogger " + template
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        self._open_segment()
+
+    @property
+    def filename(self) -> str:
+        """The filename of the current segment."""
+        return self._filename
+
+    def _open_segment(self):
+        self._filename = self.template.format(
+            index=self.rollover_count, start=datetime.now()
+        )
+        self.rollover_count += 1
+        self._writer = Logger(self._filename, **self._writer_kwargs)
+        self._count = 0
+        self._start_timestamp: typing.Optional[float] = None
+        log.debug("Started segment %s", self._filename)
+
+    def _should_rollover(self, msg: Message) -> bool:
+        if not self._count:
+            return False
+        if self.max_messages and self._count >= self.max_messages:
+            return True
+        start_timestamp = self._start_timestamp
+        if (
+            self.max_duration is not None
+            and start_timestamp is not None
+            and msg.timestamp - start_timestamp >= self.max_duration
+        ):
+            return True
+        if self.max_bytes:
+            # a text file flushes its pending text to get the position,
+            # which its binary buffer does not
+            file = self._writer.file
+            return getattr(file, "buffer", file).tell() >= self.max_bytes
+        return False
+
+    def _add(self, msg: Message):
+        if self._should_rollover(msg):
+            self._rollover()
+        if self._start_timestamp is None:
+            self._start_timestamp = msg.timestamp
+        self._writer.on_message_received(msg)
+        self._count += 1
+
+    def on_message_received(self, msg: Message):
+        with self._lock:
+            self._add(msg)
+
+    def on_messages_received(self, msgs: typing.List[Message]):
+        with self._lock:
+            for msg in msgs:
+                self._add(msg)
+
+    def rollover(self):
+        """Start a new segment now, unless the current one is empty."""
+        with self._lock:
+            if self._count:
+                self._rollover()
+
+    def _rollover(self):
+        # the writer is only used by the background thread from now on
+        self._closed.put((self._writer, self._filename))
+        self._open_segment()
+
+    def _close_segments(self):
+        while True:
+            item = self._closed.get()
+            if item is None:
+                return
+            writer, filename = item
+            # keep going after errors, or the following segments would never
+            # be closed, and count every segment that exists towards the budget
+            try:
+                writer.stop()
+            except Exception:
+                log.exception("Failed to close the segment %s", filename)
+            if self.compress:
+                try:
+                    self._compress(filename)
+                    filename += ".gz"
+                except Exception:
+                    log.exception("Failed to compress the segment %s", filename)
+            if os.path.exists(filename):
+                self.segments.append(filename)
+            try:
+                self._prune()
+            except Exception:
+                log.exception("Failed to remove old segments")
+
+    @staticmethod
+    def _compress(filename: str):
+        try:
+            with open(filename, "rb") as source:
+                with gzip.open(filename + ".gz", "wb") as target:
+                    shutil.copyfileobj(source, target)
+        except Exception:
+            # keep the uncompressed segment only
+            if os.path.exists(filename + ".gz"):
+                os.remove(filename + ".gz")
+            raise
+        os.remove(filename)
+
+    def _prune(self):
+        segments = []
+        sizes = []
+        for filename in self.segments:
+            try:
+                sizes.append(os.path.getsize(filename))
+            except FileNotFoundError:
+                log.debug("The segment %s was already removed", filename)
+                continue
+            segments.append(filename)
+        total = sum(sizes)
+        while segments and (
+            (self.max_segments is not None and len(segments) > self.max_segments)
+            or (self.max_total_bytes is not None and total > self.max_total_bytes)
+        ):
+            filename = segments.pop(0)
+            total -= sizes.pop(0)
+            log.debug("Removing segment %s", filename)
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+        self.segments = segments
+
+    def stop(self):
+        """Closes the current segment and waits until all segments are
+        compressed and pruned."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            if not self._thread.is_alive():
+                log.error("The background thread ended, closing %s", self._filename)
+                self._writer.stop()
+                return
+            self._closed.put((self._writer, self._filename))
+            self._closed.put(None)
+        self._thread.join()
+
+    def __enter__(self) -> "RotatingLogger":
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,72 @@
+"""
+This module contains a wrapper that writes messages in a thread of its own.
+"""
+
+import logging
+from typing import List, Optional
+
+from can.listener import Listener
+from can.message import Message
+from can.notifier import ListenerWorker
+
+log = logging.getLogger("can.io.threaded")
+
+
+class ThreadedWriter(Listener):
+    """Passes the messages on to a writer in a thread of its own.
+
+    The formatting, compression and file I/O of writers like the
+    :class:`~can.BLFWriter` then no longer delay the thread receiving the
+    messages, like the one of a :class:`~can.Notifier`. The messages wait
+    in a bounded queue, and the writer gets all waiting messages at once
+    through :meth:`~can.Listener.on_messages_received`.
+
+    :meth:`~can.ThreadedWriter.stop` writes all waiting messages before
+    stopping the writer. See also the ``threaded`` argument of
+    :class:`~can.Logger`.
+    """
+
+    def __init__(
+        self, writer: Listener, queue_size: int = 100000, overflow: str = "block"
+    ):
+        """
+        :param writer: The writer, which is only used by the thread from now on.
+        :param queue_size:
+            The maximum number of messages waiting to be written, or 0 for
+            no limit.
+        :param overflow:
+            What to do with a message if the queue is full, one of
+            :data:`can.listener.OVERFLOW_POLICIES`. The default waits for
+            the writer to catch up, so no message is lost.
+        """
+        self.writer = writer
+        self._worker = ListenerWorker(writer, queue_size, overflow)
+
+    @property
+    def depth(self) -> int:
+        """The number of messages waiting to be written."""
+        return self._worker.depth
+
+    @property
+    def dropped(self) -> int:
+        """The number of messages that were not written because the queue
+        was full or the writer failed.
+        """
+        return self._worker.dropped
+
+    @property
+    def exception(self) -> Optional[Exception]:
+        """The exception raised by the writer, which stops writing."""
+        return self._worker.exception
+
+    def on_message_received(self, msg: Message):
+        self._worker.put(msg)
+
+    def on_messages_received(self, msgs: List[Message]):
+        for msg in msgs:
+            self._worker.put(msg)
+
+    def stop(self):
+        """Writes all waiting messages and stops the writer."""
+        self._worker.stop()
+        self.writer.stop()
@@ -2,21 +2,24 @@
 This module contains the implementation of `can.Listener` and some readers.
 """
 
-from typing import AsyncIterator, Awaitable, Optional
+from typing import AsyncIterator, Awaitable, Dict, List, NamedTuple, Optional, Tuple
 
 from can.message import Message
 from can.bus import BusABC
+import can.typechecking
 
 from abc import ABCMeta, abstractmethod
 
-try:
-    # Python 3.7
-    from queue import SimpleQueue, Empty
-except ImportError:
-    # Python 3.0 - 3.6
-    from queue import Queue as SimpleQueue, Empty  # type: ignore
-
 import asyncio
+import collections
+import queue
+import threading
+import time
+
+#: What a full bounded queue does with another message: ``"block"`` waits for
+#: free space, ``"drop_newest"`` discards the new message and
+#: ``"drop_oldest"`` discards the oldest queued message to make room
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
 
 
 class Listener(metaclass=ABCMeta):
@@ -43,6 +46,18 @@ class Listener(metaclass=ABCMeta):
 
         """
 
+    def on_messages_received(self, msgs: List[Message]):
+        """This method is called to handle several messages at once, which
+        an event loop driven :class:`~can.Notifier` does.
+
+        Concrete implementations may override it to handle the messages more
+        efficiently than one by one.
+
+        :param msgs: the delivered messages in the order they were received
+        """
+        for msg in msgs:
+            self.on_message_received(msg)
+
     def __call__(self, msg: Message):
         self.on_message_received(msg)
 
@@ -61,6 +76,141 @@ class Listener(metaclass=ABCMeta):
         """
 
 
+class _MessageQueue:
+    """A thread safe FIFO of messages with an optional size limit and
+    counters for the messages that were dropped because it was full.
+
+    It can also be used like a :class:`queue.SimpleQueue`, which the
+    ``buffer`` of a :class:`BufferedReader` used to be.
+    """
+
+    def __init__(self, maxsize: int = 0, overflow: str = "block"):
+        """
+        :param maxsize: The maximum number of queued messages, or 0 for no limit.
+        :param overflow: One of :data:`OVERFLOW_POLICIES`.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                "overflow must be one of {}, got {!r}".format(
+                    ", ".join(OVERFLOW_POLICIES), overflow
+                )
+            )
+        self.maxsize = maxsize
+        self.overflow = overflow
+        #: The number of messages discarded because the queue was full or closed
+        self.dropped = 0
+        #: The largest number of messages queued at the same time
+        self.max_depth = 0
+        self.closed = False
+        self._items: "collections.deque[Message]" = collections.deque()
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(
+        self, msg: Message, block: bool = True, timeout: Optional[float] = None
+    ) -> bool:
+        """Append a message, which may wait or drop a message if the queue is full.
+
+        The ``block`` and ``timeout`` arguments are only accepted for
+        compatibility with :meth:`queue.SimpleQueue.put`, the overflow policy
+        decides what happens if the queue is full.
+
+        :return: False if the given message was dropped.
+        """
+        with self._condition:
+            if self.maxsize and len(self._items) >= self.maxsize:
+                if self.overflow == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.overflow == "drop_newest":
+                    self.dropped += 1
+                    return False
+                else:
+                    while len(self._items) >= self.maxsize and not self.closed:
+                        self._condition.wait()
+            if self.closed:
+                self.dropped += 1
+                return False
+            self._items.append(msg)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._condition.notify_all()
+            return True
+
+    def put_nowait(self, msg: Message) -> bool:
+        """Same as :meth:`put`, like :meth:`queue.SimpleQueue.put_nowait`."""
+        return self.put(msg)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Message:
+        """Remove the oldest message, like :meth:`queue.SimpleQueue.get`.
+
+        :param block: If False, do not wait for a message.
+        :param timeout:
+            The number of seconds to wait, or None to wait until a message
+            arrives or the queue is closed.
+        :raises queue.Empty: If no message arrived in time.
+        """
+        msgs = self.get_many(1, timeout if block else 0)
+        if not msgs:
+            raise queue.Empty
+        return msgs[0]
+
+    def get_nowait(self) -> Message:
+        """Remove the oldest message without waiting.
+
+        :raises queue.Empty: If the queue is empty.
+        """
+        return self.get(block=False)
+
+    def empty(self) -> bool:
+        """If no message is queued."""
+        return not self._items
+
+    def qsize(self) -> int:
+        """The number of queued messages."""
+        return len(self._items)
+
+    def get_many(
+        self, max_count: Optional[int] = None, timeout: Optional[float] = None
+    ) -> List[Message]:
+        """Remove the oldest messages, waiting for at least one if the
+        queue is empty.
+
+        :param max_count: The maximum number of messages, or None for all.
+        :param timeout:
+            The number of seconds to wait, or None to wait until a message
+            arrives or the queue is closed.
+        :return: The messages, which is an empty list on timeout.
+        """
+        with self._condition:
+            end_time = time.monotonic() + timeout if timeout is not None else 0.0
+            while not self._items and not self.closed:
+                if timeout is None:
+                    self._condition.wait()
+                else:
+                    remaining = end_time - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            count = len(self._items)
+            if max_count is not None:
+                count = min(count, max_count)
+            msgs = [self._items.popleft() for _ in range(count)]
+            if msgs:
+                self._condition.notify_all()
+            return msgs
+
+    def close(self):
+        """Wake up all waiting threads and refuse any further messages.
+
+        Messages that are already queued can still be taken out.
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
 class RedirectReader(Listener):
     """
     A RedirectReader sends all received messages to another Bus.
@@ -85,14 +235,32 @@ class BufferedReader(Listener):
     Putting in messages after :meth:`~can.BufferedReader.stop` has be called will raise
     an exception, see :meth:`~can.BufferedReader.on_message_received`.
 
+    The buffer can be limited in size, so that a consumer which falls behind
+    does not let it grow without bounds. What happens to further messages is
+    decided by the ``overflow`` policy, and the dropped messages are counted
+    in :attr:`~can.BufferedReader.dropped`.
+
     :attr bool is_stopped: ``True`` iff the reader has been stopped
     """
 
-    def __init__(self):
-        # set to "infinite" size
-        self.buffer = SimpleQueue()
+    def __init__(self, maxsize: int = 0, overflow: str = "drop_newest"):
+        """
+        :param maxsize:
+            The maximum number of buffered messages, or 0 for no limit.
+        :param overflow:
+            What to do with a message if the buffer is full, one of
+            :data:`can.listener.OVERFLOW_POLICIES`. Note that ``"block"``
+            stalls the thread delivering the messages, like the one of a
+            :class:`~can.Notifier`.
+        """
+        self.buffer = _MessageQueue(maxsize, overflow)
         self.is_stopped = False
 
+    @property
+    def dropped(self) -> int:
+        """The number of messages that were discarded because the buffer was full."""
+        return self.buffer.dropped
+
     def on_message_received(self, msg: Message):
         """Append a message to the buffer.
 
@@ -104,6 +272,15 @@ class BufferedReader(Listener):
         else:
             self.buffer.put(msg)
 
+    def on_messages_received(self, msgs: List[Message]):
+        """Append several messages to the buffer.
+
+        :raises: BufferError
+            if the reader has already been stopped
+        """
+        for msg in msgs:
+            self.on_message_received(msg)
+
     def get_message(self, timeout: float = 0.5) -> Optional[Message]:
         """
         Attempts to retrieve the latest message received by the instance. If no message is
@@ -114,15 +291,134 @@ class BufferedReader(Listener):
         :param timeout: The number of seconds to wait for a new message.
         :return: the Message if there is one, or None if there is not.
         """
-        try:
-            return self.buffer.get(block=not self.is_stopped, timeout=timeout)
-        except Empty:
-            return None
+        msgs = self.buffer.get_many(1, 0 if self.is_stopped else timeout)
+        return msgs[0] if msgs else None
+
+    def get_messages(
+        self, max_count: Optional[int] = None, timeout: float = 0.5
+    ) -> List[Message]:
+        """
+        Retrieves many of the messages received by the instance at once, in
+        the order they were received. If no message is available, it blocks
+        like :meth:`~can.BufferedReader.get_message` for the first one.
+
+        :param max_count: The maximum number of messages, or None for all.
+        :param timeout: The number of seconds to wait for a new message.
+        :return: the Messages, which is an empty list if there were none.
+        """
+        return self.buffer.get_many(max_count, 0 if self.is_stopped else timeout)
 
     def stop(self):
         """Prohibits any more additions to this reader.
         """
         self.is_stopped = True
+        # wake up the threads waiting for messages
+        self.buffer.close()
+
+
+class CachedMessage(NamedTuple):
+    """What a :class:`~can.MessageCache` knows about the messages of one ID."""
+
+    #: The latest message
+    msg: Message
+    #: The number of messages received
+    message_count: int
+    #: The time between the latest message and the one before, 0 for the first
+    period: float
+    #: The timestamp of the first message
+    first_timestamp: float
+    #: The timestamp of the latest message
+    last_timestamp: float
+
+
+#: The key of a :class:`~can.MessageCache`: channel, arbitration ID and is_extended_id
+CacheKey = Tuple[Optional[can.typechecking.Channel], int, bool]
+
+
+class MessageCache(Listener):
+    """Keeps the latest message of every arbitration ID and channel.
+
+    Each entry is a :class:`~can.listener.CachedMessage`, which is replaced
+    as a whole by every new message. Threads polling the cache thus never
+    see a half updated entry, and :meth:`~can.MessageCache.snapshot` only
+    has to copy the references to the entries.
+    """
+
+    def __init__(self, per_channel: bool = True):
+        """
+        :param per_channel:
+            Keep the messages of every channel apart. Otherwise the messages
+            of all channels are cached under the channel None.
+        """
+        self.per_channel = per_channel
+        self._entries: Dict[CacheKey, CachedMessage] = {}
+        self._lock = threading.Lock()
+
+    def on_message_received(self, msg: Message):
+        with self._lock:
+            self._update(msg)
+
+    def on_messages_received(self, msgs: List[Message]):
+        with self._lock:
+            for msg in msgs:
+                self._update(msg)
+
+    def _update(self, msg: Message):
+        channel = msg.channel if self.per_channel else None
+        key = (channel, msg.arbitration_id, msg.is_extended_id)
+        previous = self._entries.get(key)
+        if previous is None:
+            entry = CachedMessage(msg, 1, 0.0, msg.timestamp, msg.timestamp)
+        else:
+            entry = CachedMessage(
+                msg,
+                previous.message_count + 1,
+                msg.timestamp - previous.last_timestamp,
+                previous.first_timestamp,
+                msg.timestamp,
+            )
+        self._entries[key] = entry
+
+    def get(
+        self,
+        arbitration_id: int,
+        is_extended_id: bool = True,
+        channel: Optional[can.typechecking.Channel] = None,
+    ) -> Optional[CachedMessage]:
+        """Look up the latest message with the given ID.
+
+        :param arbitration_id: The arbitration ID of the message.
+        :param is_extended_id: If the ID is an extended one.
+        :param channel: The channel the message was received on.
+        :return: The entry, or None if no such message was received.
+        """
+        return self._entries.get((channel, arbitration_id, is_extended_id))
+
+    def snapshot(self) -> Dict[CacheKey, CachedMessage]:
+        """A copy of all entries at a single point in time.
+
+        :return: The entries by channel, arbitration ID and is_extended_id.
+        """
+        with self._lock:
+            return dict(self._entries)
+
+    def remove(
+        self,
+        arbitration_id: int,
+        is_extended_id: bool = True,
+        channel: Optional[can.typechecking.Channel] = None,
+    ):
+        """Forget the messages with the given ID, if there were any."""
+        with self._lock:
+            self._entries.pop((channel, arbitration_id, is_extended_id), None)
+
+    def clear(self):
+        """Forget all messages."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class AsyncBufferedReader(Listener):
@@ -138,7 +434,11 @@ class AsyncBufferedReader(Listener):
 
     def __init__(self, loop: Optional[asyncio.events.AbstractEventLoop] = None):
         # set to "infinite" size
-        self.buffer: "asyncio.Queue[Message]" = asyncio.Queue(loop=loop)
+        if loop is not None:
+            self.buffer: "asyncio.Queue[Message]" = asyncio.Queue(loop=loop)
+        else:
+            # newer versions of Python do not accept a loop at all
+            self.buffer = asyncio.Queue()
 
     def on_message_received(self, msg: Message):
         """Append a message to the buffer.
@@ -147,6 +447,15 @@ class AsyncBufferedReader(Listener):
         """
         self.buffer.put_nowait(msg)
 
+    def on_messages_received(self, msgs: List[Message]):
+        """Append several messages to the buffer.
+
+        Must only be called inside an event loop!
+        """
+        put_nowait = self.buffer.put_nowait
+        for msg in msgs:
+            put_nowait(msg)
+
     async def get_message(self) -> Message:
         """
         Retrieve the latest message when awaited for::
@@ -157,6 +466,21 @@ class AsyncBufferedReader(Listener):
         """
         return await self.buffer.get()
 
+    async def get_messages(self, max_count: Optional[int] = None) -> List[Message]:
+        """
+        Retrieve all buffered messages when awaited for, waiting until
+        there is at least one::
+
+            msgs = await reader.get_messages()
+
+        :param max_count: The maximum number of messages, or None for all.
+        :return: The CAN messages in the order they were received.
+        """
+        msgs = [await self.buffer.get()]
+        while not self.buffer.empty() and (max_count is None or len(msgs) < max_count):
+            msgs.append(self.buffer.get_nowait())
+        return msgs
+
     def __aiter__(self) -> AsyncIterator[Message]:
         return self
 
@@ -146,8 +146,7 @@ def main():
 
     try:
         while True:
-            msg = bus.recv(1)
-            if msg is not None:
+            for msg in bus.recv_batch(timeout=1):
                 logger(msg)
     except KeyboardInterrupt:
         pass
@@ -2,32 +2,162 @@
 This module contains the implementation of :class:`~can.Notifier`.
 """
 
-from typing import Iterable, List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-from can.bus import BusABC
-from can.listener import Listener
+import can.typechecking
+from can.bus import BusABC, _compile_filters
+from can.listener import OVERFLOW_POLICIES, Listener, _MessageQueue
 from can.message import Message
 
 import threading
 import logging
+import selectors
 import time
 import asyncio
 
 logger = logging.getLogger("can.Notifier")
 
 
+class ListenerWorker:
+    """Calls a listener from a thread of its own.
+
+    Messages are passed on through a bounded queue, so that a slow listener
+    only delays itself instead of the thread receiving from the bus.
+    """
+
+    def __init__(self, listener: Listener, queue_size: int = 0, overflow="block"):
+        """
+        :param listener: The listener to call with every message.
+        :param queue_size:
+            The maximum number of messages waiting for the listener, or 0
+            for no limit.
+        :param overflow:
+            What to do with a message if the queue is full, one of
+            :data:`can.listener.OVERFLOW_POLICIES`.
+        """
+        self.listener = listener
+        self._queue = _MessageQueue(queue_size, overflow)
+        #: Exception raised by the listener, which ends the worker
+        self.exception: Optional[Exception] = None
+        self._thread = threading.Thread(
+            target=self._run, name="can.notifier worker for {!r}".format(listener)
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        """The number of messages currently waiting for the listener."""
+        return len(self._queue)
+
+    @property
+    def max_depth(self) -> int:
+        """The largest number of messages that were waiting at the same time."""
+        return self._queue.max_depth
+
+    @property
+    def dropped(self) -> int:
+        """The number of messages that never reached the listener, because
+        the queue was full or the worker had ended.
+        """
+        return self._queue.dropped
+
+    def put(self, msg: Message):
+        """Pass a message on to the listener, see the ``overflow`` policy."""
+        self._queue.put(msg)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Call the listener with the remaining queued messages and end the thread.
+
+        :param timeout: Max time in seconds to wait for the thread.
+        """
+        self._queue.close()
+        self._thread.join(timeout)
+
+    def _run(self):
+        # listeners may handle the waiting messages at once
+        handler = getattr(self.listener, "on_messages_received", None)
+        while True:
+            msgs = self._queue.get_many()
+            if not msgs:
+                # closed and drained
+                return
+            try:
+                if handler is not None:
+                    handler(msgs)
+                else:
+                    for msg in msgs:
+                        self.listener(msg)
+            except Exception as exc:
+                logger.exception("Listener %r failed", self.listener)
+                self.exception = exc
+                self._queue.close()
+                if hasattr(self.listener, "on_error"):
+                    self.listener.on_error(exc)
+                return
+
+
+class _Subscription:
+    """The messages a listener of a :class:`~can.Notifier` wants to receive."""
+
+    def __init__(
+        self,
+        arbitration_ids: Optional[Iterable[int]] = None,
+        can_filters: Optional[can.typechecking.CanFilters] = None,
+    ):
+        self.arbitration_ids = frozenset(arbitration_ids or ())
+        self.filter_buckets = _compile_filters(can_filters)[1] if can_filters else None
+
+    def matches(self, arbitration_id: int, is_extended_id: bool) -> bool:
+        if arbitration_id in self.arbitration_ids:
+            return True
+        if self.filter_buckets is None:
+            return False
+        return any(
+            arbitration_id & can_mask in masked_can_ids
+            for can_mask, masked_can_ids in self.filter_buckets[is_extended_id]
+        )
+
+
 class Notifier:
+
+    #: The number of IDs the listeners are remembered for at most, after
+    #: which they are looked up anew
+    DISPATCH_TABLE_SIZE = 4096
+
     def __init__(
         self,
         bus: BusABC,
         listeners: Iterable[Listener],
         timeout: float = 1.0,
         loop: Optional[asyncio.AbstractEventLoop] = None,
+        queue_size: Optional[int] = None,
+        overflow: str = "block",
+        use_selector: bool = False,
+        max_batch_size: int = 64,
+        max_latency: float = 0.0,
     ):
         """Manages the distribution of :class:`can.Message` instances to listeners.
 
         Supports multiple buses and listeners.
 
+        By default the listeners are called one after the other in the thread
+        receiving the messages, so a slow listener delays reading from the
+        bus. With a ``queue_size``, every listener is called by a
+        :class:`~can.notifier.ListenerWorker` of its own instead.
+
+        Every bus is read by a thread of its own, unless an event loop is
+        given or ``use_selector`` is set. Then all buses with a file
+        descriptor are watched together, and only the other buses still get
+        their own thread.
+
+        With an event loop, the threads hand the messages over to the loop in
+        batches, as waking up the loop is expensive. Listeners with an
+        ``on_messages_received`` method, like every :class:`~can.Listener`,
+        get each batch in a single call. A batch is passed on as soon as no
+        more messages are ready, unless ``max_latency`` allows to wait for
+        further ones.
+
         .. Note::
 
             Remember to call `stop()` after all messages are received as
@@ -38,17 +168,71 @@ class Notifier:
         :param listeners: An iterable of :class:`~can.Listener`
         :param timeout: An optional maximum number of seconds to wait for any message.
         :param loop: An :mod:`asyncio` event loop to schedule listeners in.
+        :param queue_size:
+            If given, call every listener in a thread of its own, with up to
+            this many messages waiting for it. 0 means no limit.
+        :param overflow:
+            What to do with a message for a listener with a full queue, one
+            of :data:`can.listener.OVERFLOW_POLICIES`.
+        :param use_selector:
+            Read all buses with a file descriptor from a single thread,
+            which waits for them with :mod:`selectors`. Messages that are
+            ready on several buses at once are passed on in the order the
+            buses were added.
+        :param max_batch_size:
+            The maximum number of messages read from a bus at once and
+            handed over to the event loop together.
+        :param max_latency:
+            The number of seconds a thread may hold back received messages
+            to hand them over to the event loop in larger batches.
+
+        :raises ValueError:
+            if a ``loop`` is given together with a ``queue_size`` or
+            ``use_selector``.
         """
+        if loop is not None and queue_size is not None:
+            raise ValueError("Listeners called in an event loop have no queues")
+        if loop is not None and use_selector:
+            raise ValueError("The event loop already watches the buses")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy {!r}".format(overflow))
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
         self.listeners = list(listeners)
         self.bus = bus
         self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
         self._loop = loop
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._workers: List[ListenerWorker] = []
+        # the subscriptions of listeners that only want some messages, by the
+        # id() of the listener
+        self._subscriptions: Dict[int, _Subscription] = {}
+        # the listeners (or workers) by arbitration ID and is_extended_id,
+        # which is filled as messages arrive
+        self._dispatch_table: Dict[Tuple[int, bool], list] = {}
+        if queue_size is not None:
+            self._workers = [
+                self._create_worker(listener) for listener in self.listeners
+            ]
 
         #: Exception raised in thread
         self.exception: Optional[Exception] = None
 
         self._running = True
         self._lock = threading.Lock()
+        # the number of running reader threads, and whether the last one has
+        # to stop the listeners as stop() did not wait for it
+        self._readers_lock = threading.Lock()
+        self._active_readers = 0
+        self._stop_pending = False
+
+        self._selector: Optional[selectors.BaseSelector] = None
+        if use_selector:
+            self._selector = selectors.DefaultSelector()
+        self._selector_thread: Optional[threading.Thread] = None
 
         self._readers: List[Union[int, threading.Thread]] = []
         buses = self.bus if isinstance(self.bus, list) else [self.bus]
@@ -69,6 +253,23 @@ class Notifier:
             # Use file descriptor to watch for messages
             reader = bus.fileno()  # type: ignore
             self._loop.add_reader(reader, self._on_message_available, bus)
+        elif (
+            self._selector is not None
+            and hasattr(bus, "fileno")
+            and bus.fileno() >= 0  # type: ignore
+        ):
+            # the position of the bus decides the order of ready buses
+            position = len(self._selector.get_map())
+            self._selector.register(
+                bus.fileno(), selectors.EVENT_READ, (position, bus)  # type: ignore
+            )
+            if self._selector_thread is not None:
+                return
+            reader = self._selector_thread = threading.Thread(
+                target=self._selector_rx_thread, name="can.notifier selector"
+            )
+            reader.daemon = True
+            self._start_reader(reader)
         else:
             reader = threading.Thread(
                 target=self._rx_thread,
@@ -76,16 +277,32 @@ class Notifier:
                 name='can.notifier for bus "{}"'.format(bus.channel_info),
             )
             reader.daemon = True
-            reader.start()
+            self._start_reader(reader)
         self._readers.append(reader)
 
+    def _start_reader(self, reader: threading.Thread):
+        with self._readers_lock:
+            self._active_readers += 1
+        reader.start()
+
+    def _reader_finished(self):
+        with self._readers_lock:
+            self._active_readers -= 1
+            stop_listeners = self._stop_pending and not self._active_readers
+            if stop_listeners:
+                self._stop_pending = False
+        if stop_listeners:
+            self._stop_listeners()
+
     def stop(self, timeout: float = 5):
         """Stop notifying Listeners when new :class:`~can.Message` objects arrive
         and call :meth:`~can.Listener.stop` on each Listener.
 
         :param timeout:
             Max time in seconds to wait for receive threads to finish.
-            Should be longer than timeout given at instantiation.
+            Should be longer than timeout given at instantiation. If a
+            thread is still running afterwards, the listeners are stopped
+            by the last thread that finishes instead.
         """
         self._running = False
         end_time = time.time() + timeout
@@ -97,23 +314,42 @@ class Notifier:
             elif self._loop:
                 # reader is a file descriptor
                 self._loop.remove_reader(reader)
+        if self._selector is not None and self._selector_thread is None:
+            # otherwise the selector thread closes it when it finishes
+            self._selector.close()
+
+        with self._readers_lock:
+            if self._active_readers:
+                self._stop_pending = True
+                logger.warning(
+                    "%d receive thread(s) did not finish in time, the "
+                    "listeners are stopped once they do",
+                    self._active_readers,
+                )
+                return
+        self._stop_listeners(max(0.0, end_time - time.time()))
+
+    def _stop_listeners(self, timeout: Optional[float] = None):
+        for worker in self._workers:
+            worker.stop(timeout)
         for listener in self.listeners:
             if hasattr(listener, "stop"):
                 listener.stop()
 
     def _rx_thread(self, bus: BusABC):
-        msg = None
+        msgs: List[Message] = []
         try:
             while self._running:
-                if msg is not None:
+                if msgs:
                     with self._lock:
                         if self._loop is not None:
                             self._loop.call_soon_threadsafe(
-                                self._on_message_received, msg
+                                self._on_messages_received, msgs
                             )
                         else:
-                            self._on_message_received(msg)
-                msg = bus.recv(self.timeout)
+                            for msg in msgs:
+                                self._on_message_received(msg)
+                msgs = self._receive_batch(bus)
         except Exception as exc:
             self.exception = exc
             if self._loop is not None:
@@ -121,32 +357,167 @@ class Notifier:
             else:
                 self._on_error(exc)
             raise
+        finally:
+            self._reader_finished()
+
+    def _selector_rx_thread(self):
+        try:
+            while self._running:
+                events = self._selector.select(self.timeout)  # type: ignore
+                ready = sorted((key.data for key, _ in events), key=lambda d: d[0])
+                for _, bus in ready:
+                    # the bus may have buffered more messages than fit into a
+                    # batch, which do not make its file descriptor readable
+                    while self._running:
+                        msgs = bus.recv_batch(self.max_batch_size, timeout=0)
+                        with self._lock:
+                            for msg in msgs:
+                                self._on_message_received(msg)
+                        if len(msgs) < self.max_batch_size:
+                            break
+        except Exception as exc:
+            self.exception = exc
+            self._on_error(exc)
+            raise
+        finally:
+            self._selector.close()  # type: ignore
+            self._reader_finished()
+
+    def _receive_batch(self, bus: BusABC) -> List[Message]:
+        msgs = bus.recv_batch(self.max_batch_size, timeout=self.timeout)
+        if msgs and self._loop is not None and self.max_latency > 0:
+            # collect more messages, until the batch is full or too old
+            end_time = time.time() + self.max_latency
+            while len(msgs) < self.max_batch_size and self._running:
+                time_left = end_time - time.time()
+                if time_left <= 0:
+                    break
+                msgs += bus.recv_batch(
+                    self.max_batch_size - len(msgs), timeout=time_left
+                )
+        return msgs
 
     def _on_message_available(self, bus: BusABC):
-        msg = bus.recv(0)
-        if msg is not None:
-            self._on_message_received(msg)
+        msgs = bus.recv_batch(self.max_batch_size, timeout=0)
+        if msgs:
+            self._on_messages_received(msgs)
+
+    def _on_messages_received(self, msgs: List[Message]):
+        """Pass a batch of messages on in the event loop."""
+        if self._subscriptions:
+            batches: Dict[int, Tuple[Listener, List[Message]]] = {}
+            for msg in msgs:
+                for listener in self._targets(msg):
+                    batches.setdefault(id(listener), (listener, []))[1].append(msg)
+            listener_batches = list(batches.values())
+        else:
+            listener_batches = [(listener, msgs) for listener in self.listeners]
+
+        for listener, batch in listener_batches:
+            handler = getattr(listener, "on_messages_received", None)
+            if handler is not None:
+                res = handler(batch)
+                if asyncio.iscoroutine(res):
+                    self._loop.create_task(res)  # type: ignore
+            else:
+                coroutines = [
+                    res for res in map(listener, batch) if asyncio.iscoroutine(res)
+                ]
+                if coroutines:
+                    # one task for the whole batch, which keeps the order
+                    self._loop.create_task(  # type: ignore
+                        self._await_in_order(coroutines)
+                    )
+
+    @staticmethod
+    async def _await_in_order(coroutines):
+        for coroutine in coroutines:
+            await coroutine
+
+    def _targets(self, msg: Message) -> list:
+        if self._subscriptions:
+            key = (msg.arbitration_id, msg.is_extended_id)
+            try:
+                return self._dispatch_table[key]
+            except KeyError:
+                if len(self._dispatch_table) >= self.DISPATCH_TABLE_SIZE:
+                    # bound the memory on buses with many IDs
+                    self._dispatch_table.clear()
+                targets = self._dispatch_table[key] = self._route(*key)
+                return targets
+        if self._queue_size is not None:
+            return self._workers
+        return self.listeners
 
     def _on_message_received(self, msg: Message):
-        for callback in self.listeners:
+        targets = self._targets(msg)
+        if self._queue_size is not None:
+            for worker in targets:
+                worker.put(msg)
+            return
+        for callback in targets:
             res = callback(msg)
             if self._loop is not None and asyncio.iscoroutine(res):
                 # Schedule coroutine
                 self._loop.create_task(res)
 
+    def _route(
+        self, arbitration_id: int, is_extended_id: bool
+    ) -> List[Union[Listener, ListenerWorker]]:
+        """Find the listeners, or their workers, interested in the given ID."""
+        targets: List[Union[Listener, ListenerWorker]] = []
+        for index, listener in enumerate(self.listeners):
+            subscription = self._subscriptions.get(id(listener))
+            if subscription is None or subscription.matches(
+                arbitration_id, is_extended_id
+            ):
+                if self._queue_size is not None:
+                    targets.append(self._workers[index])
+                else:
+                    targets.append(listener)
+        return targets
+
     def _on_error(self, exc: Exception):
         for listener in self.listeners:
             if hasattr(listener, "on_error"):
                 listener.on_error(exc)
 
-    def add_listener(self, listener: Listener):
+    def add_listener(
+        self,
+        listener: Listener,
+        arbitration_ids: Optional[Iterable[int]] = None,
+        can_filters: Optional[can.typechecking.CanFilters] = None,
+    ):
         """Add new Listener to the notification list.
         If it is already present, it will be called two times
         each time a message arrives.
 
+        A listener that only cares about some messages can subscribe to them
+        with ``arbitration_ids`` and ``can_filters``. It is then called for
+        the messages matching either of them. The listeners interested in an
+        ID are looked up once and remembered, so uninterested listeners cost
+        nothing per message. Up to :attr:`DISPATCH_TABLE_SIZE` IDs are
+        remembered at a time.
+
         :param listener: Listener to be added to the list to be notified
+        :param arbitration_ids:
+            The IDs of the messages to pass on, regardless of whether they
+            are standard or extended ones.
+        :param can_filters:
+            Filters of the messages to pass on, in the format of
+            :meth:`can.BusABC.set_filters`.
         """
-        self.listeners.append(listener)
+        with self._lock:
+            self.listeners.append(listener)
+            if self._queue_size is not None:
+                self._workers.append(self._create_worker(listener))
+            if arbitration_ids is not None or can_filters is not None:
+                self._subscriptions[id(listener)] = _Subscription(
+                    arbitration_ids, can_filters
+                )
+            else:
+                self._subscriptions.pop(id(listener), None)
+            self._dispatch_table.clear()
 
     def remove_listener(self, listener: Listener):
         """Remove a listener from the notification list. This method
@@ -156,4 +527,30 @@ class Notifier:
         :param listener: Listener to be removed from the list to be notified
         :raises ValueError: if `listener` was never added to this notifier
         """
-        self.listeners.remove(listener)
+        with self._lock:
+            self.listeners.remove(listener)
+            if self._queue_size is not None:
+                worker = self.worker(listener)
+                self._workers.remove(worker)
+            if listener not in self.listeners:
+                self._subscriptions.pop(id(listener), None)
+            self._dispatch_table.clear()
+        if self._queue_size is not None:
+            worker.stop()
+
+    def worker(self, listener: Listener) -> ListenerWorker:
+        """The worker calling the given listener, which has the counters of
+        its queue.
+
+        :param listener: A listener added to this notifier
+        :raises ValueError:
+            if `listener` was never added to this notifier, or the notifier
+            has no queues
+        """
+        for worker in self._workers:
+            if worker.listener is listener:
+                return worker
+        raise ValueError("{!r} has no worker in this notifier".format(listener))
+
+    def _create_worker(self, listener: Listener) -> ListenerWorker:
+        return ListenerWorker(listener, self._queue_size or 0, self._overflow)
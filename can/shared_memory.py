@@ -0,0 +1,315 @@
+"""
+This module contains a listener that writes messages into a ring buffer in
+shared memory, and the reader for it, which may run in another process.
+
+The ring buffer starts with a header, which is followed by fixed size
+records. The header holds the number of records that were written in total,
+which is updated after every write. Readers never take a lock: they copy
+the records they have not seen yet and check afterwards whether the writer
+overwrote some of them in the meantime.
+"""
+
+import logging
+import os
+import struct
+import sys
+import time
+from typing import Iterator, List, Optional
+
+from can.listener import Listener
+from can.message import Message
+import can.typechecking
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Python 3.6 and 3.7
+    shared_memory = None  # type: ignore
+
+log = logging.getLogger("can.shared_memory")
+
+# magic, version, capacity, record size; the write index follows at offset 16
+_HEADER = struct.Struct("<4sIII")
+_WRITE_INDEX = struct.Struct("<Q")
+_WRITE_INDEX_OFFSET = 16
+_HEADER_SIZE = 64
+_MAGIC = b"CANR"
+_VERSION = 1
+
+#: The layout of a record: timestamp, arbitration ID, flags, DLC and 64 data bytes
+RECORD = struct.Struct("<dIBB2x64s")
+
+FLAG_EXTENDED_ID = 0x01
+FLAG_REMOTE_FRAME = 0x02
+FLAG_ERROR_FRAME = 0x04
+FLAG_FD = 0x08
+FLAG_BITRATE_SWITCH = 0x10
+FLAG_ERROR_STATE_INDICATOR = 0x20
+
+
+def _check_available():
+    if shared_memory is None:
+        raise RuntimeError(
+            "Shared memory ring buffers need multiprocessing.shared_memory "
+            "of Python 3.8 or later"
+        )
+
+
+# the resource tracker only tracks shared memory on POSIX systems
+_UNTRACK = sys.version_info < (3, 13) and os.name != "nt"
+
+
+def _open(name: Optional[str], create: bool = False, size: int = 0):
+    """Opens shared memory that is not removed by the resource tracker.
+
+    Otherwise the tracker of a reader would remove the memory when the
+    reader ends, and the writer removes it in its ``stop()`` anyway.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(
+            name=name, create=create, size=size, track=False
+        )
+    memory = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if _UNTRACK:
+        # the tracker knows the memory by its private name with the leading slash
+        resource_tracker.unregister(memory._name, "shared_memory")  # type: ignore
+    return memory
+
+
+def _unlink(memory):
+    """Removes shared memory opened with :func:`_open`, if it still exists."""
+    if _UNTRACK:
+        # unlink() unregisters the memory again
+        resource_tracker.register(memory._name, "shared_memory")
+    try:
+        memory.unlink()
+    except FileNotFoundError:
+        log.debug("The shared memory %s was already removed", memory.name)
+        if _UNTRACK:
+            resource_tracker.unregister(memory._name, "shared_memory")
+
+
+def _pack_message(buffer, offset: int, msg: Message):
+    flags = (
+        (FLAG_EXTENDED_ID if msg.is_extended_id else 0)
+        | (FLAG_REMOTE_FRAME if msg.is_remote_frame else 0)
+        | (FLAG_ERROR_FRAME if msg.is_error_frame else 0)
+        | (FLAG_FD if msg.is_fd else 0)
+        | (FLAG_BITRATE_SWITCH if msg.bitrate_switch else 0)
+        | (FLAG_ERROR_STATE_INDICATOR if msg.error_state_indicator else 0)
+    )
+    RECORD.pack_into(
+        buffer,
+        offset,
+        msg.timestamp,
+        msg.arbitration_id,
+        flags,
+        msg.dlc,
+        bytes(msg.data),
+    )
+
+
+def record_to_message(
+    record: memoryview, channel: Optional[can.typechecking.Channel] = None
+) -> Message:
+    """Converts a raw record of a ring buffer into a message.
+
+    :param record: A record as returned by :meth:`SharedMemoryReader.read_records`.
+    :param channel: The channel to set in the message.
+    """
+    timestamp, arbitration_id, flags, dlc, data = RECORD.unpack_from(record)
+    return Message(
+        timestamp=timestamp,
+        arbitration_id=arbitration_id,
+        is_extended_id=bool(flags & FLAG_EXTENDED_ID),
+        is_remote_frame=bool(flags & FLAG_REMOTE_FRAME),
+        is_error_frame=bool(flags & FLAG_ERROR_FRAME),
+        is_fd=bool(flags & FLAG_FD),
+        bitrate_switch=bool(flags & FLAG_BITRATE_SWITCH),
+        error_state_indicator=bool(flags & FLAG_ERROR_STATE_INDICATOR),
+        channel=channel,
+        dlc=dlc,
+        data=None if flags & FLAG_REMOTE_FRAME else data[:dlc],
+    )
+
+
+class SharedMemoryWriter(Listener):
+    """Writes the received messages into a ring buffer in shared memory.
+
+    Any number of :class:`~can.SharedMemoryReader` instances, also in other
+    processes, can read the messages without pickling them. If a reader
+    falls behind by more than the capacity of the ring buffer, it loses the
+    oldest messages.
+
+    The shared memory is removed by :meth:`~can.SharedMemoryWriter.stop`.
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = 65536):
+        """
+        :param name:
+            The name of the shared memory to create, or None to choose a
+            unique one. Readers need it to attach to the ring buffer.
+        :param capacity:
+            The number of records in the ring buffer. A reader loses
+            messages when it falls behind by this many.
+
+        :raises RuntimeError:
+            if shared memory is not supported by this version of Python.
+        """
+        _check_available()
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._shm = _open(name, create=True, size=_HEADER_SIZE + capacity * RECORD.size)
+        self._buffer = self._shm.buf
+        _HEADER.pack_into(self._buffer, 0, _MAGIC, _VERSION, capacity, RECORD.size)
+        self._write_index = 0
+        _WRITE_INDEX.pack_into(self._buffer, _WRITE_INDEX_OFFSET, 0)
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory."""
+        return self._shm.name
+
+    def on_message_received(self, msg: Message):
+        self.on_messages_received([msg])
+
+    def on_messages_received(self, msgs: List[Message]):
+        index = self._write_index
+        for msg in msgs:
+            offset = _HEADER_SIZE + (index % self.capacity) * RECORD.size
+            _pack_message(self._buffer, offset, msg)
+            index += 1
+            # publish every record once it is complete, as readers consider
+            # all but the slot after the write index to be valid
+            _WRITE_INDEX.pack_into(self._buffer, _WRITE_INDEX_OFFSET, index)
+        self._write_index = index
+
+    def stop(self):
+        """Releases and removes the shared memory.
+
+        Readers that are still attached keep their mapping until they close it.
+        """
+        if self._buffer is None:
+            return
+        self._buffer.release()
+        self._buffer = None
+        self._shm.close()
+        _unlink(self._shm)
+
+
+class SharedMemoryReader:
+    """Reads the messages from the ring buffer of a :class:`~can.SharedMemoryWriter`.
+
+    The reader starts with the messages written after it attached. It can be
+    iterated over to get the currently available messages::
+
+        with can.SharedMemoryReader(name) as reader:
+            while True:
+                for msg in reader:
+                    print(msg)
+
+    :attr int lost:
+        The number of messages that were overwritten before they were read
+    """
+
+    def __init__(self, name: str, channel: Optional[can.typechecking.Channel] = None):
+        """
+        :param name: The name of the shared memory of the writer.
+        :param channel: The channel to set in the returned messages.
+
+        :raises RuntimeError:
+            if shared memory is not supported by this version of Python.
+        :raises ValueError:
+            if the shared memory is no ring buffer of messages.
+        """
+        _check_available()
+        self.channel = channel
+        self._shm = _open(name)
+        self._buffer = self._shm.buf
+        magic, version, capacity, record_size = _HEADER.unpack_from(self._buffer)
+        if magic != _MAGIC or version != _VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError("{} is no ring buffer of CAN messages".format(name))
+        self.capacity = capacity
+        self.lost = 0
+        self._read_index = self._load_write_index()
+
+    def _load_write_index(self) -> int:
+        return _WRITE_INDEX.unpack_from(self._buffer, _WRITE_INDEX_OFFSET)[0]
+
+    def read_records(self, max_count: Optional[int] = None) -> List[memoryview]:
+        """Takes out the records that were written since the last call.
+
+        The records are copied out of the shared memory at once, and can be
+        converted with :func:`~can.shared_memory.record_to_message` or
+        unpacked with :data:`~can.shared_memory.RECORD` directly.
+
+        :param max_count: The maximum number of records, or None for all.
+        :return: The records, which may be empty.
+        """
+        write_index = self._load_write_index()
+        # the slot of the oldest record may be just about to be overwritten
+        start = max(self._read_index, write_index - self.capacity + 1)
+        end = write_index if max_count is None else min(write_index, start + max_count)
+        if end <= start:
+            return []
+
+        data = bytearray()
+        index = start
+        while index < end:
+            # copy up to the end of the ring in one go
+            slot = index % self.capacity
+            count = min(end - index, self.capacity - slot)
+            offset = _HEADER_SIZE + slot * RECORD.size
+            data += self._buffer[offset : offset + count * RECORD.size]
+            index += count
+
+        # the writer may have overwritten the oldest records while copying, the
+        # ones after the copied records are counted by the next call
+        first_valid = min(max(start, self._load_write_index() - self.capacity + 1), end)
+        self.lost += first_valid - self._read_index
+        self._read_index = end
+
+        view = memoryview(data)
+        return [
+            view[position : position + RECORD.size]
+            for position in range(
+                (first_valid - start) * RECORD.size, len(data), RECORD.size
+            )
+        ]
+
+    def get_messages(
+        self, max_count: Optional[int] = None, timeout: float = 0.0
+    ) -> List[Message]:
+        """Takes out the messages that were written since the last call.
+
+        :param max_count: The maximum number of messages, or None for all.
+        :param timeout:
+            The number of seconds to wait for a message, if there is none.
+            The ring buffer is polled every millisecond in the meantime.
+        :return: The messages in the order they were written, which may be empty.
+        """
+        end_time = time.monotonic() + timeout
+        while True:
+            records = self.read_records(max_count)
+            if records or time.monotonic() >= end_time:
+                return [record_to_message(record, self.channel) for record in records]
+            time.sleep(0.001)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self.get_messages())
+
+    def close(self):
+        """Detaches from the shared memory, without removing it."""
+        if self._buffer is None:
+            return
+        self._buffer.release()
+        self._buffer = None
+        self._shm.close()
+
+    def __enter__(self) -> "SharedMemoryReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
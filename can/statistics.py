@@ -0,0 +1,275 @@
+"""
+This module contains a listener that keeps running statistics of the
+received messages, like the rate and period of every ID and the bus load.
+"""
+
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from can.bit_timing import BitTiming
+from can.listener import Listener
+from can.message import Message
+import can.typechecking
+
+# CRC delimiter, ACK slot and delimiter, end of frame and intermission
+_FRAME_END_BITS = 13
+# an error flag, its echo, the error delimiter and the intermission
+_ERROR_FRAME_BITS = 20
+
+
+def frame_bits(msg: Message) -> Tuple[int, int]:
+    """Estimates the length of a message on the bus.
+
+    The estimate includes the largest possible number of stuff bits, so it
+    is an upper bound of the actual length.
+
+    :param msg: The message.
+    :return:
+        The number of bits transmitted at the nominal bitrate, and the
+        number of bits transmitted at the data bitrate of CAN FD.
+    """
+    if msg.is_error_frame:
+        return _ERROR_FRAME_BITS, 0
+    length = 0 if msg.is_remote_frame else len(msg.data)
+    if not msg.is_fd:
+        # from the start of frame to the end of the CRC, which may be stuffed
+        stuffed = (54 if msg.is_extended_id else 34) + 8 * length
+        return stuffed + (stuffed - 1) // 4 + _FRAME_END_BITS, 0
+
+    # the arbitration phase up to the bit rate switch
+    arbitration = 36 if msg.is_extended_id else 17
+    nominal = arbitration + (arbitration - 1) // 4 + _FRAME_END_BITS
+    # the error state indicator, DLC and data, followed by the stuff count and
+    # the CRC, which have fixed stuff bits
+    crc = 17 if length <= 16 else 21
+    data = 5 + 8 * length
+    data += data // 4 + 4 + crc + (7 + crc) // 4
+    if msg.bitrate_switch:
+        return nominal, data
+    return nominal + data, 0
+
+
+class IdStatistics:
+    """The running statistics of the messages of one ID.
+
+    The period is updated with Welford's algorithm, so the statistics take
+    constant time and memory per message.
+    """
+
+    __slots__ = (
+        "count",
+        "first_timestamp",
+        "last_timestamp",
+        "mean_period",
+        "max_gap",
+        "_m2",
+    )
+
+    def __init__(self, timestamp: float):
+        #: The number of messages
+        self.count = 1
+        #: The timestamp of the first message
+        self.first_timestamp = timestamp
+        #: The timestamp of the latest message
+        self.last_timestamp = timestamp
+        #: The mean time between messages
+        self.mean_period = 0.0
+        #: The longest time between messages
+        self.max_gap = 0.0
+        self._m2 = 0.0
+
+    def _add(self, timestamp: float):
+        period = timestamp - self.last_timestamp
+        self.last_timestamp = timestamp
+        self.count += 1
+        periods = self.count - 1
+        delta = period - self.mean_period
+        self.mean_period += delta / periods
+        self._m2 += delta * (period - self.mean_period)
+        if period > self.max_gap:
+            self.max_gap = period
+
+    @property
+    def stddev_period(self) -> float:
+        """The standard deviation of the time between messages."""
+        periods = self.count - 1
+        return math.sqrt(self._m2 / periods) if periods else 0.0
+
+    @property
+    def rate(self) -> float:
+        """The number of messages per second."""
+        duration = self.last_timestamp - self.first_timestamp
+        return (self.count - 1) / duration if duration > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The statistics as a dictionary."""
+        return {
+            "count": self.count,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "rate": self.rate,
+            "mean_period": self.mean_period,
+            "stddev_period": self.stddev_period,
+            "max_gap": self.max_gap,
+        }
+
+
+class ChannelStatistics:
+    """The running statistics of all messages of one channel."""
+
+    __slots__ = ("count", "first_timestamp", "last_timestamp", "busy_time", "ids")
+
+    def __init__(self, timestamp: float):
+        #: The number of messages
+        self.count = 0
+        #: The timestamp of the first message
+        self.first_timestamp = timestamp
+        #: The timestamp of the latest message
+        self.last_timestamp = timestamp
+        #: The estimated number of seconds the bus was busy with the messages.
+        #: The timestamp of a message is taken at the end of the frame, so the
+        #: first message, which was sent before the first timestamp, is left out.
+        self.busy_time = 0.0
+        #: The statistics of every ID, keyed by the arbitration ID with bit 32
+        #: set for extended IDs
+        self.ids: Dict[int, IdStatistics] = {}
+
+    @property
+    def bus_load(self) -> float:
+        """The estimated share of time the bus was busy, between 0 and 1."""
+        duration = self.last_timestamp - self.first_timestamp
+        return min(1.0, self.busy_time / duration) if duration > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The statistics of the channel and all of its IDs as a dictionary."""
+        ids: List[Dict[str, Any]] = []
+        for key, statistics in sorted(self.ids.items()):
+            entry = {
+                "arbitration_id": key & 0x1FFFFFFF,
+                "is_extended_id": bool(key >> 32),
+            }
+            entry.update(statistics.as_dict())
+            ids.append(entry)
+        return {
+            "count": self.count,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "busy_time": self.busy_time,
+            "bus_load": self.bus_load,
+            "ids": ids,
+        }
+
+
+class MessageStatistics(Listener):
+    """Keeps running statistics of the received messages.
+
+    For every channel and ID, the message rate, the mean and standard
+    deviation of the period and the longest gap between messages are
+    updated with every message. The bus load of every channel is estimated
+    from the length of the frames, see :func:`~can.statistics.frame_bits`.
+
+    The statistics can be read while messages arrive, e.g. from another
+    thread::
+
+        statistics = can.MessageStatistics(bitrate=500000)
+        notifier = can.Notifier(bus, [statistics])
+        ...
+        print(statistics.as_dict())
+    """
+
+    def __init__(
+        self,
+        bitrate: Union[int, float, BitTiming] = 500000,
+        data_bitrate: Optional[Union[int, float, BitTiming]] = None,
+    ):
+        """
+        :param bitrate:
+            The nominal bitrate of the buses in bits per second, or their
+            :class:`~can.BitTiming`.
+        :param data_bitrate:
+            The bitrate of the data phase of CAN FD frames with the bitrate
+            switch set. If not given, it is the same as the nominal one.
+        """
+        if isinstance(bitrate, BitTiming):
+            bitrate = bitrate.bitrate
+        if isinstance(data_bitrate, BitTiming):
+            data_bitrate = data_bitrate.bitrate
+        self.bitrate = bitrate
+        self.data_bitrate = data_bitrate or bitrate
+        self._channels: Dict[Optional[can.typechecking.Channel], ChannelStatistics] = {}
+        self._lock = threading.Lock()
+
+    def on_message_received(self, msg: Message):
+        with self._lock:
+            self._add(msg)
+
+    def on_messages_received(self, msgs: List[Message]):
+        with self._lock:
+            for msg in msgs:
+                self._add(msg)
+
+    def _add(self, msg: Message):
+        timestamp = msg.timestamp
+        channel = self._channels.get(msg.channel)
+        if channel is None:
+            channel = self._channels[msg.channel] = ChannelStatistics(timestamp)
+        else:
+            nominal_bits, data_bits = frame_bits(msg)
+            channel.busy_time += nominal_bits / self.bitrate
+            if data_bits:
+                channel.busy_time += data_bits / self.data_bitrate
+        channel.count += 1
+        channel.last_timestamp = timestamp
+
+        key = msg.arbitration_id | (1 << 32 if msg.is_extended_id else 0)
+        statistics = channel.ids.get(key)
+        if statistics is None:
+            channel.ids[key] = IdStatistics(timestamp)
+        else:
+            statistics._add(timestamp)
+
+    def get(
+        self,
+        arbitration_id: int,
+        is_extended_id: bool = True,
+        channel: Optional[can.typechecking.Channel] = None,
+    ) -> Optional[IdStatistics]:
+        """The statistics of the messages with the given ID.
+
+        :param arbitration_id: The arbitration ID of the messages.
+        :param is_extended_id: If the ID is an extended one.
+        :param channel: The channel the messages were received on.
+        :return: The statistics, or None if no such message was received.
+        """
+        channel_statistics = self._channels.get(channel)
+        if channel_statistics is None:
+            return None
+        key = arbitration_id | (1 << 32 if is_extended_id else 0)
+        return channel_statistics.ids.get(key)
+
+    def channel(
+        self, channel: Optional[can.typechecking.Channel] = None
+    ) -> Optional[ChannelStatistics]:
+        """The statistics of all messages of a channel.
+
+        :param channel: The channel the messages were received on.
+        :return: The statistics, or None if no message was received on it.
+        """
+        return self._channels.get(channel)
+
+    def as_dict(self) -> Dict[Optional[can.typechecking.Channel], Dict[str, Any]]:
+        """The statistics of all channels and IDs, keyed by channel.
+
+        See :meth:`~can.statistics.ChannelStatistics.as_dict` for the contents.
+        """
+        with self._lock:
+            return {
+                channel: statistics.as_dict()
+                for channel, statistics in self._channels.items()
+            }
+
+    def reset(self):
+        """Forget all messages and start over."""
+        with self._lock:
+            self._channels.clear()
@@ -52,6 +52,9 @@ class CanViewer:
 
         # Initialise the ID dictionary, start timestamp, scroll and variable for pausing the viewer
         self.ids = {}
+        # The latest message, counter and time between messages of every ID
+        # the rows are keyed by the arbitration ID only, so the counters are too
+        self.cache = can.MessageCache(per_channel=False)
         self.start_time = None
         self.scroll = 0
         self.paused = False
@@ -95,6 +98,7 @@ class CanViewer:
             # Clear by pressing 'c'
             elif key == ord("c"):
                 self.ids = {}
+                self.cache.clear()
                 self.start_time = None
                 self.scroll = 0
                 self.draw_header()
@@ -175,35 +179,32 @@ class CanViewer:
         if msg.is_extended_id:
             key |= 1 << 32
 
-        new_id_added, length_changed = False, False
         if not sorting:
             # Check if it is a new message or if the length is not the same
             if key not in self.ids:
-                new_id_added = True
+                # Increment the row index if it was just added
+                row = len(self.ids) + 1
                 # Set the start time when the first message has been received
                 if not self.start_time:
                     self.start_time = msg.timestamp
-            elif msg.dlc != self.ids[key]["msg"].dlc:
-                length_changed = True
-
-            if new_id_added or length_changed:
-                # Increment the index if it was just added, but keep it if the length just changed
-                row = len(self.ids) + 1 if new_id_added else self.ids[key]["row"]
-
-                # It's a new message ID or the length has changed, so add it to the dict
-                # The first index is the row index, the second is the frame counter,
-                # the third is a copy of the CAN-Bus frame
-                # and the forth index is the time since the previous message
-                self.ids[key] = {"row": row, "count": 0, "msg": msg, "dt": 0}
             else:
-                # Calculate the time since the last message and save the timestamp
-                self.ids[key]["dt"] = msg.timestamp - self.ids[key]["msg"].timestamp
-
-                # Copy the CAN-Bus frame - this is used for sorting
-                self.ids[key]["msg"] = msg
-
-            # Increment frame counter
-            self.ids[key]["count"] += 1
+                row = self.ids[key]["row"]
+                if msg.dlc != self.ids[key]["msg"].dlc:
+                    # Start counting again if the length has changed
+                    self.cache.remove(msg.arbitration_id, msg.is_extended_id)
+
+            self.cache.on_message_received(msg)
+            cached = self.cache.get(msg.arbitration_id, msg.is_extended_id)
+
+            # The first index is the row index, the second is the frame counter,
+            # the third is a copy of the CAN-Bus frame
+            # and the forth index is the time since the previous message
+            self.ids[key] = {
+                "row": row,
+                "count": cached.message_count,
+                "msg": cached.msg,
+                "dt": cached.period,
+            }
 
         # Format the CAN-Bus ID as a hex value
         arbitration_id_string = "0x{0:0{1}X}".format(
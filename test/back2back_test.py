@@ -7,7 +7,7 @@ This module tests two virtual buses attached to each other.
 
 import sys
 import unittest
-from time import sleep
+from time import sleep, time
 from multiprocessing.dummy import Pool as ThreadPool
 
 import pytest
@@ -125,6 +125,40 @@ class Back2BackTestCase(unittest.TestCase):
         msg = can.Message(is_extended_id=False, arbitration_id=0x300, data=[4, 5, 6])
         self._send_and_receive(msg)
 
+    def test_recv_batch(self):
+        for i in range(10):
+            self.bus1.send(can.Message(arbitration_id=i, is_extended_id=False))
+        recv_msgs = self.bus2.recv_batch(max_messages=4, timeout=self.TIMEOUT)
+        self.assertEqual([msg.arbitration_id for msg in recv_msgs], [0, 1, 2, 3])
+        recv_msgs = self.bus2.recv_batch(timeout=self.TIMEOUT)
+        self.assertEqual([msg.arbitration_id for msg in recv_msgs], [4, 5, 6, 7, 8, 9])
+        self.assertEqual(self.bus2.recv_batch(timeout=self.TIMEOUT), [])
+
+    def test_recv_batch_filtered(self):
+        self.bus2.set_filters([{"can_id": 0x1, "can_mask": 0x1, "extended": False}])
+        for i in range(10):
+            self.bus1.send(can.Message(arbitration_id=i, is_extended_id=False))
+        recv_msgs = self.bus2.recv_batch(timeout=self.TIMEOUT)
+        self.assertEqual([msg.arbitration_id for msg in recv_msgs], [1, 3, 5, 7, 9])
+
+    def test_recv_batch_default_implementation(self):
+        self.bus2.set_filters([{"can_id": 0x1, "can_mask": 0x1, "extended": False}])
+        for i in range(10):
+            self.bus1.send(can.Message(arbitration_id=i, is_extended_id=False))
+        # pylint: disable=protected-access
+        recv_msgs, already_filtered = can.BusABC._recv_internal_batch(
+            self.bus2, 3, self.TIMEOUT
+        )
+        self.assertTrue(already_filtered)
+        self.assertEqual([msg.arbitration_id for msg in recv_msgs], [1, 3, 5])
+
+    def test_send_batch(self):
+        msgs = [can.Message(arbitration_id=i, is_extended_id=False) for i in range(5)]
+        self.assertEqual(self.bus1.send_batch(msgs, timeout=self.TIMEOUT), 5)
+        for msg in msgs:
+            recv_msg = self.bus2.recv(self.TIMEOUT)
+            self._check_received_message(recv_msg, msg)
+
     @unittest.skipUnless(TEST_CAN_FD, "Don't test CAN-FD")
     def test_fd_message(self):
         msg = can.Message(
@@ -152,6 +186,41 @@ class BasicTestSocketCan(Back2BackTestCase):
     INTERFACE_2 = "socketcan"
     CHANNEL_2 = "vcan0"
 
+    def test_ancillary_timestamps(self):
+        self.assertTrue(self.bus2._ancillary_timestamps)
+        before = time()
+        self.bus1.send(can.Message())
+        recv_msg = self.bus2.recv(self.TIMEOUT)
+        after = time()
+        self.assertIsNotNone(recv_msg)
+        self.assertTrue(before <= recv_msg.timestamp <= after)
+
+
+class VirtualSendBatchTest(unittest.TestCase):
+    def setUp(self):
+        channel = "virtual_send_batch"
+        self.sender = can.Bus(channel=channel, bustype="virtual")
+        self.large = can.Bus(channel=channel, bustype="virtual", rx_queue_size=10)
+        self.small = can.Bus(channel=channel, bustype="virtual", rx_queue_size=2)
+
+    def tearDown(self):
+        for bus in (self.sender, self.large, self.small):
+            bus.shutdown()
+
+    def test_partial_batch(self):
+        msgs = [can.Message(arbitration_id=i) for i in range(5)]
+        started = time()
+        self.assertEqual(self.sender.send_batch(msgs, timeout=0.2), 2)
+        # the timeout applies to the whole batch
+        self.assertLess(time() - started, 0.35)
+        # like with send(), the large queue kept the message that did not fit
+        # into the small one, but the later messages reached no one
+        self.assertEqual(self.large.queue.qsize(), 3)
+        self.assertEqual(self.small.queue.qsize(), 2)
+
+        with self.assertRaises(can.CanError):
+            self.sender.send_batch(msgs, timeout=0)
+
 
 @unittest.skipUnless(TEST_INTERFACE_SOCKETCAN, "skip testing of socketcan")
 class SocketCanBroadcastChannel(unittest.TestCase):
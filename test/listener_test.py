@@ -154,6 +154,70 @@ class ListenerTest(BusTest):
         a_listener.stop()
         self.assertIsNotNone(a_listener.get_message(0.1))
 
+    def testBufferedListenerBounded(self):
+        a_listener = can.BufferedReader(maxsize=2)
+        for arbitration_id in range(4):
+            a_listener(generate_message(arbitration_id))
+        self.assertEqual(a_listener.dropped, 2)
+        msgs = a_listener.get_messages(timeout=0.1)
+        self.assertEqual([msg.arbitration_id for msg in msgs], [0, 1])
+
+        a_listener = can.BufferedReader(maxsize=2, overflow="drop_oldest")
+        for arbitration_id in range(4):
+            a_listener(generate_message(arbitration_id))
+        self.assertEqual(a_listener.dropped, 2)
+        msgs = a_listener.get_messages(timeout=0.1)
+        self.assertEqual([msg.arbitration_id for msg in msgs], [2, 3])
+
+    def testBufferedListenerGetMessages(self):
+        a_listener = can.BufferedReader()
+        self.assertEqual(a_listener.get_messages(timeout=0.01), [])
+        for arbitration_id in range(5):
+            a_listener(generate_message(arbitration_id))
+        self.assertEqual(len(a_listener.get_messages(3)), 3)
+        a_listener.stop()
+        self.assertEqual(len(a_listener.get_messages(timeout=None)), 2)
+        self.assertEqual(a_listener.get_messages(timeout=None), [])
+
+    def testMessageCache(self):
+        cache = can.MessageCache()
+        cache(can.Message(timestamp=1.0, arbitration_id=0x10, is_extended_id=False))
+        cache.on_messages_received(
+            [
+                can.Message(timestamp=1.5, arbitration_id=0x10, is_extended_id=False),
+                can.Message(timestamp=2.0, arbitration_id=0x10, channel=1),
+            ]
+        )
+        entry = cache.get(0x10, is_extended_id=False)
+        self.assertEqual(entry.message_count, 2)
+        self.assertEqual(entry.period, 0.5)
+        self.assertEqual(entry.first_timestamp, 1.0)
+        self.assertEqual(entry.last_timestamp, 1.5)
+        self.assertEqual(entry.msg.timestamp, 1.5)
+        self.assertIsNone(cache.get(0x10))
+        self.assertEqual(cache.get(0x10, channel=1).period, 0.0)
+
+        snapshot = cache.snapshot()
+        cache(can.Message(timestamp=3.0, arbitration_id=0x10, is_extended_id=False))
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(snapshot[(None, 0x10, False)].message_count, 2)
+        self.assertEqual(cache.get(0x10, is_extended_id=False).message_count, 3)
+
+        cache.remove(0x10, channel=1)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(cache.snapshot(), {})
+
+    def testMessageCacheOfAllChannels(self):
+        cache = can.MessageCache(per_channel=False)
+        cache(can.Message(timestamp=1.0, arbitration_id=0x10, channel=0))
+        cache(can.Message(timestamp=1.5, arbitration_id=0x10, channel=1))
+        self.assertEqual(len(cache), 1)
+        entry = cache.get(0x10)
+        self.assertEqual(entry.message_count, 2)
+        self.assertEqual(entry.period, 0.5)
+        self.assertEqual(entry.msg.channel, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
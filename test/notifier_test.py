@@ -1,11 +1,16 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import select
+import socket
 import unittest
+import threading
 import time
 import asyncio
+import queue
 
 import can
+from can.listener import _MessageQueue
 
 
 class NotifierTest(unittest.TestCase):
@@ -38,6 +43,339 @@ class NotifierTest(unittest.TestCase):
         bus1.shutdown()
         bus2.shutdown()
 
+    def test_stop_waits_for_reader(self):
+        bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        listener = BlockingListener()
+        notifier = can.Notifier(bus, [listener], 0.1)
+        bus.send(can.Message())
+        self.assertTrue(listener.received.wait(1))
+
+        notifier.stop(timeout=0.1)
+        # the listener is still being called
+        self.assertFalse(listener.stopped.is_set())
+        listener.release.set()
+        self.assertTrue(listener.stopped.wait(1))
+        bus.shutdown()
+
+
+class BlockingListener(can.Listener):
+    def __init__(self):
+        self.received = threading.Event()
+        self.release = threading.Event()
+        self.stopped = threading.Event()
+
+    def on_message_received(self, msg):
+        self.received.set()
+        self.release.wait(5)
+
+    def stop(self):
+        self.stopped.set()
+
+
+class Recorder(can.Listener):
+    def __init__(self):
+        self.ids = []
+
+    def on_message_received(self, msg):
+        self.ids.append(msg.arbitration_id)
+
+
+class SubscriptionTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        self.notifier = can.Notifier(self.bus, [], 0.1)
+
+    def tearDown(self):
+        self.notifier.stop()
+        self.bus.shutdown()
+
+    def test_arbitration_ids(self):
+        everything = Recorder()
+        some = Recorder()
+        self.notifier.add_listener(everything)
+        self.notifier.add_listener(some, arbitration_ids={0x100, 0x200})
+        for arbitration_id in (0x100, 0x123, 0x200, 0x100):
+            self.notifier._on_message_received(
+                can.Message(arbitration_id=arbitration_id)
+            )
+        self.assertEqual(everything.ids, [0x100, 0x123, 0x200, 0x100])
+        self.assertEqual(some.ids, [0x100, 0x200, 0x100])
+        self.assertEqual(self.notifier._dispatch_table[(0x123, True)], [everything])
+
+    def test_can_filters(self):
+        listener = Recorder()
+        self.notifier.add_listener(
+            listener,
+            can_filters=[{"can_id": 0x100, "can_mask": 0x700, "extended": False}],
+        )
+        for arbitration_id in (0x100, 0x1FF, 0x200):
+            self.notifier._on_message_received(
+                can.Message(arbitration_id=arbitration_id, is_extended_id=False)
+            )
+        self.notifier._on_message_received(can.Message(arbitration_id=0x100))
+        self.assertEqual(listener.ids, [0x100, 0x1FF])
+
+    def test_dispatch_table_size(self):
+        listener = Recorder()
+        self.notifier.add_listener(listener, arbitration_ids=[0x1])
+        self.notifier.DISPATCH_TABLE_SIZE = 10
+        for arbitration_id in range(100):
+            self.notifier._on_message_received(
+                can.Message(arbitration_id=arbitration_id)
+            )
+            self.assertLessEqual(len(self.notifier._dispatch_table), 10)
+        self.notifier._on_message_received(can.Message(arbitration_id=0x1))
+        self.assertEqual(listener.ids, [0x1, 0x1])
+
+    def test_remove_listener(self):
+        listener = Recorder()
+        self.notifier.add_listener(listener, arbitration_ids=[0x1])
+        self.notifier._on_message_received(can.Message(arbitration_id=0x1))
+        self.notifier.remove_listener(listener)
+        self.notifier._on_message_received(can.Message(arbitration_id=0x1))
+        self.assertEqual(listener.ids, [0x1])
+        self.assertEqual(self.notifier._subscriptions, {})
+
+    def test_queued(self):
+        bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        reader = can.BufferedReader()
+        notifier = can.Notifier(bus, [], 0.1, queue_size=10)
+        notifier.add_listener(reader, arbitration_ids=[0x2])
+        bus.send(can.Message(arbitration_id=0x1))
+        bus.send(can.Message(arbitration_id=0x2))
+        self.assertEqual(reader.get_message(1).arbitration_id, 0x2)
+        self.assertIsNone(reader.get_message(0.1))
+        notifier.stop()
+        bus.shutdown()
+
+
+class QueuedNotifierTest(unittest.TestCase):
+    def test_slow_listener_does_not_stall_others(self):
+        bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        release = threading.Event()
+        reader = can.BufferedReader()
+        notifier = can.Notifier(
+            bus, [lambda msg: release.wait(), reader], 0.1, queue_size=10
+        )
+        for _ in range(5):
+            bus.send(can.Message())
+        for _ in range(5):
+            self.assertIsNotNone(reader.get_message(1))
+        release.set()
+        notifier.stop()
+        bus.shutdown()
+
+    def test_drop_newest(self):
+        bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        release = threading.Event()
+        received = []
+
+        def slow(msg):
+            release.wait()
+            received.append(msg.arbitration_id)
+
+        notifier = can.Notifier(bus, [slow], 0.1, queue_size=2, overflow="drop_newest")
+        for arbitration_id in range(6):
+            bus.send(can.Message(arbitration_id=arbitration_id))
+            time.sleep(0.05)
+        worker = notifier.worker(slow)
+        self.assertEqual(worker.depth, 2)
+        self.assertEqual(worker.max_depth, 2)
+        self.assertEqual(worker.dropped, 3)
+        release.set()
+        notifier.stop()
+        bus.shutdown()
+        # the first message was taken out of the queue before blocking
+        self.assertEqual(received, [0, 1, 2])
+
+    def test_add_and_remove_listener(self):
+        bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        notifier = can.Notifier(bus, [], 0.1, queue_size=0)
+        reader = can.BufferedReader()
+        notifier.add_listener(reader)
+        bus.send(can.Message())
+        self.assertIsNotNone(reader.get_message(1))
+        notifier.remove_listener(reader)
+        with self.assertRaises(ValueError):
+            notifier.worker(reader)
+        notifier.stop()
+        bus.shutdown()
+
+    def test_invalid_arguments(self):
+        bus = can.Bus("test", bustype="virtual")
+        with self.assertRaises(ValueError):
+            can.Notifier(bus, [], queue_size=1, overflow="ignore")
+        with self.assertRaises(ValueError):
+            can.Notifier(bus, [], queue_size=1, loop=asyncio.new_event_loop())
+        bus.shutdown()
+
+
+class SocketPairBus(can.BusABC):
+    """A bus with a file descriptor, which receives the arbitration IDs
+    written to the other end of a socket pair.
+    """
+
+    def __init__(self, channel, **kwargs):
+        self.channel_info = "socket pair bus {}".format(channel)
+        self._socket, self.remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.channel = channel
+        super().__init__(channel, **kwargs)
+
+    def _recv_internal(self, timeout):
+        readable, _, _ = select.select([self._socket], [], [], timeout)
+        if not readable:
+            return None, False
+        data = self._socket.recv(4)
+        msg = can.Message(
+            arbitration_id=int.from_bytes(data, "big"), channel=self.channel
+        )
+        return msg, False
+
+    def send(self, msg, timeout=None):
+        self.remote.send(msg.arbitration_id.to_bytes(4, "big"))
+
+    def fileno(self):
+        return self._socket.fileno()
+
+    def shutdown(self):
+        self._socket.close()
+        self.remote.close()
+
+
+class BufferingSocketPairBus(SocketPairBus):
+    """Reads all arbitration IDs written at once, like the serial buses."""
+
+    def __init__(self, channel, **kwargs):
+        self._buffer = []
+        super().__init__(channel, **kwargs)
+
+    def _recv_internal(self, timeout):
+        if not self._buffer:
+            readable, _, _ = select.select([self._socket], [], [], timeout)
+            if not readable:
+                return None, False
+            data = self._socket.recv(1024)
+            self._buffer = [
+                int.from_bytes(data[index : index + 4], "big")
+                for index in range(0, len(data), 4)
+            ]
+        msg = can.Message(arbitration_id=self._buffer.pop(0), channel=self.channel)
+        return msg, False
+
+    def send_ids(self, arbitration_ids):
+        self.remote.send(b"".join(i.to_bytes(4, "big") for i in arbitration_ids))
+
+
+class SelectorNotifierTest(unittest.TestCase):
+    def test_one_thread_for_fd_buses(self):
+        buses = [SocketPairBus(channel) for channel in range(3)]
+        virtual = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        for bus in reversed(buses):
+            bus.send(can.Message(arbitration_id=bus.channel))
+        reader = can.BufferedReader()
+        notifier = can.Notifier(buses + [virtual], [reader], 0.1, use_selector=True)
+        self.assertEqual(len(notifier._readers), 2)
+
+        received = [reader.get_message(1) for _ in buses]
+        # all buses were ready, so they are read in the order they were added
+        self.assertEqual([msg.channel for msg in received], [0, 1, 2])
+
+        virtual.send(can.Message(arbitration_id=0x10))
+        self.assertEqual(reader.get_message(1).arbitration_id, 0x10)
+
+        notifier.stop()
+        for bus in buses + [virtual]:
+            bus.shutdown()
+
+    def test_buffered_messages_beyond_batch(self):
+        bus = BufferingSocketPairBus(0)
+        reader = can.BufferedReader()
+        notifier = can.Notifier(bus, [reader], 0.1, max_batch_size=2, use_selector=True)
+        bus.send_ids(range(5))
+        received = [reader.get_message(0.5) for _ in range(5)]
+        self.assertEqual([msg.arbitration_id for msg in received], list(range(5)))
+        notifier.stop()
+        bus.shutdown()
+
+    def test_add_bus(self):
+        reader = can.BufferedReader()
+        notifier = can.Notifier([], [reader], 0.1, use_selector=True)
+        bus = SocketPairBus(0)
+        notifier.add_bus(bus)
+        bus.send(can.Message(arbitration_id=0x42))
+        self.assertEqual(reader.get_message(1).arbitration_id, 0x42)
+        notifier.stop()
+        bus.shutdown()
+
+    def test_stop_waits_for_selector_thread(self):
+        bus = SocketPairBus(0)
+        listener = BlockingListener()
+        notifier = can.Notifier(bus, [listener], 0.1, use_selector=True)
+        bus.send(can.Message(arbitration_id=0x42))
+        self.assertTrue(listener.received.wait(1))
+
+        notifier.stop(timeout=0.1)
+        self.assertFalse(listener.stopped.is_set())
+        self.assertIsNotNone(notifier._selector.get_map())
+        listener.release.set()
+        self.assertTrue(listener.stopped.wait(1))
+        notifier._selector_thread.join(1)
+        # the selector was closed by its thread
+        self.assertIsNone(notifier._selector.get_map())
+        bus.shutdown()
+
+    def test_loop_and_selector(self):
+        with self.assertRaises(ValueError):
+            can.Notifier([], [], loop=asyncio.new_event_loop(), use_selector=True)
+
+
+class MessageQueueTest(unittest.TestCase):
+    def test_simple_queue_interface(self):
+        messages = _MessageQueue()
+        self.assertTrue(messages.empty())
+        with self.assertRaises(queue.Empty):
+            messages.get_nowait()
+        with self.assertRaises(queue.Empty):
+            messages.get(timeout=0.01)
+
+        messages.put(can.Message(arbitration_id=1))
+        messages.put_nowait(can.Message(arbitration_id=2))
+        self.assertFalse(messages.empty())
+        self.assertEqual(messages.qsize(), 2)
+        self.assertEqual(messages.get().arbitration_id, 1)
+        self.assertEqual(messages.get_nowait().arbitration_id, 2)
+
+    def test_drop_oldest(self):
+        queue = _MessageQueue(2, "drop_oldest")
+        for arbitration_id in range(4):
+            self.assertTrue(queue.put(can.Message(arbitration_id=arbitration_id)))
+        self.assertEqual(queue.dropped, 2)
+        msgs = queue.get_many(timeout=0)
+        self.assertEqual([msg.arbitration_id for msg in msgs], [2, 3])
+
+    def test_block(self):
+        queue = _MessageQueue(1, "block")
+        queue.put(can.Message())
+        thread = threading.Thread(target=queue.put, args=(can.Message(),))
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(len(queue.get_many(timeout=0)), 1)
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(queue), 1)
+
+    def test_get_many(self):
+        queue = _MessageQueue()
+        self.assertEqual(queue.get_many(timeout=0.01), [])
+        for _ in range(3):
+            queue.put(can.Message())
+        self.assertEqual(len(queue.get_many(2, timeout=0)), 2)
+        queue.close()
+        self.assertFalse(queue.put(can.Message()))
+        self.assertEqual(len(queue.get_many()), 1)
+        self.assertEqual(queue.get_many(), [])
+
 
 class AsyncNotifierTest(unittest.TestCase):
     def test_asyncio_notifier(self):
@@ -53,6 +391,69 @@ class AsyncNotifierTest(unittest.TestCase):
         notifier.stop()
         bus.shutdown()
 
+    def test_batches(self):
+        loop = asyncio.new_event_loop()
+        bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        batches = []
+
+        class BatchRecorder(can.Listener):
+            def on_message_received(self, msg):
+                batches.append([msg])
+
+            def on_messages_received(self, msgs):
+                batches.append(msgs)
+
+        notifier = can.Notifier(
+            bus, [BatchRecorder()], 0.1, loop=loop, max_batch_size=4, max_latency=0.5
+        )
+        for arbitration_id in range(6):
+            bus.send(can.Message(arbitration_id=arbitration_id))
+            time.sleep(0.01)
+        loop.run_until_complete(asyncio.sleep(0.8))
+        notifier.stop()
+        bus.shutdown()
+        loop.close()
+
+        self.assertEqual([len(batch) for batch in batches], [4, 2])
+        ids = [msg.arbitration_id for batch in batches for msg in batch]
+        self.assertEqual(ids, list(range(6)))
+
+    def test_coroutine_listener(self):
+        loop = asyncio.new_event_loop()
+        bus = can.Bus("test", bustype="virtual", receive_own_messages=True)
+        received = []
+
+        async def callback(msg):
+            await asyncio.sleep(0)
+            received.append(msg.arbitration_id)
+
+        notifier = can.Notifier(bus, [callback], 0.1, loop=loop)
+        for arbitration_id in range(5):
+            bus.send(can.Message(arbitration_id=arbitration_id))
+        loop.run_until_complete(asyncio.sleep(0.3))
+        notifier.stop()
+        bus.shutdown()
+        loop.close()
+
+        self.assertEqual(received, list(range(5)))
+
+    def test_get_messages(self):
+        async def get_messages():
+            reader = can.AsyncBufferedReader()
+            reader.on_messages_received(
+                [
+                    can.Message(arbitration_id=arbitration_id)
+                    for arbitration_id in range(5)
+                ]
+            )
+            return await reader.get_messages(3), await reader.get_messages()
+
+        loop = asyncio.new_event_loop()
+        first, second = loop.run_until_complete(get_messages())
+        loop.close()
+        self.assertEqual([msg.arbitration_id for msg in first], [0, 1, 2])
+        self.assertEqual([msg.arbitration_id for msg in second], [3, 4])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -125,6 +125,16 @@ class SimpleSerialTestBase(ComparingMessagesTestCase):
         self.assertMessageEqual(msg, msg_receive)
         self.assertEqual(msg.timestamp, msg_receive.timestamp)
 
+    def test_rx_tx_batch(self):
+        """
+        Tests the transfer of several messages written at once
+        """
+        msgs = [can.Message(arbitration_id=i, data=[i] * i) for i in range(1, 4)]
+        self.assertEqual(self.bus.send_batch(msgs), len(msgs))
+        for msg in msgs:
+            msg_receive = self.bus.recv()
+            self.assertMessageEqual(msg, msg_receive)
+
     def test_rx_tx_min_timestamp_error(self):
         """
         Tests for an exception with an out of range timestamp (min - 1)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This module tests the shared memory ring buffer.
+"""
+
+import multiprocessing
+import subprocess
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+import can
+from can import shared_memory
+
+from .message_helper import ComparingMessagesTestCase
+
+
+def _read_in_process(name, count, attached, results):
+    with can.SharedMemoryReader(name) as reader:
+        attached.set()
+        msgs = []
+        end_time = time.monotonic() + 10
+        while len(msgs) < count and time.monotonic() < end_time:
+            msgs += reader.get_messages(timeout=0.1)
+        results.put([msg.arbitration_id for msg in msgs])
+
+
+class ReadingMessage:
+    """Reads from the ring buffer while the writer packs this message."""
+
+    def __init__(self, msg, read):
+        self._msg = msg
+        self._read = read
+
+    def __getattr__(self, name):
+        return getattr(self._msg, name)
+
+    @property
+    def timestamp(self):
+        self._read()
+        return self._msg.timestamp
+
+
+@unittest.skipIf(
+    shared_memory.shared_memory is None, "needs multiprocessing.shared_memory"
+)
+class SharedMemoryTest(unittest.TestCase, ComparingMessagesTestCase):
+    def __init__(self, *args, **kwargs):
+        unittest.TestCase.__init__(self, *args, **kwargs)
+        ComparingMessagesTestCase.__init__(self)
+
+    def setUp(self):
+        self.writer = can.SharedMemoryWriter(capacity=8)
+        self.reader = can.SharedMemoryReader(self.writer.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.stop()
+
+    def test_messages(self):
+        msgs = [
+            can.Message(
+                timestamp=1.5, arbitration_id=0x123, is_extended_id=False, data=[1, 2]
+            ),
+            can.Message(arbitration_id=0x1ABCDEF, is_remote_frame=True, dlc=4),
+            can.Message(is_error_frame=True),
+            can.Message(
+                arbitration_id=0x7FF,
+                is_extended_id=False,
+                is_fd=True,
+                bitrate_switch=True,
+                error_state_indicator=True,
+                data=range(64),
+            ),
+        ]
+        self.assertEqual(self.reader.get_messages(), [])
+        for msg in msgs:
+            self.writer(msg)
+        received = self.reader.get_messages()
+        self.assertEqual(len(received), len(msgs))
+        for expected, actual in zip(msgs, received):
+            self.assertMessageEqual(expected, actual)
+        self.assertEqual(self.reader.get_messages(), [])
+
+    def test_wrap_around(self):
+        received = []
+        for arbitration_id in range(20):
+            self.writer(can.Message(arbitration_id=arbitration_id))
+            received += [msg.arbitration_id for msg in self.reader]
+        self.assertEqual(received, list(range(20)))
+        self.assertEqual(self.reader.lost, 0)
+
+    def test_overrun(self):
+        self.writer.on_messages_received(
+            [can.Message(arbitration_id=arbitration_id) for arbitration_id in range(20)]
+        )
+        records = self.reader.read_records(max_count=3)
+        self.assertEqual(len(records), 3)
+        # the oldest record of the ring may be just about to be overwritten
+        self.assertEqual(self.reader.lost, 13)
+        self.assertEqual(shared_memory.RECORD.unpack_from(records[0])[1], 13)
+        received = [msg.arbitration_id for msg in self.reader.get_messages()]
+        self.assertEqual(received, [16, 17, 18, 19])
+
+    def test_overrun_during_batch(self):
+        for arbitration_id in range(8):
+            self.writer(can.Message(arbitration_id=arbitration_id))
+
+        read = []
+
+        def read_records():
+            read.extend(
+                shared_memory.RECORD.unpack_from(record)[1]
+                for record in self.reader.read_records()
+            )
+
+        batch = [
+            can.Message(arbitration_id=arbitration_id)
+            for arbitration_id in range(8, 12)
+        ]
+        # the first two records of the batch overwrote the slots of 0 and 1,
+        # and the one of 2 is being written
+        batch[2] = ReadingMessage(batch[2], read_records)
+        self.writer.on_messages_received(batch)
+
+        self.assertEqual(read, list(range(3, 10)))
+        self.assertEqual(self.reader.lost, 3)
+        received = [msg.arbitration_id for msg in self.reader.get_messages()]
+        self.assertEqual(received, [10, 11])
+
+    def test_lapped_during_copy(self):
+        for arbitration_id in range(30):
+            self.writer(can.Message(arbitration_id=arbitration_id))
+        # the writer was at 8 when the copy started and at 30 afterwards
+        with patch.object(self.reader, "_load_write_index", side_effect=[8, 30]):
+            self.assertEqual(self.reader.read_records(), [])
+        self.assertEqual(self.reader.lost, 8)
+
+        received = [msg.arbitration_id for msg in self.reader.get_messages()]
+        self.assertEqual(received, list(range(23, 30)))
+        self.assertEqual(self.reader.lost + len(received), 30)
+
+    def test_reader_in_unrelated_process(self):
+        code = "import can; can.SharedMemoryReader({!r}).close()".format(
+            self.writer.name
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, timeout=60)
+        # the resource tracker of the other process did not remove the memory
+        can.SharedMemoryReader(self.writer.name).close()
+
+    def test_stop_after_removal(self):
+        shared_memory.shared_memory.SharedMemory(name=self.writer.name).unlink()
+        self.writer.stop()
+
+    def test_not_a_ring_buffer(self):
+        memory = shared_memory._open(None, create=True, size=128)
+        try:
+            with self.assertRaises(ValueError):
+                can.SharedMemoryReader(memory.name)
+        finally:
+            memory.close()
+            shared_memory._unlink(memory)
+
+    def test_other_process(self):
+        attached = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_read_in_process, args=(self.writer.name, 6, attached, results)
+        )
+        process.start()
+        try:
+            self.assertTrue(attached.wait(10))
+            for arbitration_id in range(6):
+                self.writer(can.Message(arbitration_id=arbitration_id))
+            self.assertEqual(results.get(timeout=15), list(range(6)))
+        finally:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,11 +5,24 @@
 This module tests cyclic send tasks.
 """
 
+import asyncio
 from time import sleep
+import threading
 import unittest
+from unittest.mock import Mock
 import gc
 
 import can
+from can.broadcastmanager import (
+    AsyncioCyclicSendTask,
+    CyclicTaskScheduler,
+    CyclicTaskStatistics,
+    Crc8J1850,
+    PayloadSpec,
+    RollingCounter,
+    crc8_j1850,
+    _next_deadline,
+)
 
 from .config import *
 from .message_helper import ComparingMessagesTestCase
@@ -31,8 +44,8 @@ class SimpleCyclicSendTaskTest(unittest.TestCase, ComparingMessagesTestCase):
             is_extended_id=False, arbitration_id=0x123, data=[0, 1, 2, 3, 4, 5, 6, 7]
         )
 
-        with can.interface.Bus(bustype="virtual") as bus1:
-            with can.interface.Bus(bustype="virtual") as bus2:
+        with can.interface.Bus(bustype="virtual", channel=self.id()) as bus1:
+            with can.interface.Bus(bustype="virtual", channel=self.id()) as bus2:
 
                 # disabling the garbage collector makes the time readings more reliable
                 gc.disable()
@@ -67,7 +80,7 @@ class SimpleCyclicSendTaskTest(unittest.TestCase, ComparingMessagesTestCase):
                 self.assertMessageEqual(msg, last_msg)
 
     def test_removing_bus_tasks(self):
-        bus = can.interface.Bus(bustype="virtual")
+        bus = can.interface.Bus(bustype="virtual", channel=self.id())
         tasks = []
         for task_i in range(10):
             msg = can.Message(
@@ -90,7 +103,9 @@ class SimpleCyclicSendTaskTest(unittest.TestCase, ComparingMessagesTestCase):
         bus.shutdown()
 
     def test_managed_tasks(self):
-        bus = can.interface.Bus(bustype="virtual", receive_own_messages=True)
+        bus = can.interface.Bus(
+            bustype="virtual", channel=self.id(), receive_own_messages=True
+        )
         tasks = []
         for task_i in range(3):
             msg = can.Message(
@@ -120,7 +135,7 @@ class SimpleCyclicSendTaskTest(unittest.TestCase, ComparingMessagesTestCase):
         bus.shutdown()
 
     def test_stopping_perodic_tasks(self):
-        bus = can.interface.Bus(bustype="virtual")
+        bus = can.interface.Bus(bustype="virtual", channel=self.id())
         tasks = []
         for task_i in range(10):
             msg = can.Message(
@@ -151,6 +166,276 @@ class SimpleCyclicSendTaskTest(unittest.TestCase, ComparingMessagesTestCase):
 
         bus.shutdown()
 
+    def test_tasks_share_one_thread(self):
+        bus = can.interface.Bus(
+            bustype="virtual", channel=self.id(), receive_own_messages=True
+        )
+        tasks = [
+            bus.send_periodic(can.Message(arbitration_id=task_i), 0.01)
+            for task_i in range(20)
+        ]
+
+        self.assertIsNotNone(tasks[0].thread)
+        self.assertTrue(all(task.scheduler is tasks[0].scheduler for task in tasks))
+        self.assertTrue(all(task.thread is tasks[0].thread for task in tasks))
+        self.assertIs(tasks[0].scheduler.thread, tasks[0].thread)
+
+        received = set()
+        while len(received) < 20:
+            received.add(bus.recv(timeout=5.0).arbitration_id)
+
+        bus.stop_all_periodic_tasks()
+        tasks[0].thread.join(5.0)
+        self.assertFalse(tasks[0].thread.is_alive())
+        bus.shutdown()
+
+    def test_stop_then_start(self):
+        with can.interface.Bus(
+            bustype="virtual", channel=self.id(), receive_own_messages=True
+        ) as bus:
+            msgs = [can.Message(data=[index]) for index in range(3)]
+            task = bus.send_periodic(msgs, 1.0)
+            self.assertEqual(bus.recv(timeout=1.0).data, bytearray([0]))
+            self.assertEqual(bus.recv(timeout=1.5).data, bytearray([1]))
+
+            # restarting sends the first message at once, and only one copy
+            task.stop()
+            task.start()
+            self.assertEqual(bus.recv(timeout=0.5).data, bytearray([0]))
+            self.assertIsNone(bus.recv(timeout=0.5))
+            self.assertEqual(len(task.scheduler._heap), 1)
+            task.stop()
+
+    def test_scheduler_sends_due_messages_together(self):
+        bus = Mock()
+        bus.send_batch.return_value = 1
+        bus.send.side_effect = [None, can.CanError("failed")]
+        tasks = []
+        for task_i in range(3):
+            msg = can.Message(arbitration_id=task_i)
+            tasks.append(
+                Mock(
+                    bus=bus,
+                    send_lock=threading.Lock(),
+                    _next_message=Mock(return_value=msg),
+                )
+            )
+
+        failed = CyclicTaskScheduler._send(tasks)
+
+        sent = [msg.arbitration_id for msg in bus.send_batch.call_args[0][0]]
+        self.assertEqual(sent, [0, 1, 2])
+        # the messages that were not sent in the batch are sent one by one
+        self.assertEqual(
+            [call[0][0].arbitration_id for call in bus.send.call_args_list], [1, 2]
+        )
+        self.assertEqual(failed, [tasks[2]])
+
+    def test_statistics(self):
+        statistics = CyclicTaskStatistics(window=200)
+        self.assertIsNone(statistics.mean_jitter)
+        self.assertIsNone(statistics.p99_jitter)
+
+        for index in range(200):
+            statistics._add(index * 0.01, index * 0.01 + (index % 100) * 1e-5)
+        self.assertEqual(statistics.sent, 200)
+        self.assertAlmostEqual(statistics.min_jitter, 0.0)
+        self.assertAlmostEqual(statistics.max_jitter, 99e-5)
+        self.assertAlmostEqual(statistics.mean_jitter, 49.5e-5)
+        self.assertAlmostEqual(statistics.p99_jitter, 98e-5)
+        self.assertAlmostEqual(statistics.last_period, 0.01 + 1e-5)
+
+        statistics.reset()
+        self.assertEqual(statistics.sent, 0)
+        self.assertIsNone(statistics.last_period)
+
+    def test_missed_deadlines_are_skipped(self):
+        task = Mock(period=0.01, statistics=CyclicTaskStatistics())
+        # on time
+        self.assertAlmostEqual(_next_deadline(task, 1.0, 1.005), 1.01)
+        self.assertEqual(task.statistics.missed_deadlines, 0)
+        # 1.01, 1.02 and 1.03 have passed
+        self.assertAlmostEqual(_next_deadline(task, 1.0, 1.035), 1.04)
+        self.assertEqual(task.statistics.missed_deadlines, 3)
+
+    @unittest.skipIf(
+        IS_CI,
+        "the timing sensitive behaviour cannot be reproduced reliably on a CI server",
+    )
+    def test_task_statistics(self):
+        with can.interface.Bus(bustype="virtual", channel=self.id()) as bus:
+            task = bus.send_periodic(can.Message(), 0.01)
+            task.scheduler.spin_threshold = 0.002
+            sleep(0.2)
+            task.stop()
+            statistics = task.statistics
+            self.assertGreater(statistics.sent, 10)
+            self.assertGreaterEqual(statistics.min_jitter, 0.0)
+            self.assertLessEqual(statistics.min_jitter, statistics.mean_jitter)
+            self.assertLessEqual(statistics.mean_jitter, statistics.max_jitter)
+            self.assertAlmostEqual(statistics.last_period, 0.01, delta=0.005)
+
+    def test_modifier_callback(self):
+        msg = can.Message(arbitration_id=0x123, data=[0x50, 0, 0xAA])
+        spec = PayloadSpec(RollingCounter(byte=0, length=4), Crc8J1850(byte=1))
+        with can.interface.Bus(bustype="virtual", channel=self.id()) as bus1:
+            with can.interface.Bus(bustype="virtual", channel=self.id()) as bus2:
+                task = bus1.send_periodic(msg, 0.01, modifier_callback=spec)
+                received = [bus2.recv(5) for _ in range(20)]
+                task.stop()
+
+        for index, msg in enumerate(received):
+            self.assertEqual(msg.data[0], 0x50 | index % 16)
+            self.assertEqual(msg.data[1], crc8_j1850([msg.data[0], 0xAA]))
+            self.assertEqual(msg.data[2], 0xAA)
+
+    def test_shared_payload_spec(self):
+        msgs = [
+            can.Message(arbitration_id=arbitration_id, data=[0, 0])
+            for arbitration_id in (1, 2)
+        ]
+        spec = PayloadSpec(RollingCounter(byte=0, length=4), Crc8J1850(byte=1))
+        with can.interface.Bus(bustype="virtual", channel=self.id()) as bus1:
+            with can.interface.Bus(bustype="virtual", channel=self.id()) as bus2:
+                tasks = [
+                    bus1.send_periodic(msg, 0.01, modifier_callback=spec)
+                    for msg in msgs
+                ]
+                received = [bus2.recv(5) for _ in range(10)]
+                for task in tasks:
+                    task.stop()
+
+        # every task counts its own messages and the originals stay unchanged
+        for arbitration_id in (1, 2):
+            counters = [
+                msg.data[0] for msg in received if msg.arbitration_id == arbitration_id
+            ]
+            self.assertEqual(counters, list(range(len(counters))))
+        for msg in msgs:
+            self.assertEqual(msg.data, bytearray([0, 0]))
+
+    @unittest.skipIf(
+        IS_CI,
+        "the timing sensitive behaviour cannot be reproduced reliably on a CI server",
+    )
+    def test_multirate(self):
+        with can.interface.Bus(bustype="virtual", channel=self.id()) as bus1:
+            with can.interface.Bus(bustype="virtual", channel=self.id()) as bus2:
+                task = bus1.send_periodic_multirate(can.Message(), 3, 0.01, 0.1)
+                self.assertIn(task, bus1._periodic_tasks)
+                received = [bus2.recv(5) for _ in range(5)]
+                task.stop()
+
+        gaps = [b.timestamp - a.timestamp for a, b in zip(received, received[1:])]
+        # scheduling delays on a busy machine only make the gaps longer
+        for gap in gaps[:2]:
+            self.assertGreater(gap, 0.005)
+            self.assertLess(gap, 0.05)
+        for gap in gaps[2:]:
+            self.assertAlmostEqual(gap, 0.1, delta=0.04)
+
+    def test_multirate_current_period(self):
+        with can.interface.Bus(bustype="virtual", channel=self.id()) as bus:
+            task = bus.send_periodic_multirate(can.Message(), 2, 0.5, 1.0)
+            task.stop()
+            task._msg_index = 1
+            self.assertEqual(task._current_period(), 0.5)
+            task._msg_index = 2
+            self.assertEqual(task._current_period(), 1.0)
+
+
+class PayloadSpecTest(unittest.TestCase):
+    def test_crc8_j1850(self):
+        self.assertEqual(crc8_j1850(b"123456789"), 0x4B)
+        self.assertEqual(crc8_j1850(b""), 0x00)
+
+    def test_rolling_counter(self):
+        counter = RollingCounter(byte=1, start_bit=4, length=3, step=3)
+        self.assertEqual(counter.cycle_length, 8)
+        data = bytearray([0xFF, 0x8F])
+        counter.apply(data, 3)
+        # 3 * 3 % 8 == 1
+        self.assertEqual(data, bytearray([0xFF, 0x9F]))
+
+        self.assertEqual(RollingCounter(byte=0, length=4, step=4).cycle_length, 4)
+        with self.assertRaises(ValueError):
+            RollingCounter(byte=0, start_bit=6, length=4)
+
+    def test_sequence(self):
+        msgs = [can.Message(data=[0, 1]), can.Message(data=[0, 2])]
+        spec = PayloadSpec(RollingCounter(byte=0, length=2))
+        sequence = spec.sequence(msgs)
+        self.assertEqual(
+            [bytes(msg.data) for msg in sequence],
+            [b"\x00\x01", b"\x01\x02", b"\x02\x01", b"\x03\x02"],
+        )
+        # the original messages are not changed
+        self.assertEqual(msgs[0].data, bytearray([0, 1]))
+
+        spec = PayloadSpec(RollingCounter(byte=0, length=1))
+        self.assertEqual(len(spec.sequence(msgs * 3)), 6)
+
+
+class AsyncioCyclicSendTaskTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.bus1 = can.interface.Bus(bustype="virtual", channel=self.id())
+        self.bus2 = can.interface.Bus(bustype="virtual", channel=self.id())
+
+    def tearDown(self):
+        self.bus1.shutdown()
+        self.bus2.shutdown()
+        self.loop.close()
+
+    def received(self):
+        msgs = []
+        while True:
+            msg = self.bus2.recv(0)
+            if msg is None:
+                return msgs
+            msgs.append(msg)
+
+    def test_duration(self):
+        msgs = [can.Message(arbitration_id=0x123, data=[i]) for i in range(3)]
+        task = AsyncioCyclicSendTask(self.bus1, msgs, 0.01, 0.095, loop=self.loop)
+        self.loop.run_until_complete(asyncio.sleep(0.2))
+
+        received = self.received()
+        self.assertEqual(task.statistics.sent, len(received))
+        self.assertTrue(5 <= len(received) <= 11)
+        self.assertEqual([msg.data[0] for msg in received[:4]], [0, 1, 2, 0])
+
+    def test_send_periodic(self):
+        msg = can.Message(arbitration_id=0x123, data=[1])
+        task = self.bus1.send_periodic(msg, 0.01, loop=self.loop)
+        self.assertIsInstance(task, AsyncioCyclicSendTask)
+        self.assertIn(task, self.bus1._periodic_tasks)
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+
+        self.bus1.stop_all_periodic_tasks()
+        self.assertTrue(task.stopped)
+        self.assertEqual(self.bus1._periodic_tasks, [])
+        self.assertTrue(self.received())
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual(self.received(), [])
+
+    def test_stop_start_modify(self):
+        msg = can.Message(arbitration_id=0x123, data=[1])
+        task = AsyncioCyclicSendTask(self.bus1, msg, 0.01, loop=self.loop)
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        task.stop()
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertTrue(self.received())
+        self.assertEqual(self.received(), [])
+
+        task.modify_data(can.Message(arbitration_id=0x123, data=[2]))
+        task.start()
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        task.stop()
+        received = self.received()
+        self.assertTrue(received)
+        self.assertTrue(all(msg.data[0] == 2 for msg in received))
+
 
 if __name__ == "__main__":
     unittest.main()
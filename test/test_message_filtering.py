@@ -7,6 +7,9 @@ This module tests :meth:`can.BusABC._matches_filters`.
 
 import unittest
 
+from hypothesis import given, settings
+import hypothesis.strategies as st
+
 from can import Bus, Message
 
 from .data.example_data import TEST_ALL_MESSAGES
@@ -48,6 +51,80 @@ class TestMessageFiltering(unittest.TestCase):
         self.assertFalse(self.bus._matches_filters(EXAMPLE_MSG))
         self.assertTrue(self.bus._matches_filters(HIGHEST_MSG))
 
+    def test_match_standard_bitmap_and_buckets(self):
+        self.bus.set_filters(
+            [
+                {"can_id": 0x100, "can_mask": 0x700, "extended": False},
+                {"can_id": 0x7FF, "can_mask": 0x1FFFFFFF},
+                {"can_id": 0x800, "can_mask": 0xF00},
+            ]
+        )
+        self.assertTrue(
+            self.bus._matches_filters(
+                Message(arbitration_id=0x1AB, is_extended_id=False)
+            )
+        )
+        self.assertFalse(
+            self.bus._matches_filters(
+                Message(arbitration_id=0x2AB, is_extended_id=False)
+            )
+        )
+        self.assertTrue(
+            self.bus._matches_filters(
+                Message(arbitration_id=0x7FF, is_extended_id=False)
+            )
+        )
+        self.assertTrue(
+            self.bus._matches_filters(
+                Message(arbitration_id=0x8AB, is_extended_id=False)
+            )
+        )
+        self.assertFalse(
+            self.bus._matches_filters(
+                Message(arbitration_id=0x1AB, is_extended_id=True)
+            )
+        )
+        self.assertTrue(
+            self.bus._matches_filters(
+                Message(arbitration_id=0x7FF, is_extended_id=True)
+            )
+        )
+
+    @settings(max_examples=200, deadline=None)
+    @given(
+        filters=st.lists(
+            st.fixed_dictionaries(
+                {
+                    "can_id": st.integers(min_value=0, max_value=0x1FFFFFFF),
+                    "can_mask": st.sampled_from([0, 0x7F0, 0x7FF, 0x1FFFFF00])
+                    | st.integers(min_value=0, max_value=0x1FFFFFFF),
+                },
+                optional={"extended": st.booleans()},
+            ),
+            min_size=1,
+            max_size=20,
+        ),
+        arbitration_ids=st.lists(
+            st.integers(min_value=0, max_value=0x1FFFFFFF)
+            | st.integers(min_value=0, max_value=0x7FF),
+            min_size=1,
+            max_size=20,
+        ),
+        is_extended_id=st.booleans(),
+    )
+    def test_matches_reference_implementation(
+        self, filters, arbitration_ids, is_extended_id
+    ):
+        self.bus.set_filters(filters)
+        for arbitration_id in arbitration_ids:
+            msg = Message(arbitration_id=arbitration_id, is_extended_id=is_extended_id)
+            expected = any(
+                ("extended" not in _filter or _filter["extended"] == is_extended_id)
+                and (_filter["can_id"] ^ arbitration_id) & _filter["can_mask"] == 0
+                for _filter in filters
+            )
+            self.assertEqual(self.bus._matches_filters(msg), expected)
+
 
 if __name__ == "__main__":
     unittest.main()
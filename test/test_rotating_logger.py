@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This module tests logging into a series of files.
+"""
+
+import gzip
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import can
+
+
+def messages(count, period=0.1):
+    return [
+        can.Message(timestamp=index * period, arbitration_id=index, data=[index % 256])
+        for index in range(count)
+    ]
+
+
+def read_ids(filename):
+    with gzip.open(filename, "rt") as file:
+        lines = file.read().splitlines()[1:]
+    return [int(line.split(",")[1], 16) for line in lines]
+
+
+class RotatingLoggerTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def test_max_messages(self):
+        with can.RotatingLogger(
+            self.path("log_{index:02d}.csv"), max_messages=4
+        ) as logger:
+            logger.on_messages_received(messages(10))
+        self.assertEqual(logger.rollover_count, 3)
+        self.assertEqual(
+            logger.segments,
+            [self.path("log_{:02d}.csv.gz".format(index)) for index in range(3)],
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            ["log_00.csv.gz", "log_01.csv.gz", "log_02.csv.gz"],
+        )
+        ids = [
+            arbitration_id
+            for name in logger.segments
+            for arbitration_id in read_ids(name)
+        ]
+        self.assertEqual(ids, list(range(10)))
+
+    def test_max_duration(self):
+        with can.RotatingLogger(
+            self.path("log_{index}.csv"), max_duration=0.25
+        ) as logger:
+            logger.on_messages_received(messages(10))
+        self.assertEqual(
+            [read_ids(name) for name in logger.segments],
+            [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]],
+        )
+
+    def test_max_bytes(self):
+        with can.RotatingLogger(
+            self.path("log_{index}.log"), max_bytes=10000, compress=False
+        ) as logger:
+            for msg in messages(2000):
+                logger(msg)
+        self.assertGreater(len(logger.segments), 1)
+        for name in logger.segments[:-1]:
+            self.assertGreaterEqual(os.path.getsize(name), 10000)
+        with can.LogReader(logger.segments[0]) as reader:
+            self.assertEqual(next(iter(reader)).arbitration_id, 0)
+
+    def test_default_template(self):
+        logger = can.RotatingLogger(self.path("soak.asc"))
+        self.assertRegex(
+            os.path.basename(logger.filename), r"^soak_\d{8}_\d{6}_000\.asc$"
+        )
+        logger.stop()
+        self.assertEqual(logger.segments, [logger.filename + ".gz"])
+
+    def test_retention(self):
+        with can.RotatingLogger(
+            self.path("log_{index}.csv"), max_messages=1, max_segments=2
+        ) as logger:
+            logger.on_messages_received(messages(5))
+        self.assertEqual(
+            sorted(os.listdir(self.directory)), ["log_3.csv.gz", "log_4.csv.gz"]
+        )
+
+        with can.RotatingLogger(
+            self.path("other_{index}.csv"), max_messages=1, max_total_bytes=0
+        ) as logger:
+            logger.on_messages_received(messages(5))
+        self.assertEqual(logger.segments, [])
+
+    def test_rollover(self):
+        with can.RotatingLogger(self.path("log_{index}.blf")) as logger:
+            logger.rollover()
+            self.assertEqual(logger.rollover_count, 1)
+            logger(can.Message(arbitration_id=1))
+            logger.rollover()
+            logger(can.Message(arbitration_id=2))
+        self.assertEqual(logger.rollover_count, 2)
+        self.assertEqual(len(logger.segments), 2)
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            can.RotatingLogger(self.path("log.db"))
+        with self.assertRaises(ValueError):
+            can.RotatingLogger(self.path("log.csv"), threaded=True)
+
+    def test_failing_compression(self):
+        with patch("can.io.logger.shutil.copyfileobj", side_effect=RuntimeError):
+            with can.RotatingLogger(
+                self.path("log_{index}.csv"), max_messages=2
+            ) as logger:
+                logger.on_messages_received(messages(5))
+        # the segments are closed and kept uncompressed
+        self.assertEqual(
+            logger.segments,
+            [self.path("log_{}.csv".format(index)) for index in range(3)],
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.directory)), ["log_0.csv", "log_1.csv", "log_2.csv"]
+        )
+        self.assertFalse(logger._thread.is_alive())
+        ids = []
+        for index in range(3):
+            with can.CSVReader(self.path("log_{}.csv".format(index))) as reader:
+                ids += [msg.arbitration_id for msg in reader]
+        self.assertEqual(ids, list(range(5)))
+
+    def test_retention_of_uncompressed_segments(self):
+        with patch("can.io.logger.shutil.copyfileobj", side_effect=RuntimeError):
+            with can.RotatingLogger(
+                self.path("log_{index}.csv"), max_messages=1, max_segments=2
+            ) as logger:
+                logger.on_messages_received(messages(5))
+        self.assertEqual(sorted(os.listdir(self.directory)), ["log_3.csv", "log_4.csv"])
+
+    def test_segment_removed_by_others(self):
+        with can.RotatingLogger(
+            self.path("log_{index}.csv"), compress=False, max_segments=1
+        ) as logger:
+            for name in ("old_1.csv", "old_2.csv"):
+                with open(self.path(name), "w") as file:
+                    file.write("data")
+            logger.segments = [
+                self.path("missing.csv"),
+                self.path("old_1.csv"),
+                self.path("old_2.csv"),
+            ]
+            logger._prune()
+            self.assertEqual(logger.segments, [self.path("old_2.csv")])
+        self.assertEqual(logger.segments, [self.path("log_0.csv")])
+        self.assertEqual(sorted(os.listdir(self.directory)), ["log_0.csv"])
+
+    def test_stop_without_background_thread(self):
+        logger = can.RotatingLogger(self.path("log.csv"))
+        logger._closed.put(None)
+        logger._thread.join()
+        logger(can.Message())
+        file = logger._writer.file
+        logger.stop()
+        self.assertTrue(file.closed)
+        logger.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
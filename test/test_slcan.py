@@ -67,6 +67,17 @@ class slcanTestCase(unittest.TestCase):
         data = self.serial.read(self.serial.in_waiting)
         self.assertEqual(data, b"r1238\r")
 
+    def test_send_batch(self):
+        msgs = [
+            can.Message(arbitration_id=0x456, is_extended_id=False, data=[0x11]),
+            can.Message(
+                arbitration_id=0x12ABCDEF, is_extended_id=True, data=[0xAA, 0x55]
+            ),
+        ]
+        self.assertEqual(self.bus.send_batch(msgs), 2)
+        data = self.serial.read(self.serial.in_waiting)
+        self.assertEqual(data, b"t456111\rT12ABCDEF2AA55\r")
+
     def test_recv_extended_remote(self):
         self.serial.write(b"R12ABCDEF6\r")
         msg = self.bus.recv(0)
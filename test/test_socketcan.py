@@ -8,21 +8,52 @@ from unittest.mock import patch
 from unittest.mock import call
 
 import ctypes
-
+import errno
+import select
+import socket
+import struct
+import threading
+
+import can
+from can import Message
+from can.broadcastmanager import Crc8J1850, PayloadSpec, RollingCounter
 from can.interfaces.socketcan.socketcan import (
     bcm_header_factory,
     build_bcm_header,
     build_bcm_tx_delete_header,
     build_bcm_transmit_header,
     build_bcm_update_header,
+    build_bcm_rx_setup_header,
     BcmMsgHead,
+    build_can_frame,
+    capture_message,
+    send_frames,
+    MultiFrameReceiver,
+    _parse_ancillary_data,
+    _timestamp_from_ancillary_data,
+    SocketcanBus,
+    MultiSocketcanBus,
+    SocketcanBcmBus,
+    CyclicSendTask,
+    _precompute_payloads,
 )
 from can.interfaces.socketcan.constants import (
+    CAN_BCM_RX_CHANGED,
+    CAN_BCM_RX_SETUP,
+    CAN_BCM_RX_TIMEOUT,
+    CAN_BCM_TX_READ,
+    CAN_BCM_TX_SEND,
+    CAN_EFF_FLAG,
+    RX_CHECK_DLC,
+    RX_FILTER_ID,
     CAN_BCM_TX_DELETE,
     CAN_BCM_TX_SETUP,
     SETTIMER,
     STARTTIMER,
     TX_COUNTEVT,
+    SO_TIMESTAMPNS,
+    SO_RXQ_OVFL,
+    SOL_CAN_RAW,
 )
 
 
@@ -379,5 +410,426 @@ class SocketCANTest(unittest.TestCase):
         self.assertEqual(1, result.nframes)
 
 
+class CaptureMessageTest(unittest.TestCase):
+    def setUp(self):
+        self.frame = build_can_frame(
+            Message(arbitration_id=0x123, is_extended_id=False, data=[1, 2, 3])
+        )
+        self.sock = Mock()
+
+    def test_ancillary_timestamp(self):
+        self.sock.recvmsg.return_value = (
+            self.frame,
+            [(socket.SOL_SOCKET, SO_TIMESTAMPNS, struct.pack("@ll", 5, 250000000))],
+            0,
+            ("vcan0", 0),
+        )
+        msg = capture_message(self.sock, get_channel=True, ancillary_timestamps=True)
+
+        self.assertEqual(msg.timestamp, 5.25)
+        self.assertEqual(msg.channel, "vcan0")
+        self.assertEqual(msg.arbitration_id, 0x123)
+        self.assertEqual(msg.data, bytearray([1, 2, 3]))
+        self.assertFalse(self.sock.recv.called)
+
+    @patch("can.interfaces.socketcan.socketcan.fcntl", create=True)
+    def test_ioctl_timestamp(self, fcntl):
+        fcntl.ioctl.return_value = struct.pack("@ll", 7, 500000)
+        self.sock.recv.return_value = self.frame
+        msg = capture_message(self.sock)
+
+        self.assertEqual(msg.timestamp, 7.5)
+        self.assertIsNone(msg.channel)
+        self.assertFalse(self.sock.recvmsg.called)
+
+    @patch("can.interfaces.socketcan.socketcan.fcntl", create=True)
+    def test_missing_ancillary_timestamp(self, fcntl):
+        fcntl.ioctl.return_value = struct.pack("@ll", 7, 500000)
+        self.sock.recvmsg.return_value = (self.frame, [], 0, ("vcan0", 0))
+        msg = capture_message(self.sock, ancillary_timestamps=True)
+
+        self.assertEqual(msg.timestamp, 7.5)
+        self.assertIsNone(msg.channel)
+
+    def test_dropped_frames(self):
+        bus = Mock(_dropped_frames=0, channel_info="socketcan channel 'vcan0'")
+        timestamp_data = (
+            socket.SOL_SOCKET,
+            SO_TIMESTAMPNS,
+            struct.pack("@ll", 5, 250000000),
+        )
+
+        with self.assertLogs("can.interfaces.socketcan.socketcan", "WARNING"):
+            SocketcanBus._update_dropped_frames(
+                bus,
+                [
+                    timestamp_data,
+                    (socket.SOL_SOCKET, SO_RXQ_OVFL, struct.pack("@I", 7)),
+                ],
+            )
+        self.assertEqual(bus._dropped_frames, 7)
+
+        # no counter is attached as long as nothing was dropped
+        SocketcanBus._update_dropped_frames(bus, [timestamp_data])
+        self.assertEqual(bus._dropped_frames, 7)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires unix domain sockets")
+class MultipleFramesTest(unittest.TestCase):
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair(
+            socket.AF_UNIX, socket.SOCK_DGRAM
+        )
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_send_frames(self):
+        frames = [bytes([i]) * 16 for i in range(5)]
+        self.assertEqual(send_frames(self.sender, frames), 5)
+        for frame in frames:
+            self.assertEqual(self.receiver.recv(72), frame)
+
+    def test_receive_frames(self):
+        self.receiver.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        frames = [
+            build_can_frame(Message(arbitration_id=i, data=[i] * i)) for i in range(5)
+        ]
+        self.assertEqual(send_frames(self.sender, frames), 5)
+
+        receiver = MultiFrameReceiver(size=4)
+        results = receiver.receive(self.receiver, 10)
+        results += receiver.receive(self.receiver, 10)
+        self.assertEqual(receiver.receive(self.receiver, 10), [])
+
+        self.assertEqual([frame for frame, _, _ in results], frames)
+        for _, ancillary_data, interface_index in results:
+            self.assertIsNotNone(_timestamp_from_ancillary_data(ancillary_data))
+            self.assertEqual(interface_index, 0)
+
+    def test_parse_ancillary_data(self):
+        self.receiver.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        self.sender.send(bytes(16))
+        _, ancillary_data, _, _ = self.receiver.recvmsg(
+            16, socket.CMSG_SPACE(struct.calcsize("@ll")) * 2
+        )
+        cmsg_level, cmsg_type, cmsg_data = ancillary_data[0]
+        raw = struct.pack(
+            "@Nii", socket.CMSG_LEN(len(cmsg_data)), cmsg_level, cmsg_type
+        ).ljust(socket.CMSG_LEN(0), b"\x00")
+        raw += cmsg_data
+        self.assertEqual(_parse_ancillary_data(raw * 2), ancillary_data * 2)
+
+    def test_send_frames_buffer_full(self):
+        self.sender.setblocking(False)
+        with self.assertRaises(BlockingIOError):
+            while True:
+                self.sender.send(bytes(16))
+        self.assertEqual(send_frames(self.sender, [bytes(16)]), 0)
+
+    def test_precompute_payloads(self):
+        msg = Message(arbitration_id=0x123, data=[0, 0])
+        spec = PayloadSpec(RollingCounter(byte=0, length=4), Crc8J1850(byte=1))
+        sequence = _precompute_payloads([msg], spec)
+        self.assertEqual([msg.data[0] for msg in sequence], list(range(16)))
+
+        self.assertIsNone(_precompute_payloads([msg], lambda msg: None))
+        spec = PayloadSpec(RollingCounter(byte=0, length=8))
+        self.assertIsNone(_precompute_payloads([msg] * 3, spec))
+
+
+class PrecomputedPayloadsTest(unittest.TestCase):
+    def setUp(self):
+        def send(data):
+            head = BcmMsgHead.from_buffer_copy(data[: ctypes.sizeof(BcmMsgHead)])
+            if head.opcode == CAN_BCM_TX_READ:
+                # there is no task for the ID yet
+                raise OSError(errno.EINVAL, "Invalid argument")
+            return len(data)
+
+        self.bcm_socket = Mock()
+        self.bcm_socket.send.side_effect = send
+        self.spec = PayloadSpec(RollingCounter(byte=0, length=4), Crc8J1850(byte=1))
+
+    def sent_frames(self):
+        data = self.bcm_socket.send.call_args[0][0]
+        head = BcmMsgHead.from_buffer_copy(data[: ctypes.sizeof(BcmMsgHead)])
+        return head.nframes, data[ctypes.sizeof(BcmMsgHead) :]
+
+    def test_task_keeps_messages(self):
+        msg = Message(arbitration_id=0x123, is_extended_id=False, data=[0x50, 0, 1])
+        task = CyclicSendTask(self.bcm_socket, msg, 0.01, modifier_callback=self.spec)
+        self.assertEqual(task.messages, (msg,))
+        self.assertEqual(msg.data, bytearray([0x50, 0, 1]))
+        nframes, body = self.sent_frames()
+        self.assertEqual(nframes, 16)
+        self.assertEqual(
+            body, b"".join(build_can_frame(m) for m in self.spec.sequence([msg]))
+        )
+
+        modified = Message(
+            arbitration_id=0x123, is_extended_id=False, data=[0x60, 0, 2]
+        )
+        task.modify_data(modified)
+        self.assertEqual(task.messages, (modified,))
+        nframes, body = self.sent_frames()
+        self.assertEqual(nframes, 16)
+        self.assertEqual(
+            body, b"".join(build_can_frame(m) for m in self.spec.sequence([modified]))
+        )
+
+        with self.assertRaises(ValueError):
+            task.modify_data([modified, modified])
+
+
+class _RawSocketStandIn(socket.socket):
+    """A datagram socket that ignores all CAN specific socket options."""
+
+    def setsockopt(self, level, optname, value):
+        if level != SOL_CAN_RAW:
+            super().setsockopt(level, optname, value)
+
+
+@unittest.skipUnless(hasattr(select, "epoll"), "requires epoll")
+class NonblockingBusTest(unittest.TestCase):
+    def setUp(self):
+        peer, own = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.peer = peer
+        with patch(
+            "can.interfaces.socketcan.socketcan.create_socket",
+            return_value=_RawSocketStandIn(fileno=own.detach()),
+        ), patch("can.interfaces.socketcan.socketcan.bind_socket"):
+            self.bus = SocketcanBus("vcan0", nonblocking=True)
+
+    def tearDown(self):
+        self.bus.shutdown()
+        self.peer.close()
+
+    def test_recv(self):
+        self.assertIsNone(self.bus.recv(0))
+        self.assertIsNone(self.bus.recv(0.01))
+
+        self.peer.send(build_can_frame(Message(arbitration_id=0x42, data=[1])))
+        msg = self.bus.recv(0)
+        self.assertEqual(msg.arbitration_id, 0x42)
+        self.assertEqual(msg.channel, "vcan0")
+        self.assertNotEqual(msg.timestamp, 0.0)
+
+    def test_recv_waits_for_frame(self):
+        frame = build_can_frame(Message(arbitration_id=0x42))
+        timer = threading.Timer(0.05, self.peer.send, [frame])
+        timer.start()
+        try:
+            msg = self.bus.recv(5)
+        finally:
+            timer.join()
+        self.assertEqual(msg.arbitration_id, 0x42)
+
+    def test_recv_batch(self):
+        frames = [build_can_frame(Message(arbitration_id=i)) for i in range(3)]
+        self.assertEqual(send_frames(self.peer, frames), 3)
+        msgs = self.bus.recv_batch(timeout=0)
+        self.assertEqual([msg.arbitration_id for msg in msgs], [0, 1, 2])
+        self.assertEqual(self.bus.recv_batch(timeout=0), [])
+
+    def test_send(self):
+        self.bus.send(Message(arbitration_id=0x42, data=[1, 2]))
+        self.assertEqual(
+            self.peer.recv(72),
+            build_can_frame(Message(arbitration_id=0x42, data=[1, 2])),
+        )
+
+    def test_send_timeout(self):
+        with self.assertRaises(can.CanError):
+            while True:
+                self.bus.send(Message(arbitration_id=0x42), timeout=0.01)
+
+
+@unittest.skipUnless(hasattr(select, "epoll"), "requires epoll")
+class MultiSocketcanBusTest(unittest.TestCase):
+    def setUp(self):
+        self.peers = []
+
+        def create_socket():
+            peer, own = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.peers.append(peer)
+            return _RawSocketStandIn(fileno=own.detach())
+
+        self.filters = [{"can_id": 0x100, "can_mask": 0x700}]
+        with patch(
+            "can.interfaces.socketcan.socketcan.create_socket", create_socket
+        ), patch("can.interfaces.socketcan.socketcan.bind_socket"):
+            self.bus = MultiSocketcanBus(
+                "vcan0, vcan1,vcan2", channel_filters={"vcan1": self.filters}
+            )
+
+    def tearDown(self):
+        self.bus.shutdown()
+        for peer in self.peers:
+            peer.close()
+
+    def test_channels(self):
+        self.assertEqual(list(self.bus.buses), ["vcan0", "vcan1", "vcan2"])
+        self.assertEqual(self.bus.channel, "vcan0,vcan1,vcan2")
+        for bus in self.bus.buses.values():
+            self.assertIsNotNone(bus._rx_poller)
+
+    def test_recv(self):
+        self.assertIsNone(self.bus.recv(0))
+
+        for index in (2, 0, 2):
+            self.peers[index].send(build_can_frame(Message(arbitration_id=index)))
+        msgs = [self.bus.recv(0) for _ in range(3)]
+        self.assertIsNone(self.bus.recv(0.01))
+
+        self.assertEqual(
+            sorted((msg.channel, msg.arbitration_id) for msg in msgs),
+            [("vcan0", 0), ("vcan2", 2), ("vcan2", 2)],
+        )
+        # both interfaces are served before the second frame of vcan2
+        self.assertEqual(msgs[2].channel, "vcan2")
+
+    def test_recv_batch(self):
+        for index in range(3):
+            frames = [build_can_frame(Message(arbitration_id=index))] * 2
+            send_frames(self.peers[index], frames)
+        msgs = self.bus.recv_batch(timeout=1)
+        msgs += self.bus.recv_batch(timeout=0)
+        self.assertEqual(
+            sorted(msg.channel for msg in msgs),
+            ["vcan0", "vcan0", "vcan1", "vcan1", "vcan2", "vcan2"],
+        )
+        self.assertEqual(self.bus.recv_batch(timeout=0), [])
+
+    def test_fileno(self):
+        self.assertEqual(select.select([self.bus], [], [], 0)[0], [])
+        self.peers[1].send(build_can_frame(Message()))
+        self.assertEqual(select.select([self.bus], [], [], 1)[0], [self.bus])
+
+    def test_send(self):
+        self.bus.send(Message(arbitration_id=0x42, channel="vcan1"))
+        self.assertEqual(
+            self.peers[1].recv(72), build_can_frame(Message(arbitration_id=0x42))
+        )
+        with self.assertRaises(can.CanError):
+            self.bus.send(Message(arbitration_id=0x42))
+
+    def test_channel_filters(self):
+        global_filters = [{"can_id": 0x200, "can_mask": 0x700}]
+        self.bus.set_filters(global_filters)
+        self.assertEqual(self.bus.buses["vcan0"]._filters, global_filters)
+        self.assertEqual(self.bus.buses["vcan1"]._filters, self.filters)
+
+        self.bus.set_channel_filters("vcan1", None)
+        self.assertEqual(self.bus.buses["vcan1"]._filters, global_filters)
+        self.bus.set_channel_filters("vcan2", self.filters)
+        self.assertEqual(self.bus.buses["vcan2"]._filters, self.filters)
+
+    def test_failing_interface(self):
+        sockets = []
+
+        def create_socket():
+            if sockets:
+                raise OSError(19, "No such device")
+            peer, own = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.peers.append(peer)
+            sockets.append(_RawSocketStandIn(fileno=own.detach()))
+            return sockets[-1]
+
+        with patch(
+            "can.interfaces.socketcan.socketcan.create_socket", create_socket
+        ), patch("can.interfaces.socketcan.socketcan.bind_socket"):
+            with self.assertRaises(OSError):
+                MultiSocketcanBus("vcan0,vcan1")
+        self.assertEqual(sockets[0].fileno(), -1)
+
+    def test_shutdown_stops_periodic_tasks(self):
+        task = Mock()
+        stop = task.stop
+        with patch.object(self.bus, "_send_periodic_internal", return_value=task):
+            self.bus.send_periodic(Message(channel="vcan1"), 0.1)
+        self.assertEqual(len(self.bus._periodic_tasks), 1)
+
+        self.bus.shutdown()
+        stop.assert_called_once_with()
+        self.assertEqual(self.bus._periodic_tasks, [])
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires unix domain sockets")
+class SocketcanBcmBusTest(unittest.TestCase):
+    def setUp(self):
+        self.peer, own = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        with patch(
+            "can.interfaces.socketcan.socketcan.create_bcm_socket", return_value=own
+        ):
+            self.bus = SocketcanBcmBus("vcan0")
+
+    def tearDown(self):
+        self.bus.shutdown()
+        self.peer.close()
+
+    def test_build_bcm_rx_setup_header(self):
+        result = BcmMsgHead.from_buffer_copy(
+            build_bcm_rx_setup_header(0x123, SETTIMER, 1.5, 0.01)
+        )
+        self.assertEqual(result.opcode, CAN_BCM_RX_SETUP)
+        self.assertEqual(result.flags, SETTIMER)
+        self.assertEqual(result.ival1_tv_sec, 1)
+        self.assertEqual(result.ival1_tv_usec, 500000)
+        self.assertEqual(result.ival2_tv_sec, 0)
+        self.assertEqual(result.ival2_tv_usec, 10000)
+        self.assertEqual(result.can_id, 0x123)
+        self.assertEqual(result.nframes, 1)
+
+    def test_add_rx_job(self):
+        self.bus.add_rx_job(
+            0x123, data_mask=[0xFF, 0x00, 0x0F], timeout=0.1, check_dlc=True
+        )
+        expected = build_bcm_rx_setup_header(
+            0x123, SETTIMER | STARTTIMER | RX_CHECK_DLC, 0.1, 0
+        ) + build_can_frame(
+            Message(arbitration_id=0x123, is_extended_id=False, data=[0xFF, 0, 0xF])
+        )
+        self.assertEqual(self.peer.recv(1024), expected)
+
+        self.bus.add_rx_job(0x1234, is_extended_id=True, throttle=0.5)
+        expected = build_bcm_rx_setup_header(
+            0x1234 | CAN_EFF_FLAG, SETTIMER | RX_FILTER_ID, 0, 0.5, nframes=0
+        )
+        self.assertEqual(self.peer.recv(1024), expected)
+
+    def test_recv_changed(self):
+        frame = build_can_frame(
+            Message(arbitration_id=0x123, is_extended_id=False, data=[1, 2])
+        )
+        head = build_bcm_header(CAN_BCM_RX_CHANGED, 0, 0, 0, 0, 0, 0, 0x123, 1)
+        self.peer.send(head + frame)
+
+        msg = self.bus.recv(1)
+        self.assertEqual(msg.arbitration_id, 0x123)
+        self.assertEqual(msg.data, bytearray([1, 2]))
+        self.assertEqual(msg.channel, "vcan0")
+        self.assertNotEqual(msg.timestamp, 0.0)
+
+    def test_recv_timeout(self):
+        on_timeout = Mock()
+        self.bus.add_rx_job(0x42, timeout=0.1, on_timeout=on_timeout)
+        head = build_bcm_header(CAN_BCM_RX_TIMEOUT, 0, 0, 0, 0, 0, 0, 0x42, 0)
+        self.peer.send(head)
+
+        self.assertIsNone(self.bus.recv(0))
+        on_timeout.assert_called_once_with(0x42)
+
+    def test_send(self):
+        msg = Message(arbitration_id=0x42, is_extended_id=False, data=[1])
+        self.bus.send(msg)
+        self.assertEqual(
+            self.peer.recv(1024),
+            build_bcm_header(CAN_BCM_TX_SEND, 0, 0, 0, 0, 0, 0, 0x42, 1)
+            + build_can_frame(msg),
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
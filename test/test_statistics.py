@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This module tests the streaming message statistics.
+"""
+
+import statistics
+import unittest
+
+import can
+from can.statistics import frame_bits
+
+
+class FrameBitsTest(unittest.TestCase):
+    def test_classic(self):
+        # the worst case lengths including stuff bits
+        self.assertEqual(
+            frame_bits(can.Message(is_extended_id=False, data=bytes(8))), (135, 0)
+        )
+        self.assertEqual(frame_bits(can.Message(data=bytes(8))), (160, 0))
+        self.assertEqual(
+            frame_bits(can.Message(is_extended_id=False, is_remote_frame=True, dlc=8)),
+            (55, 0),
+        )
+
+    def test_fd(self):
+        nominal, data = frame_bits(
+            can.Message(is_fd=True, bitrate_switch=True, data=bytes(64))
+        )
+        self.assertEqual(
+            frame_bits(can.Message(is_fd=True, data=bytes(64))), (nominal + data, 0)
+        )
+        self.assertGreater(data, 8 * 64)
+
+
+class MessageStatisticsTest(unittest.TestCase):
+    def test_periods(self):
+        timestamps = [0.0, 0.1, 0.21, 0.3, 0.42, 0.5]
+        stats = can.MessageStatistics()
+        for timestamp in timestamps:
+            stats(can.Message(timestamp=timestamp, arbitration_id=0x10))
+        stats(can.Message(timestamp=0.5, arbitration_id=0x10, is_extended_id=False))
+
+        periods = [b - a for a, b in zip(timestamps, timestamps[1:])]
+        id_stats = stats.get(0x10)
+        self.assertEqual(id_stats.count, 6)
+        self.assertAlmostEqual(id_stats.mean_period, statistics.mean(periods))
+        self.assertAlmostEqual(id_stats.stddev_period, statistics.pstdev(periods))
+        self.assertAlmostEqual(id_stats.max_gap, 0.12)
+        self.assertAlmostEqual(id_stats.rate, 10.0)
+        self.assertEqual(stats.get(0x10, is_extended_id=False).count, 1)
+        self.assertIsNone(stats.get(0x10, channel="other"))
+
+    def test_bus_load(self):
+        stats = can.MessageStatistics(bitrate=can.BitTiming(bitrate=500000))
+        for index in range(101):
+            stats.on_messages_received(
+                [
+                    can.Message(
+                        timestamp=index * 0.001,
+                        arbitration_id=0x100,
+                        is_extended_id=False,
+                        data=bytes(8),
+                        channel=0,
+                    )
+                ]
+            )
+        # 100 frames of 135 bits each in 0.1 s at 500 kbit/s, as the first
+        # frame ended at the first timestamp
+        self.assertAlmostEqual(stats.channel(0).bus_load, 100 * 135 / 500000 / 0.1)
+        self.assertIsNone(stats.channel(1))
+
+    def test_as_dict(self):
+        stats = can.MessageStatistics(bitrate=125000)
+        stats(can.Message(timestamp=1.0, arbitration_id=0x1, channel="can0"))
+        stats(can.Message(timestamp=2.0, arbitration_id=0x1, channel="can0"))
+        exported = stats.as_dict()
+        self.assertEqual(list(exported), ["can0"])
+        self.assertEqual(exported["can0"]["count"], 2)
+        self.assertEqual(len(exported["can0"]["ids"]), 1)
+        id_stats = exported["can0"]["ids"][0]
+        self.assertEqual(id_stats["arbitration_id"], 0x1)
+        self.assertTrue(id_stats["is_extended_id"])
+        self.assertEqual(id_stats["mean_period"], 1.0)
+        stats.reset()
+        self.assertEqual(stats.as_dict(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This module tests writing messages in a thread of their own.
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+import can
+
+
+class SlowWriter(can.Listener):
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+        self.release = threading.Event()
+        self.stopped = False
+
+    def on_message_received(self, msg):
+        self.on_messages_received([msg])
+
+    def on_messages_received(self, msgs):
+        self.release.wait(5)
+        self.threads.add(threading.current_thread())
+        self.batches.append([msg.arbitration_id for msg in msgs])
+
+    def stop(self):
+        self.stopped = True
+
+
+class FailingWriter(can.Listener):
+    def on_message_received(self, msg):
+        raise OSError("disk full")
+
+
+class ThreadedWriterTest(unittest.TestCase):
+    def test_writes_in_batches_and_flushes_on_stop(self):
+        writer = SlowWriter()
+        threaded = can.ThreadedWriter(writer)
+        for arbitration_id in range(100):
+            threaded(can.Message(arbitration_id=arbitration_id))
+        writer.release.set()
+        threaded.stop()
+
+        self.assertTrue(writer.stopped)
+        self.assertEqual(threaded.depth, 0)
+        written = [
+            arbitration_id for batch in writer.batches for arbitration_id in batch
+        ]
+        self.assertEqual(written, list(range(100)))
+        self.assertLess(len(writer.batches), 100)
+        self.assertNotIn(threading.current_thread(), writer.threads)
+
+    def test_overflow(self):
+        writer = SlowWriter()
+        threaded = can.ThreadedWriter(writer, queue_size=10, overflow="drop_newest")
+        threaded.on_messages_received(
+            [can.Message(arbitration_id=arbitration_id) for arbitration_id in range(50)]
+        )
+        writer.release.set()
+        threaded.stop()
+
+        written = sum(len(batch) for batch in writer.batches)
+        self.assertEqual(written + threaded.dropped, 50)
+        self.assertGreater(threaded.dropped, 0)
+
+    def test_writer_exception(self):
+        threaded = can.ThreadedWriter(FailingWriter())
+        threaded(can.Message())
+        threaded.stop()
+        self.assertIsInstance(threaded.exception, OSError)
+
+    def test_logger(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "threaded.csv")
+            logger = can.Logger(filename, threaded=True)
+            self.assertIsInstance(logger, can.ThreadedWriter)
+            self.assertIsInstance(logger.writer, can.CSVWriter)
+            for arbitration_id in range(10):
+                logger(can.Message(arbitration_id=arbitration_id))
+            logger.stop()
+
+            with can.CSVReader(filename) as reader:
+                ids = [msg.arbitration_id for msg in reader]
+        self.assertEqual(ids, list(range(10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
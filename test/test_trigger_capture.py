@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This module tests the capture of messages around triggers.
+"""
+
+import unittest
+from unittest.mock import Mock
+
+import can
+from can.io.capture import data_pattern
+
+
+class Recorder(can.Listener):
+    def __init__(self):
+        self.ids = []
+        self.stopped = False
+
+    def on_message_received(self, msg):
+        self.ids.append(msg.arbitration_id)
+
+    def stop(self):
+        self.stopped = True
+
+
+def messages(arbitration_ids, period=0.1):
+    return [
+        can.Message(timestamp=index * period, arbitration_id=arbitration_id)
+        for index, arbitration_id in enumerate(arbitration_ids)
+    ]
+
+
+class TriggerCaptureTest(unittest.TestCase):
+    def test_pre_and_post_trigger_frames(self):
+        writer = Recorder()
+        capture = can.TriggerCapture(
+            writer, pre_trigger_frames=3, post_trigger_frames=2, trigger_ids=[0xF]
+        )
+        capture.on_messages_received(messages([1, 2, 3, 4, 0xF, 5, 6, 7, 8]))
+        self.assertEqual(writer.ids, [3, 4, 0xF, 5, 6])
+        self.assertEqual(capture.triggers, 1)
+        self.assertFalse(capture.is_capturing)
+
+        # armed again, without the messages before the first trigger
+        capture.on_messages_received(messages([0xF, 9]))
+        self.assertEqual(writer.ids[5:], [7, 8, 0xF, 9])
+        self.assertTrue(capture.is_capturing)
+
+    def test_time_windows(self):
+        writer = Recorder()
+        capture = can.TriggerCapture(
+            writer,
+            pre_trigger_frames=100,
+            pre_trigger_time=0.25,
+            post_trigger_time=0.25,
+            trigger_on_error_frame=True,
+        )
+        msgs = messages(range(10))
+        msgs[5].is_error_frame = True
+        capture.on_messages_received(msgs)
+        # the error frame at 0.5 s, with everything from 0.25 s to 0.75 s
+        self.assertEqual(writer.ids, [3, 4, 5, 6, 7])
+
+    def test_manual_trigger_and_predicate(self):
+        writer = Recorder()
+        capture = can.TriggerCapture(
+            writer, pre_trigger_frames=2, trigger=data_pattern(0x7, [0x80], [0xF0])
+        )
+        capture.on_messages_received(messages([1, 2, 3]))
+        capture.trigger()
+        self.assertEqual(writer.ids, [2, 3])
+
+        capture(can.Message(arbitration_id=0x7, data=[0x8F]))
+        self.assertEqual(writer.ids, [2, 3, 0x7])
+        capture(can.Message(arbitration_id=0x7, data=[0x7F]))
+        capture(can.Message(arbitration_id=0x7))
+        self.assertEqual(capture.triggers, 2)
+
+        capture.stop()
+        self.assertTrue(writer.stopped)
+
+    def test_manual_trigger_after_capture(self):
+        writer = Recorder()
+        capture = can.TriggerCapture(
+            writer,
+            pre_trigger_frames=2,
+            post_trigger_frames=1,
+            post_trigger_time=0.15,
+            trigger_ids=[0xF],
+        )
+        capture.on_messages_received(messages([0xF, 2]))
+        self.assertEqual(writer.ids, [0xF, 2])
+
+        # the ring is empty, so the window starts with the message at 0.1 s
+        capture.trigger()
+        capture(can.Message(timestamp=0.2, arbitration_id=3))
+        self.assertEqual(writer.ids, [0xF, 2, 3])
+
+    def test_no_trigger(self):
+        writer = Mock()
+        capture = can.TriggerCapture(writer, pre_trigger_frames=2, trigger_ids=[0x1])
+        capture.on_messages_received(messages([2] * 10))
+        writer.on_message_received.assert_not_called()
+
+    def test_data_pattern(self):
+        matches = data_pattern(0x10, b"\x12\x34", b"\xff\x0f")
+        self.assertTrue(matches(can.Message(arbitration_id=0x10, data=[0x12, 0xF4, 0])))
+        self.assertFalse(matches(can.Message(arbitration_id=0x10, data=[0x12, 0x35])))
+        self.assertFalse(matches(can.Message(arbitration_id=0x11, data=[0x12, 0x34])))
+        self.assertFalse(matches(can.Message(arbitration_id=0x10, data=[0x12])))
+        with self.assertRaises(ValueError):
+            data_pattern(0x10, b"\x12", b"")
+
+
+if __name__ == "__main__":
+    unittest.main()